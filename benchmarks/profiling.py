@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from benchmarks.startup import MAIN, make_workspace
+
+INPUTS = ['--data', 'startup.csv', '--dist', 'german.json', '--rules', 'german.json']
+
+# (etapa medida, argumentos); el forjado horario lee el primer ZIP diario del espacio de trabajo
+COMMANDS = [
+    ('forge', ['forge_daily', *INPUTS, '--seed', '1']),
+    ('forge_hourly', ['forge_hourly', '-i', '1', '--seed', '1']),
+]
+
+# (nombre, opciones de main.py) de cada configuración de perfilado
+CONFIGURATIONS = [
+    ('none', []),
+    ('sample', ['--profile', 'sample']),
+    ('cprofile', ['--profile', 'cprofile']),
+    ('lines', ['--profile_lines']),
+]
+
+
+def stage_seconds(events_path, stage):
+    """Wall seconds of the `stage` span in a JSON-lines events file."""
+    with open(events_path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event['event'] == 'span_end' and event['span'] == stage:
+                return event['wall_seconds']
+    raise KeyError(f"No '{stage}' span in {events_path}.")
+
+
+def sampler_share(workspace, stdout):
+    """Share of the run spent inside the sampling thread, from the top-N report printed by main.py."""
+    for line in stdout.splitlines():
+        if line.startswith('[INFO] Profile report:') and line.endswith('_sample_top.txt'):
+            with open(os.path.join(workspace, line.split(':', 1)[1].strip())) as f:
+                header = dict(row.split(': ', 1) for row in f.read().split('\n\n')[0].splitlines())
+            return float(header['sampler_seconds']) / float(header['wall_seconds'])
+    return None
+
+
+def run_profiling_benchmark(repeats=3, months=2, pax_scale=0.5, configurations=CONFIGURATIONS):
+    """
+    Overhead of every --profile configuration on the forge stages.
+
+    Each run is a fresh `main.py` process on a temporary workspace; the stage time
+    is read from its `--events` file, so interpreter start and imports are excluded.
+    For the sampling profiler, the time spent inside the sampler thread is also
+    reported ('sampler_share'): it is its direct cost, free of the machine noise.
+
+    Args:
+        repeats (int): Runs per stage and configuration; the best time is kept.
+        months (int): Months of the synthetic base dataset.
+        pax_scale (float): Scale of the monthly Pax of the synthetic base dataset.
+        configurations (list): (name, main.py options) pairs; the first one is the baseline.
+
+    Returns:
+        dict: {stage: {configuration: {'seconds', 'overhead', ['sampler_share']}}}
+    """
+    results = {}
+    with tempfile.TemporaryDirectory() as workspace:
+        make_workspace(workspace, months=months, pax_scale=pax_scale)
+        events_path = os.path.join(workspace, 'events.jsonl')
+
+        for stage, argv in COMMANDS:
+            times, sampler = {name: [] for name, _ in configurations}, {}
+            # Las configuraciones se alternan en cada repetición para repartir el ruido de la máquina
+            for _ in range(repeats):
+                for name, options in configurations:
+                    if os.path.exists(events_path):
+                        os.remove(events_path)
+                    run = subprocess.run([sys.executable, MAIN, *argv, *options, '--events', events_path],
+                                         cwd=workspace, check=True, capture_output=True, text=True)
+                    times[name].append(stage_seconds(events_path, stage))
+                    share = sampler_share(workspace, run.stdout)
+                    if share is not None:
+                        sampler.setdefault(name, []).append(share)
+
+            results[stage] = {name: {'seconds': round(min(values), 4)} for name, values in times.items()}
+            for name, shares in sampler.items():
+                results[stage][name]['sampler_share'] = round(min(shares), 4)
+
+            baseline = results[stage][configurations[0][0]]['seconds']
+            for name, entry in results[stage].items():
+                entry['overhead'] = round(entry['seconds'] / baseline - 1, 4)
+                sampling = f", sampler {100 * entry['sampler_share']:.1f} % of the run" if 'sampler_share' in entry else ''
+                print(f"[INFO] {stage} {name}: {entry['seconds']:.3f} s ({100 * entry['overhead']:+.1f} %{sampling})")
+
+    return {'python': sys.version.split()[0], 'repeats': repeats, 'months': months, 'pax_scale': pax_scale,
+            'stages': results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Overhead of the --profile options on the forge stages.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per stage and configuration; the best time is reported. Defaults to 3.")
+    parser.add_argument("--months", type=int, default=2, help="Months of the synthetic base dataset. Defaults to 2.")
+    parser.add_argument("--pax_scale", type=float, default=0.5, help="Scale of the monthly Pax of the synthetic base dataset. Defaults to 0.5.")
+    parser.add_argument("--output", type=str, default=None, help="JSON file where the results are written.")
+    args = parser.parse_args()
+
+    report = run_profiling_benchmark(args.repeats, args.months, args.pax_scale)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
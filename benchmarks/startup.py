@@ -0,0 +1,120 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+from forge_base import generate_base_dataset
+from main import ONE_HOTEL
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN = os.path.join(REPO_DIR, 'main.py')
+
+# Librerías de modelado: ningún subcomando de forjado debería cargarlas
+ML_MODULES = ['sklearn', 'xgboost', 'statsmodels']
+INPUTS = ['--data', 'startup.csv', '--dist', 'german.json', '--rules', 'german.json']
+
+# (nombre, argumentos, módulos que no debe importar); se ejecutan en este orden
+COMMANDS = [
+    ('help', ['--help'], ML_MODULES + ['scipy']),
+    ('dry_run', ['dry_run', *INPUTS], ML_MODULES + ['scipy']),
+    ('forge_daily', ['forge_daily', *INPUTS, '--seed', '1'], ML_MODULES + ['scipy']),
+    ('calendar_daily', ['calendar_daily', '-i', '1'], ML_MODULES + ['scipy']),
+    ('validate_daily', ['validate_daily', '-i', '1', '--data', 'startup.csv'], ML_MODULES),
+    ('forge_hourly', ['forge_hourly', '-i', '1', '--seed', '1'], ML_MODULES + ['scipy']),
+]
+
+
+def make_workspace(path, months=2, pax_scale=0.02):
+    """Minimal `data/` tree in `path`: a tiny base dataset plus the repo distributions and rules."""
+    for folder in ['dataset', 'forged/daily', 'forged/hourly']:
+        os.makedirs(os.path.join(path, 'data', folder), exist_ok=True)
+    for folder in ['dist', 'rules']:
+        shutil.copytree(os.path.join(REPO_DIR, 'data', folder), os.path.join(path, 'data', folder))
+
+    base_df = generate_base_dataset(1, n_months=months, pax_scale=pax_scale, seed=0, names=[ONE_HOTEL])
+    base_df.to_csv(os.path.join(path, 'data', 'dataset', 'startup.csv'), index=False)
+
+
+def imported_modules(stderr):
+    """Top-level packages and total import time (s) from the `-X importtime` report."""
+    packages, total = set(), 0.0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        packages.add(name.strip().split('.')[0])
+        # Solo las importaciones de primer nivel: las anidadas ya están en su acumulado
+        if not name[1:].startswith(' '):
+            total += int(cumulative) / 1e6
+    return packages, total
+
+
+def run_command(workspace, argv, repeats):
+    """Best wall time over `repeats` runs, plus the modules and import time of one `-X importtime` run."""
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, MAIN, *argv], cwd=workspace, check=True, capture_output=True)
+        times.append(time.perf_counter() - start)
+
+    report = subprocess.run([sys.executable, '-X', 'importtime', MAIN, *argv], cwd=workspace,
+                            check=True, capture_output=True, text=True)
+    packages, import_seconds = imported_modules(report.stderr)
+    return min(times), import_seconds, packages
+
+
+def run_startup_benchmark(repeats=3, max_seconds=None):
+    """
+    Time every command of `COMMANDS` in a fresh interpreter on a tiny temporary workspace.
+
+    The inputs are so small that the wall time is dominated by the interpreter start
+    and the imports, i.e. it measures the time to first work of each subcommand.
+
+    Args:
+        repeats (int): Runs per command; the best wall time is kept.
+        max_seconds (float, optional): Wall-time budget per command.
+
+    Returns:
+        dict: {'commands': {name: measurements}, 'failures': [messages]}
+    """
+    results, failures = {}, []
+    with tempfile.TemporaryDirectory() as workspace:
+        make_workspace(workspace)
+        for name, argv, forbidden in COMMANDS:
+            wall, import_seconds, packages = run_command(workspace, argv, repeats)
+            loaded = sorted(set(forbidden) & packages)
+            results[name] = {
+                'argv': argv,
+                'wall_seconds': round(wall, 3),
+                'import_seconds': round(import_seconds, 3),
+                'forbidden_imports': loaded,
+            }
+            print(f"[INFO] {name}: {wall:.2f} s (imports {import_seconds:.2f} s)")
+
+            if loaded:
+                failures.append(f"{name} imports {', '.join(loaded)}")
+            if max_seconds is not None and wall > max_seconds:
+                failures.append(f"{name} took {wall:.2f} s (budget {max_seconds} s)")
+
+    return {'python': sys.version.split()[0], 'repeats': repeats, 'commands': results, 'failures': failures}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Startup time of the main.py subcommands.")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per command; the best wall time is reported. Defaults to 3.")
+    parser.add_argument("--max_seconds", type=float, default=None, help="Fail if any command takes longer than this. No budget by default.")
+    parser.add_argument("--output", type=str, default=None, help="JSON file where the results are written.")
+    args = parser.parse_args()
+
+    report = run_startup_benchmark(args.repeats, args.max_seconds)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=4)
+
+    for failure in report['failures']:
+        print(f"[ERROR] {failure}")
+    sys.exit(1 if report['failures'] else 0)
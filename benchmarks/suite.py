@@ -0,0 +1,289 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+import numpy as np
+import pandas as pd
+
+from forge_base import generate_base_dataset
+from utils.io import reserve_next_index
+from utils.paths import BENCHMARKS_DIR, PREFIX_BENCHMARK, DIST_DAILY_PATH, DIST_HOURLY_PATH, RULES_PATH, PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP
+
+STAGES = ['forge_daily', 'forge_daily_parallel', 'forge_hourly', 'modelling']
+# Forjado vectorizado de todas las filas base: la entrada de 'forge_hourly' y 'modelling'
+INPUT_STAGE = 'daily_input'
+# Cambio relativo a partir del cual `compare_benchmarks` marca una regresión
+REGRESSION_THRESHOLD = 0.10
+
+
+def parse_size(spec):
+    """'HOTELSxMONTHSxPAX_SCALE' → (hotels, months, pax_scale), e.g. '2x12x0.1'."""
+    hotels, months, scale = spec.lower().split('x')
+    return int(hotels), int(months), float(scale)
+
+
+def _peak_rss_bytes():
+    """Peak RSS of this process and of its finished children (ru_maxrss is in KiB on Linux)."""
+    peak = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    return peak * (1 if sys.platform == 'darwin' else 1024)
+
+
+def _load_inputs(dist_file, rules_file):
+    from utils.aux import normalize_probabilities
+
+    with open(os.path.join(DIST_DAILY_PATH, dist_file)) as f:
+        dist = json.load(f)
+    with open(os.path.join(RULES_PATH, rules_file)) as f:
+        rules = json.load(f)
+    return dist, normalize_probabilities(dist), rules
+
+
+def _run_stage(stage, work_dir, options):
+    """
+    Run one stage in this (fresh) process and measure it. The stage imports happen
+    here, so each measurement only pays for its own libraries.
+
+    The `INPUT_STAGE` forges every base row with `forge_daily_replicates`
+    (one replicate) and saves the ZIP read by 'forge_hourly' and 'modelling'.
+
+    Returns:
+        dict: seconds, rows, pax (guest-nights actually processed), rows_per_sec,
+        peak_rss_bytes, archive_bytes and stage extras.
+    """
+    from utils.io import load_daily_zip, save_daily_to_zip, save_hourly_to_zip
+
+    np.random.seed(options['seed'])
+    daily_dir, hourly_dir = os.path.join(work_dir, 'daily'), os.path.join(work_dir, 'hourly')
+    result = {'archive_bytes': None}
+
+    if stage in ('forge_daily', 'forge_daily_parallel', INPUT_STAGE):
+        base_df = pd.read_csv(options['base_file'])
+        dist, norm_dist, rules = _load_inputs(options['dist'], options['rules'])
+
+        start = time.perf_counter()
+        if stage == 'forge_daily':
+            from forge_daily import forge_daily_consumption
+            forged_df, _ = forge_daily_consumption(base_df, norm_dist, rules, options['noise'])
+        elif stage == INPUT_STAGE:
+            from forge_vectorized import forge_daily_replicates
+            forged_df, _ = forge_daily_replicates(base_df, norm_dist, rules, options['noise'], n_replicates=1,
+                                                  seed=options['seed'])
+            forged_df = forged_df.drop(columns='replicate')
+        else:
+            from forge_parallel import forge_daily_parallel
+            forged_df, _ = forge_daily_parallel(base_df, norm_dist, rules, options['noise'], n_replicates=1,
+                                                seed=options['seed'], n_jobs=options['n_jobs'])
+        seconds = time.perf_counter() - start
+        # Pax realmente forjados: `forge_daily_consumption` solo consume la primera fila base
+        pax = int(forged_df['Dias de estancia'].sum())
+        result.update(rows=len(forged_df), pax=pax, guests_per_sec=len(forged_df) / seconds, pax_per_sec=pax / seconds)
+
+        if stage == INPUT_STAGE:
+            save_start = time.perf_counter()
+            index = save_daily_to_zip(forged_df, dist, rules, {'benchmark': True}, folder=daily_dir)
+            result['save_seconds'] = time.perf_counter() - save_start
+            result['archive_bytes'] = os.path.getsize(os.path.join(daily_dir, f"{PREFIX_DAILY_ZIP}{index:04d}.zip"))
+            result['daily_index'] = index
+
+    elif stage == 'forge_hourly':
+        from forge_hourly import forge_hourly_consumption
+        from utils.aux import normalize_probabilities
+
+        forged_df, _, _ = load_daily_zip(daily_dir, options['daily_index'])
+        with open(os.path.join(DIST_HOURLY_PATH, options['profiles'])) as f:
+            profiles = json.load(f)
+
+        start = time.perf_counter()
+        hourly_df = forge_hourly_consumption(forged_df, normalize_probabilities(profiles), options['noise'])
+        seconds = time.perf_counter() - start
+        result.update(rows=len(hourly_df), hourly_rows_per_sec=len(hourly_df) / seconds,
+                      pax=int(forged_df['Dias de estancia'].sum()))
+
+        index = save_hourly_to_zip(hourly_df, profiles, {'benchmark': True}, hourly_dir)
+        result['archive_bytes'] = os.path.getsize(os.path.join(hourly_dir, f"{PREFIX_HOURLY_ZIP}{index:04d}.zip"))
+
+    elif stage == 'modelling':
+        from modelling import train_and_evaluate_models
+
+        forged_df, _, _ = load_daily_zip(daily_dir, options['daily_index'])
+        start = time.perf_counter()
+        train_and_evaluate_models(forged_df)
+        seconds = time.perf_counter() - start
+        result.update(rows=len(forged_df), modelling_seconds=seconds, pax=int(forged_df['Dias de estancia'].sum()))
+
+    else:
+        raise ValueError(f"Unknown stage '{stage}'. Available: {', '.join(STAGES)}.")
+
+    result.update(seconds=seconds, rows_per_sec=result['rows'] / seconds, peak_rss_bytes=_peak_rss_bytes())
+    return result
+
+
+def _in_fresh_process(stage, work_dir, options):
+    """Run `_run_stage` in a new interpreter (spawn), so its peak RSS and imports are its own."""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+        return executor.submit(_run_stage, stage, work_dir, options).result()
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(sizes, workers=(1,), stages=STAGES, repeats=1, dist='german.json', rules='german.json',
+                   profiles='default.json', seed=0):
+    """
+    Benchmark the forge, hourly and modelling stages over several base dataset sizes.
+
+    For every size a base dataset is generated (`generate_base_dataset`). Every base
+    row is forged with `forge_daily_replicates` and saved (`INPUT_STAGE`, recorded
+    too); the saved ZIP is the input of `forge_hourly` and `modelling`, so both scale
+    with the size. `forge_daily` is only measured on its own: it consumes just the
+    first base row, so its throughput is reported against the Pax it processed
+    (`pax`, `pax_per_sec`).
+    `forge_daily_parallel` runs once per worker count. Each stage runs in a fresh
+    process; with `repeats` > 1 the fastest run is kept.
+
+    Args:
+        sizes (list): (hotels, months, pax_scale) tuples.
+        workers (list): Worker counts of `forge_daily_parallel`.
+        stages (list): Stages to run (see `STAGES`). `INPUT_STAGE` runs if a later stage needs its ZIP.
+        repeats (int): Runs per measurement.
+        dist, rules, profiles (str): Input files in the usual data folders.
+        seed (int): Seed of the base datasets and of the forges.
+
+    Returns:
+        dict: Environment metadata and one result record per (stage, size, workers).
+    """
+    records = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        for hotels, months, pax_scale in sizes:
+            size = f"{hotels}x{months}x{pax_scale:g}"
+            base_df = generate_base_dataset(hotels, n_months=months, pax_scale=pax_scale, seed=seed)
+            base_file = os.path.join(work_dir, f"base_{size}.csv")
+            base_df.to_csv(base_file, index=False)
+            options = {'base_file': base_file, 'dist': dist, 'rules': rules, 'profiles': profiles,
+                       'noise': 0.05, 'seed': seed, 'n_jobs': 1, 'daily_index': None}
+
+            plan = [('forge_daily', 1)] if 'forge_daily' in stages else []
+            plan += [(INPUT_STAGE, 1)] if set(stages) & {'forge_hourly', 'modelling'} else []
+            plan += [('forge_daily_parallel', n) for n in workers if 'forge_daily_parallel' in stages]
+            plan += [(stage, 1) for stage in ['forge_hourly', 'modelling'] if stage in stages]
+
+            for stage, n_jobs in plan:
+                stage_options = {**options, 'noise': 0.1 if stage == 'forge_hourly' else 0.05, 'n_jobs': n_jobs}
+                runs = [_in_fresh_process(stage, work_dir, stage_options) for _ in range(repeats)]
+                best = min(runs, key=lambda run: run['seconds'])
+                if stage == INPUT_STAGE:
+                    options['daily_index'] = best['daily_index']
+
+                records.append({'stage': stage, 'size': size, 'hotels': hotels, 'months': months,
+                                'pax_scale': pax_scale, 'base_pax': int(base_df['Pax'].sum()), 'n_jobs': n_jobs,
+                                'repeats': repeats, **{k: v for k, v in best.items() if k != 'daily_index'}})
+                print(f"[INFO] {stage} {size} (n_jobs={n_jobs}): {best['seconds']:.2f} s, "
+                      f"{best['rows_per_sec']:.0f} rows/s, peak RSS {best['peak_rss_bytes'] / 2**20:.0f} MiB")
+
+    return {
+        'commit': _git_commit(),
+        'date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'library_versions': {'numpy': np.__version__, 'pandas': pd.__version__},
+        'inputs': {'dist': dist, 'rules': rules, 'profiles': profiles, 'seed': seed},
+        'results': records,
+    }
+
+
+def save_benchmark(report, folder=BENCHMARKS_DIR):
+    """Save a benchmark report as `bench_XXXX.json` in `folder` and return its path."""
+    index = reserve_next_index(folder, prefix=PREFIX_BENCHMARK, ext='.json')
+    path = os.path.join(folder, f"{PREFIX_BENCHMARK}{index:04d}.json")
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=4)
+    print(f"[INFO] Benchmark saved: {path}")
+    return path
+
+
+def compare_benchmarks(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Compare two benchmark reports measurement by measurement (stage, size, n_jobs).
+
+    Returns:
+        pd.DataFrame: Seconds, peak RSS and archive size of both reports, their ratios
+        (new / old) and a 'regression' flag when time or memory grew more than `threshold`.
+    """
+    keys = ['stage', 'size', 'n_jobs']
+    columns = keys + ['seconds', 'peak_rss_bytes', 'archive_bytes']
+    merged = pd.DataFrame(old['results'])[columns].merge(
+        pd.DataFrame(new['results'])[columns], on=keys, suffixes=('_old', '_new')
+    )
+    for metric in ['seconds', 'peak_rss_bytes', 'archive_bytes']:
+        merged[f'{metric}_ratio'] = merged[f'{metric}_new'] / merged[f'{metric}_old']
+    merged['regression'] = (merged['seconds_ratio'] > 1 + threshold) | (merged['peak_rss_bytes_ratio'] > 1 + threshold)
+    return merged
+
+
+def plot_benchmark(report, path):
+    """Scaling curves of a report (throughput vs Pax per stage, time vs workers) as an HTML file."""
+    import plotly.graph_objects as go
+    from plotly.subplots import make_subplots
+
+    results = pd.DataFrame(report['results'])
+    fig = make_subplots(rows=1, cols=2, subplot_titles=("Filas por segundo según el tamaño", "Tiempo según el número de procesos"))
+
+    sequential = results[results['n_jobs'] == 1]
+    for stage, group in sequential.groupby('stage'):
+        group = group.sort_values('pax')
+        fig.add_trace(go.Scatter(x=group['pax'], y=group['rows_per_sec'], mode='lines+markers', name=stage), row=1, col=1)
+
+    parallel = results[results['stage'] == 'forge_daily_parallel']
+    for size, group in parallel.groupby('size'):
+        group = group.sort_values('n_jobs')
+        fig.add_trace(go.Scatter(x=group['n_jobs'], y=group['seconds'], mode='lines+markers', name=f"parallel {size}"), row=1, col=2)
+
+    fig.update_xaxes(title_text='Pax del dataset base', type='log', row=1, col=1)
+    fig.update_yaxes(title_text='Filas / s', row=1, col=1)
+    fig.update_xaxes(title_text='n_jobs', row=1, col=2)
+    fig.update_yaxes(title_text='Segundos', row=1, col=2)
+    fig.update_layout(title=f"Benchmark {report.get('commit') or ''} ({report['date']})")
+    fig.write_html(path)
+    print(f"[INFO] Scaling curves: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the forge, hourly and modelling stages.")
+    parser.add_argument("--sizes", type=str, nargs='+', default=['1x12x0.05', '2x12x0.1', '4x24x0.1'], help="Base dataset sizes as HOTELSxMONTHSxPAX_SCALE. Defaults to 1x12x0.05 2x12x0.1 4x24x0.1.")
+    parser.add_argument("--workers", type=int, nargs='+', default=[1, 2, 4], help="Worker counts of 'forge_daily_parallel'. Defaults to 1 2 4.")
+    parser.add_argument("--stages", choices=STAGES, nargs='+', default=STAGES, help="Stages to run. Defaults to all.")
+    parser.add_argument("--repeats", type=int, default=1, help="Runs per measurement; the fastest is kept. Defaults to 1.")
+    parser.add_argument("--dist", type=str, default="german.json", help="Daily distributions in 'data/dist/daily'. Defaults to 'german.json'.")
+    parser.add_argument("--rules", type=str, default="german.json", help="Consumption rules in 'data/rules'. Defaults to 'german.json'.")
+    parser.add_argument("--profiles", type=str, default="default.json", help="Hourly profiles in 'data/dist/hourly'. Defaults to 'default.json'.")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the base datasets and forges. Defaults to 0.")
+    parser.add_argument("--plot", action='store_true', help="Also write the scaling curves next to the JSON report (requires plotly).")
+    parser.add_argument("--compare", type=str, nargs=2, metavar=('OLD', 'NEW'), help="Compare two saved reports instead of running the benchmark.")
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0]) as f_old, open(args.compare[1]) as f_new:
+            comparison = compare_benchmarks(json.load(f_old), json.load(f_new))
+        print(comparison.to_string(index=False))
+        sys.exit(1 if comparison['regression'].any() else 0)
+
+    report = run_benchmarks([parse_size(spec) for spec in args.sizes], args.workers, args.stages,
+                            args.repeats, args.dist, args.rules, args.profiles, args.seed)
+    path = save_benchmark(report)
+    if args.plot:
+        plot_benchmark(report, path.replace('.json', '.html'))
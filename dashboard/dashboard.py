@@ -4,6 +4,8 @@ from data_loader import get_results_directories, load_csv, load_json
 
 from views.charts import show_importance_chart, show_error_chart
 from views.tables import show_experiment_info, show_eliminated_vars, show_sources
+from views.comparison import show_comparison
+from views.forged import show_forged_explorer
 
 # Interfaz de Streamlit
 def main():
@@ -20,9 +22,14 @@ def main():
 
     # Menú lateral para seleccionar la sección
     st.sidebar.title("Opciones")
-    selected_option = st.sidebar.radio("Selecciona una opción", ["Info", "Distribuciones y Reglas", "Error", "Variables Eliminadas", "Importancias"])
+    selected_option = st.sidebar.radio("Selecciona una opción", ["Info", "Distribuciones y Reglas", "Error", "Variables Eliminadas", "Importancias", "Comparar Experimentos", "Datos Forjados"])
 
-    if selected_experiment:
+    # La comparación usa todos los experimentos del índice, no el seleccionado
+    if selected_option == "Comparar Experimentos":
+        show_comparison()
+    elif selected_option == "Datos Forjados":
+        show_forged_explorer()
+    elif selected_experiment:
         if selected_option == "Info":
             data = load_json(f"results/{selected_experiment}/info/info.json")
             show_experiment_info(data)
@@ -1,44 +1,154 @@
 import os
+import sys
+import json
 import pandas as pd
-import sqlite3
+import streamlit as st
 
-# Función para obtener los directorios de resultados
-def get_results_directories(base_path="results"):
-    """Obtiene los nombres de directorios dentro de 'results'."""
+# Streamlit solo añade la carpeta 'dashboard' al path: la raíz del repo es necesaria para 'utils'
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.paths import RESULTS_DIR, FORGED_DAILY_PATH, FORGED_HOURLY_PATH, PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP
+from utils.results_index import index_path, load_experiment_index, query_metrics, query_importance_errors, distinct_values
+
+# Entradas máximas de cada caché (se descartan las más antiguas)
+CACHE_ENTRIES = 256
+
+def _mtime(path):
+    """Fecha de modificación de `path`, parte de la clave de las cachés (None si no existe)."""
     try:
-        return sorted([d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d))])
+        return os.stat(path).st_mtime_ns
     except FileNotFoundError:
+        return None
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_index(base_path, results_mtime, index_mtime):
+    return load_experiment_index(base_path)
+
+def get_experiment_index(base_path=RESULTS_DIR):
+    """
+    Índice consolidado de los experimentos (una fila por directorio de 'results').
+
+    Se vuelve a leer solo cuando cambia la fecha de modificación de 'results' (se crea
+    o se borra un experimento) o la del índice SQLite (`save_experiment_results` añade
+    un experimento); en cada interacción solo cuesta dos `stat`.
+    """
+    return _cached_index(base_path, _mtime(base_path), _mtime(index_path(base_path)))
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_values(base_path, index_mtime):
+    return distinct_values(base_path)
+
+def get_filter_values(base_path=RESULTS_DIR):
+    """Valores disponibles para filtrar la comparación de experimentos (ver `distinct_values`)."""
+    get_experiment_index(base_path)
+    return _cached_values(base_path, _mtime(index_path(base_path)))
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_metrics(base_path, index_mtime, metrics, models, filters):
+    return query_metrics(base_path, metrics, models, dict(filters))
+
+def get_metrics(metrics=None, models=None, filters=None, base_path=RESULTS_DIR):
+    """Errores de todos los experimentos indexados (ver `query_metrics`), en caché mientras no cambie el índice."""
+    get_experiment_index(base_path)
+    return _cached_metrics(base_path, _mtime(index_path(base_path)), tuple(metrics or ()), tuple(models or ()),
+                           tuple((column, tuple(values)) for column, values in (filters or {}).items()))
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_importance_errors(base_path, index_mtime, models, features, filters):
+    return query_importance_errors(base_path, models, features, dict(filters))
+
+def get_importance_errors(models=None, features=None, filters=None, base_path=RESULTS_DIR):
+    """Error relativo de las importancias (ver `query_importance_errors`), en caché mientras no cambie el índice."""
+    get_experiment_index(base_path)
+    return _cached_importance_errors(base_path, _mtime(index_path(base_path)), tuple(models or ()), tuple(features or ()),
+                                     tuple((column, tuple(values)) for column, values in (filters or {}).items()))
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_archives(folder, prefix, folder_mtime):
+    names = sorted(n for n in os.listdir(folder) if n.startswith(prefix) and n.endswith('.zip'))
+    return [int(n[len(prefix):-len('.zip')]) for n in names if n[len(prefix):-len('.zip')].isdigit()]
+
+def get_forged_archives(kind):
+    """Índices de los ZIP forjados ('diario' u 'horario'), en caché mientras no cambie la carpeta."""
+    folder, prefix = (FORGED_DAILY_PATH, PREFIX_DAILY_ZIP) if kind == 'diario' else (FORGED_HOURLY_PATH, PREFIX_HOURLY_ZIP)
+    mtime = _mtime(folder)
+    return [] if mtime is None else _cached_archives(folder, prefix, mtime)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner="Agregando el dataset diario...")
+def _cached_daily(index, replicate, categoricals, bins, zip_mtime):
+    from forge_explorer import explore_daily
+    return explore_daily(FORGED_DAILY_PATH, index, replicate, list(categoricals), bins)
+
+def get_daily_summary(index, replicate=None, categoricals=(), bins=50):
+    """Agregados de un ZIP diario (ver `forge_explorer.explore_daily`), en caché mientras no cambie el ZIP."""
+    zip_mtime = _mtime(os.path.join(FORGED_DAILY_PATH, f"{PREFIX_DAILY_ZIP}{index:04d}.zip"))
+    return _cached_daily(index, replicate, tuple(categoricals), bins, zip_mtime)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _cached_categoricals(index, replicate, zip_mtime):
+    from forge_explorer import daily_categoricals
+    return daily_categoricals(FORGED_DAILY_PATH, index, replicate)
+
+def get_daily_categoricals(index, replicate=None):
+    """Variables categóricas de un ZIP diario (solo se lee la cabecera del CSV)."""
+    zip_mtime = _mtime(os.path.join(FORGED_DAILY_PATH, f"{PREFIX_DAILY_ZIP}{index:04d}.zip"))
+    return _cached_categoricals(index, replicate, zip_mtime)
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner="Agregando el dataset horario...")
+def _cached_hourly(index, bins, zip_mtime):
+    from forge_explorer import explore_hourly
+    return explore_hourly(FORGED_HOURLY_PATH, index, bins)
+
+def get_hourly_summary(index, bins=50):
+    """Agregados de un ZIP horario (ver `forge_explorer.explore_hourly`), en caché mientras no cambie el ZIP."""
+    zip_mtime = _mtime(os.path.join(FORGED_HOURLY_PATH, f"{PREFIX_HOURLY_ZIP}{index:04d}.zip"))
+    return _cached_hourly(index, bins, zip_mtime)
+
+# Función para obtener los directorios de resultados
+def get_results_directories(base_path=RESULTS_DIR):
+    """Obtiene los nombres de directorios dentro de 'results' (desde el índice de experimentos)."""
+    if _mtime(base_path) is None:
         return []
+    return get_experiment_index(base_path)['experiment'].tolist()
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _read_csv(file_path, mtime):
+    return pd.read_csv(file_path)
 
 # Función genérica para cargar un CSV desde una ruta específica
 def load_csv(file_path):
-    """Carga un archivo CSV desde una ruta especificada."""
-    try:
-        return pd.read_csv(file_path)
-    except FileNotFoundError:
+    """Carga un archivo CSV desde una ruta especificada (en caché mientras no cambie el archivo)."""
+    mtime = _mtime(file_path)
+    if mtime is None:
         return None
+    return _read_csv(file_path, mtime)
 
-import json
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def _read_json(file_path, mtime):
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
 
 def load_json(file_path):
     """
     Carga un archivo JSON y devuelve su contenido como un diccionario.
-    
+
+    El contenido se guarda en la caché de Streamlit con la fecha de modificación del
+    archivo como parte de la clave: si el archivo cambia, se vuelve a leer.
+
     Args:
         file_path (str): Ruta al archivo JSON.
-    
+
     Returns:
         dict: Contenido del archivo JSON como un diccionario.
-    
+
     Raises:
         FileNotFoundError: Si el archivo no existe.
         json.JSONDecodeError: Si el archivo no es un JSON válido.
     """
+    mtime = _mtime(file_path)
+    if mtime is None:
+        raise FileNotFoundError(f"El archivo {file_path} no existe.")
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        return data
-    except FileNotFoundError as e:
-        raise FileNotFoundError(f"El archivo {file_path} no existe.") from e
+        return _read_json(file_path, mtime)
     except json.JSONDecodeError as e:
-        raise ValueError(f"El archivo {file_path} no contiene un JSON válido.") from e
\ No newline at end of file
+        raise ValueError(f"El archivo {file_path} no contiene un JSON válido.") from e
@@ -0,0 +1,63 @@
+import plotly.express as px
+import streamlit as st
+
+from data_loader import get_filter_values, get_metrics, get_importance_errors
+
+# Columnas del índice por las que se puede filtrar y agrupar
+GROUP_LABELS = {
+    'dist_file': 'Distribuciones',
+    'rules_file': 'Reglas',
+    'input_data_file': 'Dataset base',
+    'noise_daily': 'Ruido',
+    'experiment': 'Experimento',
+}
+IMPORTANCE_ERROR = 'Error de importancia (%)'
+
+def show_comparison():
+    """
+    Compara los errores (RMSE, MAE) o el error relativo de las importancias entre
+    todos los experimentos del índice, con filtros por caso y agrupación.
+    """
+    st.subheader("Comparación de Experimentos")
+    values = get_filter_values()
+    if not values['model']:
+        st.info("No hay experimentos con métricas en el índice.")
+        return
+
+    columns = st.columns(3)
+    filters = {
+        column: columns[position].multiselect(GROUP_LABELS[column], values[column])
+        for position, column in enumerate(['dist_file', 'rules_file', 'input_data_file'])
+    }
+
+    columns = st.columns(3)
+    measure = columns[0].selectbox("Medida", values['metric'] + [IMPORTANCE_ERROR])
+    group = columns[1].selectbox("Agrupar por", list(GROUP_LABELS), format_func=GROUP_LABELS.get)
+    models = columns[2].multiselect("Modelos", values['model'])
+
+    if measure == IMPORTANCE_ERROR:
+        features = st.multiselect("Variables", values['feature'])
+        errors = get_importance_errors(models, features, filters)
+        # Un valor por experimento y modelo: la media del error de sus variables
+        df = (errors.groupby(['experiment', 'model', *[c for c in GROUP_LABELS if c != 'experiment']], dropna=False)
+              ['relative_error'].mean().reset_index(name='value'))
+    else:
+        df = get_metrics([measure], models, filters)
+
+    if df.empty:
+        st.info("Ningún experimento cumple los filtros.")
+        return
+
+    df[group] = df[group].astype(str)
+    fig = px.box(df, x=group, y='value', color='model', points='all' if len(df) <= 2000 else False,
+                 hover_data=['experiment'],
+                 title=f"{measure} por {GROUP_LABELS[group].lower()}",
+                 labels={'value': measure, group: GROUP_LABELS[group], 'model': 'Modelos'},
+                 height=500)
+    st.plotly_chart(fig, use_container_width=True)
+
+    summary = (df.groupby([group, 'model'])['value']
+               .agg(['mean', 'std', 'min', 'max', 'count']).reset_index()
+               .rename(columns={group: GROUP_LABELS[group], 'model': 'Modelo', 'mean': 'Media', 'std': 'Desv. típica',
+                                'min': 'Mínimo', 'max': 'Máximo', 'count': 'Experimentos'}))
+    st.dataframe(summary, hide_index=True, use_container_width=True)
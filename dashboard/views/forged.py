@@ -0,0 +1,84 @@
+import plotly.express as px
+import streamlit as st
+
+from data_loader import get_forged_archives, get_daily_summary, get_daily_categoricals, get_hourly_summary
+
+# Puntos máximos de cada serie enviada al navegador (se reduce con LTTB)
+MAX_POINTS = 2000
+
+def _histogram_chart(histogram, column):
+    histogram = histogram.assign(Centro=(histogram['Desde'] + histogram['Hasta']) / 2)
+    fig = px.bar(histogram, x='Centro', y='Frecuencia', title=f"Histograma de {column}",
+                 labels={'Centro': column}, height=400)
+    fig.update_layout(bargap=0)
+    st.plotly_chart(fig, use_container_width=True)
+
+def _series_chart(df, x, y, title, max_points):
+    from forge_explorer import downsample
+
+    reduced = downsample(df, x, y, max_points, by='Hotel')
+    st.caption(f"{len(reduced)} de {len(df)} puntos (LTTB)")
+    fig = px.line(reduced, x=x, y=y, color='Hotel', title=title, height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+def show_daily_explorer(index, max_points):
+    replicate = st.sidebar.number_input("Réplica (ZIP particionado)", min_value=0, value=None, step=1)
+    try:
+        available = get_daily_categoricals(index, replicate)
+    except KeyError as e:
+        # ZIP particionado por réplica sin réplica elegida
+        st.error(str(e))
+        return
+    categoricals = st.multiselect("Variables con marginales", available, default=available[:4])
+    summary = get_daily_summary(index, replicate, categoricals)
+
+    st.metric("Huéspedes", f"{summary['filas']:,}")
+    st.subheader("Por hotel")
+    st.dataframe(summary['por_hotel'], hide_index=True, use_container_width=True)
+
+    _series_chart(summary['por_dia'], 'Fecha', 'Consumo diario', "Consumo diario por hotel", max_points)
+    _series_chart(summary['por_dia'], 'Fecha', 'Huespedes', "Huéspedes presentes por hotel", max_points)
+    _histogram_chart(summary['histograma'], 'Consumo medio')
+
+    marginals = summary['marginales']
+    for variable in categoricals:
+        data = marginals[marginals['Variable'] == variable]
+        columns = st.columns(2)
+        columns[0].plotly_chart(px.bar(data, x='Categoria', y='Proporcion', title=f"{variable}: proporción", height=350),
+                                use_container_width=True)
+        columns[1].plotly_chart(px.bar(data, x='Categoria', y='Consumo medio', title=f"{variable}: consumo medio", height=350),
+                                use_container_width=True)
+
+def show_hourly_explorer(index, max_points):
+    summary = get_hourly_summary(index)
+
+    st.metric("Filas huésped-día", f"{summary['filas']:,}")
+    st.subheader("Por hotel")
+    st.dataframe(summary['por_hotel'], hide_index=True, use_container_width=True)
+
+    fig = px.line(summary['por_hora'], x='Hora', y='Consumo medio', color='profile_id',
+                  title="Consumo medio por hora y perfil", markers=True, height=400)
+    st.plotly_chart(fig, use_container_width=True)
+
+    _series_chart(summary['serie'], 'Instante', 'Consumo', "Consumo horario por hotel", max_points)
+    _histogram_chart(summary['histograma'], 'Consumo diario')
+
+def show_forged_explorer():
+    """
+    Explorador de los datasets forjados. Los agregados se calculan en el servidor,
+    leyendo solo las columnas necesarias del ZIP, y las series se reducen con LTTB
+    antes de dibujarlas, así que el navegador nunca recibe el dataset completo.
+    """
+    st.subheader("Datos Forjados")
+    kind = st.sidebar.radio("Tipo de dataset", ['diario', 'horario'])
+    archives = get_forged_archives(kind)
+    if not archives:
+        st.info(f"No hay datasets forjados de tipo {kind}.")
+        return
+    index = st.sidebar.selectbox("ZIP forjado", archives, index=len(archives) - 1, format_func=lambda i: f"{i:04d}")
+    max_points = st.sidebar.slider("Puntos por serie", 200, 10_000, MAX_POINTS, step=100)
+
+    if kind == 'diario':
+        show_daily_explorer(index, max_points)
+    else:
+        show_hourly_explorer(index, max_points)
@@ -0,0 +1,125 @@
+import calendar
+import os
+
+import numpy as np
+import pandas as pd
+
+# Columnas del dataset base, en el orden de los CSV de data/dataset
+BASE_COLUMNS = ['Hotel', 'Pax', 'Consumo Kw Electricidad', 'Consumo Kw Electricidad / Pax', 'Mes', 'Año', 'Estación']
+
+SEASONS = {12: 'invierno', 1: 'invierno', 2: 'invierno', 3: 'primavera', 4: 'primavera', 5: 'primavera',
+           6: 'verano', 7: 'verano', 8: 'verano', 9: 'otoño', 10: 'otoño', 11: 'otoño'}
+
+# Una palabra por letra: las iniciales del nombre (código del hotel en 'id_huesped') son únicas
+HOTEL_WORDS = ['Atlántico', 'Bahía', 'Costa', 'Duna', 'Estrella', 'Faro', 'Galeón', 'Horizonte', 'Isla',
+               'Jardín', 'Kiosco', 'Luna', 'Marina', 'Náutico', 'Océano', 'Palmera', 'Quinta', 'Roca',
+               'Sol', 'Teide', 'Urbano', 'Volcán', 'Windsurf', 'Xerach', 'Yate', 'Zafiro']
+
+# Huéspedes medios por habitación ocupada
+GUESTS_PER_ROOM = 1.9
+
+
+def hotel_names(n_hotels):
+    """
+    Nombres 'Hotel <palabra> <palabra>...' cuyas iniciales codifican el índice en base 26,
+    para que el código de hotel de `forge_daily_consumption` no se repita entre hoteles.
+    """
+    n_words = max(2, int(np.ceil(np.log(max(n_hotels, 2)) / np.log(len(HOTEL_WORDS)))))
+    names = []
+    for index in range(n_hotels):
+        words = []
+        for _ in range(n_words):
+            index, digit = divmod(index, len(HOTEL_WORDS))
+            words.append(HOTEL_WORDS[digit])
+        names.append(' '.join(['Hotel'] + words[::-1]))
+    return names
+
+
+def _hotel_months(name, months, years, days, pax_scale, rng):
+    """Filas base de un hotel: ocupación y consumo con estacionalidad, tendencia y ruido."""
+    rooms = rng.integers(40, 121)
+    base_occupancy = rng.uniform(0.6, 0.8)
+    # Temporada alta en invierno (turismo de sol) con un segundo pico en agosto
+    winter_peak = rng.uniform(0.08, 0.15) * np.cos(2 * np.pi * (months - 1) / 12)
+    summer_peak = rng.uniform(0.05, 0.12) * np.exp(-0.5 * ((months - 8) / 0.8) ** 2)
+    trend = rng.uniform(-0.02, 0.04) * (years - years.min())
+    occupancy = np.clip(base_occupancy + winter_peak + summer_peak + trend + rng.normal(0, 0.04, len(months)), 0.2, 0.98)
+    pax = np.maximum(1, np.round(rooms * GUESTS_PER_ROOM * days * occupancy * pax_scale)).astype(np.int64)
+
+    # Consumo por huésped-noche: base del hotel, más climatización en verano y menos por ocupación alta
+    per_pax_base = rng.uniform(18, 28)
+    cooling = rng.uniform(0.05, 0.15) * np.cos(2 * np.pi * (months - 8) / 12)
+    economies = -0.15 * (occupancy - occupancy.mean())
+    per_pax = per_pax_base * (1 + cooling + economies) * rng.lognormal(0, 0.05, len(months))
+
+    return pd.DataFrame({
+        'Hotel': name,
+        'Pax': pax,
+        'Consumo Kw Electricidad': pax * per_pax,
+        'Consumo Kw Electricidad / Pax': per_pax,
+        'Mes': months,
+        'Año': years,
+        'Estación': [SEASONS[m] for m in months],
+    })[BASE_COLUMNS]
+
+
+def iter_base_dataset(n_hotels, n_years=1, start_year=2022, pax_scale=1.0, seed=None, n_months=None, names=None):
+    """
+    Genera un dataset base sintético hotel a hotel, con las columnas que esperan
+    `main.py` y `forge_daily_consumption` (`BASE_COLUMNS`).
+
+    Cada hotel tiene una capacidad (40-120 habitaciones) y una ocupación base propias.
+    La ocupación sigue un ciclo anual (temporada alta en invierno y un segundo pico en
+    agosto), una tendencia entre años y ruido mensual. El Pax (huésped-noches) es
+    habitaciones × huéspedes por habitación × días del mes × ocupación × `pax_scale`.
+    El consumo por Pax tiene una base por hotel, más climatización en verano y algo
+    menos en los meses de ocupación alta.
+
+    Cada hotel usa su propia semilla hija de `seed`, así que el resultado no depende
+    de cómo se consuman los bloques.
+
+    Args:
+        n_hotels (int): Número de hoteles.
+        n_years (int): Años consecutivos desde `start_year`.
+        start_year (int): Primer año.
+        pax_scale (float): Escala del Pax (1 ≈ 1500-6500 Pax por hotel y mes).
+        seed (int, optional): Semilla.
+        n_months (int, optional): Meses desde enero de `start_year`; sustituye a `n_years`.
+        names (list, optional): Nombres de los primeros hoteles (el resto, de `hotel_names`).
+
+    Yields:
+        pd.DataFrame: Filas base de un hotel, ordenadas por Año y Mes.
+    """
+    n_months = 12 * n_years if n_months is None else n_months
+    offsets = np.arange(n_months)
+    months = offsets % 12 + 1
+    years = start_year + offsets // 12
+    days = np.array([calendar.monthrange(y, m)[1] for y, m in zip(years, months)])
+
+    names = list(names or [])[:n_hotels]
+    names += [name for name in hotel_names(n_hotels + len(names)) if name not in names][:n_hotels - len(names)]
+    seeds = np.random.SeedSequence(seed).spawn(n_hotels)
+    for name, hotel_seed in zip(names, seeds):
+        yield _hotel_months(name, months, years, days, pax_scale, np.random.default_rng(hotel_seed))
+
+
+def generate_base_dataset(n_hotels, n_years=1, start_year=2022, pax_scale=1.0, seed=None, n_months=None, names=None):
+    """Dataset base completo en memoria (ver `iter_base_dataset`)."""
+    return pd.concat(iter_base_dataset(n_hotels, n_years, start_year, pax_scale, seed, n_months, names), ignore_index=True)
+
+
+def write_base_dataset(path, n_hotels, n_years=1, start_year=2022, pax_scale=1.0, seed=None, n_months=None, names=None):
+    """
+    Escribe el dataset base en `path` hotel a hotel, sin tenerlo entero en memoria.
+
+    Returns:
+        dict: Filas, hoteles y Pax (huésped-noches) totales escritos.
+    """
+    summary = {'rows': 0, 'hotels': n_hotels, 'pax': 0}
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        for position, hotel_df in enumerate(iter_base_dataset(n_hotels, n_years, start_year, pax_scale, seed, n_months, names)):
+            hotel_df.to_csv(f, index=False, header=position == 0)
+            summary['rows'] += len(hotel_df)
+            summary['pax'] += int(hotel_df['Pax'].sum())
+    summary['file'] = os.path.abspath(path)
+    return summary
@@ -0,0 +1,95 @@
+import numpy as np
+import pandas as pd
+
+from utils.io import iter_daily_zip_chunks, load_daily_zip_info
+
+# Columnas del dataset diario necesarias para el calendario
+CALENDAR_INPUT_COLUMNS = ['Hotel', 'Año', 'Mes', 'Dia inicio', 'Dias de estancia', 'id_habitacion', 'Consumo total', 'replicate']
+
+
+def occupancy_calendar(forged_df):
+    """
+    Calendario diario de ocupación y carga por hotel a partir del dataset diario forjado.
+
+    Cada huésped está en el hotel desde 'Dia inicio' durante 'Dias de estancia' días y
+    consume cada día 'Consumo total' / 'Dias de estancia'. En lugar de expandir cada
+    huésped en sus días, se usan arrays de diferencias sobre la rejilla (hotel, fecha):
+    +valor el día de llegada, -valor el día de salida, y una suma acumulada por hotel.
+    Las habitaciones se cuentan una vez (primer huésped de cada habitación).
+
+    Args:
+        forged_df (pd.DataFrame): Dataset diario con ['Hotel', 'Año', 'Mes', 'Dia inicio',
+            'Dias de estancia', 'id_habitacion', 'Consumo total'] y, opcionalmente, 'replicate'.
+
+    Returns:
+        pd.DataFrame: Una fila por hotel (y réplica) y día del calendario con
+        ['Fecha', 'Huespedes', 'Habitaciones ocupadas', 'Llegadas', 'Consumo diario'].
+    """
+    keys = ['Hotel'] + (['replicate'] if 'replicate' in forged_df.columns else [])
+
+    start = pd.to_datetime(pd.DataFrame({
+        'year': forged_df['Año'], 'month': forged_df['Mes'], 'day': forged_df['Dia inicio']
+    }))
+    first_date = start.min()
+    day = (start - first_date).dt.days.to_numpy(dtype=np.int64)
+    stay = forged_df['Dias de estancia'].to_numpy(dtype=np.int64)
+    n_days = int((day + stay).max())
+
+    grouped = forged_df.groupby(keys, sort=True)
+    series_codes = grouped.ngroup().to_numpy(dtype=np.int64)
+    series = grouped.size().index.to_frame(index=False)
+    # Un día extra por serie para las salidas del último día
+    stride = n_days + 1
+    arrivals = series_codes * stride + day
+    departures = arrivals + stay
+
+    def calendar_sum(weights=None, mask=None):
+        a, d, w = arrivals, departures, weights
+        if mask is not None:
+            a, d = a[mask], d[mask]
+            w = None if w is None else w[mask]
+        size = len(series) * stride
+        diff = np.bincount(a, weights=w, minlength=size) - np.bincount(d, weights=w, minlength=size)
+        return diff.reshape(len(series), stride)[:, :n_days].cumsum(axis=1)
+
+    rooms = pd.DataFrame({'series': series_codes, 'Año': forged_df['Año'].to_numpy(),
+                          'Mes': forged_df['Mes'].to_numpy(), 'id_habitacion': forged_df['id_habitacion'].to_numpy()})
+    first_of_room = ~rooms.duplicated().to_numpy()
+    daily_consumption = forged_df['Consumo total'].to_numpy(dtype=float) / stay
+
+    calendar = pd.DataFrame(
+        np.repeat(series.to_numpy(), n_days, axis=0), columns=keys
+    ).astype(forged_df[keys].dtypes.to_dict())
+    calendar['Fecha'] = np.tile(first_date + pd.to_timedelta(np.arange(n_days), unit='D'), len(series))
+    calendar['Huespedes'] = calendar_sum().ravel().astype(np.int64)
+    calendar['Habitaciones ocupadas'] = calendar_sum(mask=first_of_room).ravel().astype(np.int64)
+    calendar['Llegadas'] = np.bincount(arrivals, minlength=len(series) * stride).reshape(len(series), stride)[:, :n_days].ravel()
+    calendar['Consumo diario'] = calendar_sum(weights=daily_consumption).ravel()
+
+    return calendar
+
+
+def occupancy_calendar_from_zip(folder, index, replicate=None, chunksize=1_000_000):
+    """
+    Calendario de ocupación de un ZIP diario, leyendo solo las columnas necesarias.
+
+    Si el ZIP está particionado por réplica y no se indica `replicate`, se calcula
+    el calendario de todas las réplicas (con la columna 'replicate').
+
+    Returns:
+        pd.DataFrame: Ver `occupancy_calendar`.
+    """
+    info = load_daily_zip_info(folder, index)
+    if replicate is not None:
+        partitions = [replicate]
+    elif 'partitions' in info:
+        partitions = [int(value) for value in info['partitions']]
+    else:
+        partitions = [None]
+
+    calendars = []
+    for part in partitions:
+        chunks = iter_daily_zip_chunks(folder, index, chunksize, usecols=lambda c: c in CALENDAR_INPUT_COLUMNS, replicate=part)
+        calendars.append(occupancy_calendar(pd.concat(chunks, ignore_index=True)))
+
+    return pd.concat(calendars, ignore_index=True)
@@ -3,6 +3,8 @@ import pandas as pd
 import calendar
 from tqdm import tqdm
 
+from utils.instrumentation import span
+
 def forge_daily_consumption(data, dist, rules, noise: float = 0.05):
     """
     Genera un dataset sintético diario de huéspedes a partir de un dataset base,
@@ -49,11 +51,7 @@ def forge_daily_consumption(data, dist, rules, noise: float = 0.05):
     chunks = []
 
     # --- Estadísticas de normalización ---
-    factors_sum = 0.0
-    factors_sq_sum = 0.0
-    factors_min = float("inf")
-    factors_max = float("-inf")
-    n_factors = 0
+    factors = []
 
     for _, row in tqdm(data.iterrows(), total=data.shape[0], desc=f"{hotel}: Processing Rows"):
         pax = row['Pax']
@@ -77,128 +75,151 @@ def forge_daily_consumption(data, dist, rules, noise: float = 0.05):
 
         # 2. Generar habitaciones y asignar huéspedes
         huespedes = []
+        ruidos = []
         id_huesped_counter = 1
         id_habitacion_counter = 1
         pax_restante = pax
 
-        while pax_restante > 0:
-            # Determinar ocupación de habitación (se toma de dist)
-            opciones_keys = list(dist['ocupacion_habitacion']['probabilidades'].keys())
-            opciones_probs = list(dist['ocupacion_habitacion']['probabilidades'].values())
-            # np.random.choice con keys que son strings — convertir result a int
-            n_ocupantes = int(np.random.choice(opciones_keys, p=opciones_probs))
-            n_ocupantes = min(n_ocupantes, pax_restante)
-
-            # 2B. Generar variables compartidas PARA LA HABITACIÓN (una sola vez)
-            valores_compartidos = {}
-            for key, info in compartidas.items():
-                if 'condicion' in info:
-                    cond_key = info['condicion']
-                    # La condición se evalúa sobre la fila original o sobre valores previamente definidos de la habitación
-                    # Para condiciones basadas en variables que también pueden ser compartidas, preferimos row si no existe aún
-                    cond_value = row.get(cond_key) if cond_key in row.index else None
-                    # Si la condicion depende de una variable base del dataset, usamos row; si depende de otra compartida se debería
-                    # haber generado ya (pero en nuestro flujo compartidas se generan ahora)
-                    if cond_value is None:
-                        # ultimo recurso: usar valores_compartidos
-                        cond_value = valores_compartidos.get(cond_key)
-                    # ahora sample condicionada
-                    probs_dict = info['probabilidades'][cond_value]
-                    options = np.array(list(probs_dict.keys()))
-                    probs = np.array(list(probs_dict.values()))
-                    valores_compartidos[key] = np.random.choice(options, p=probs)
-                else:
-                    probs_dict = info['probabilidades']
-                    options = np.array(list(probs_dict.keys()))
-                    probs = np.array(list(probs_dict.values()))
-                    valores_compartidos[key] = np.random.choice(options, p=probs)
-
-            # === GENERAR dias_estancia y dia_inicio UNA vez por habitación ===
-            dias_estancia = np.random.randint(1, min(7, pax_restante // n_ocupantes) + 1) # Generar dias_estancia de forma que no sobrepase pax_restante
-            dia_inicio = np.random.randint(1, calendar.monthrange(year, month)[1] - dias_estancia + 2)
-
-            # 3. Crear cada huésped en la habitación
-            id_habitacion_str = f"{id_habitacion_counter:06d}"
-            for _ in range(n_ocupantes):
-                datos = {
-                    "Mes": month,
-                    "Año": year,
-                    "Hotel": hotel,
-                    "Estación": season,
-                    "Dias de estancia": dias_estancia,
-                    "Dia inicio": dia_inicio,
-                    "id_huesped": f"{hotel_code}_{year:04d}{month:02d}_{id_huesped_counter:06d}",
-                    "id_habitacion": id_habitacion_str,
-                    "ocupacion_habitacion": n_ocupantes
-                }
-
-                # Añadir variables compartidas (se copian iguales para todos los ocupantes)
-                datos.update(valores_compartidos)
-
-                # Generar variables individuales (excluyendo 'ocupacion_habitacion')
-                for key, info in individuales.items():
+        with span('sample', inner=True) as sampled:
+            while pax_restante > 0:
+                # Determinar ocupación de habitación (se toma de dist)
+                opciones_keys = list(dist['ocupacion_habitacion']['probabilidades'].keys())
+                opciones_probs = list(dist['ocupacion_habitacion']['probabilidades'].values())
+                # np.random.choice con keys que son strings — convertir result a int
+                n_ocupantes = int(np.random.choice(opciones_keys, p=opciones_probs))
+                n_ocupantes = min(n_ocupantes, pax_restante)
+
+                # 2B. Generar variables compartidas PARA LA HABITACIÓN (una sola vez)
+                valores_compartidos = {}
+                for key, info in compartidas.items():
                     if 'condicion' in info:
                         cond_key = info['condicion']
-                        # priorizar los valores que ya están en datos (p.ej. nacionalidad compartida)
-                        if cond_key in datos:
-                            cond_value = datos[cond_key]
-                        else:
-                            # fallback a la fila (columnas base)
-                            cond_value = row[cond_key]
+                        # La condición se evalúa sobre la fila original o sobre valores previamente definidos de la habitación
+                        # Para condiciones basadas en variables que también pueden ser compartidas, preferimos row si no existe aún
+                        cond_value = row.get(cond_key) if cond_key in row.index else None
+                        # Si la condicion depende de una variable base del dataset, usamos row; si depende de otra compartida se debería
+                        # haber generado ya (pero en nuestro flujo compartidas se generan ahora)
+                        if cond_value is None:
+                            # ultimo recurso: usar valores_compartidos
+                            cond_value = valores_compartidos.get(cond_key)
+                        # ahora sample condicionada
                         probs_dict = info['probabilidades'][cond_value]
                         options = np.array(list(probs_dict.keys()))
                         probs = np.array(list(probs_dict.values()))
-                        datos[key] = np.random.choice(options, p=probs)
+                        valores_compartidos[key] = np.random.choice(options, p=probs)
                     else:
                         probs_dict = info['probabilidades']
                         options = np.array(list(probs_dict.keys()))
                         probs = np.array(list(probs_dict.values()))
-                        datos[key] = np.random.choice(options, p=probs)
+                        valores_compartidos[key] = np.random.choice(options, p=probs)
+
+                # === GENERAR dias_estancia y dia_inicio UNA vez por habitación ===
+                dias_estancia = np.random.randint(1, min(7, pax_restante // n_ocupantes) + 1) # Generar dias_estancia de forma que no sobrepase pax_restante
+                dia_inicio = np.random.randint(1, calendar.monthrange(year, month)[1] - dias_estancia + 2)
+
+                # 3. Crear cada huésped en la habitación
+                id_habitacion_str = f"{id_habitacion_counter:06d}"
+                for _ in range(n_ocupantes):
+                    datos = {
+                        "Mes": month,
+                        "Año": year,
+                        "Hotel": hotel,
+                        "Estación": season,
+                        "Dias de estancia": dias_estancia,
+                        "Dia inicio": dia_inicio,
+                        "id_huesped": f"{hotel_code}_{year:04d}{month:02d}_{id_huesped_counter:06d}",
+                        "id_habitacion": id_habitacion_str,
+                        "ocupacion_habitacion": n_ocupantes
+                    }
 
-                # Ajuste de consumo
-                adjustment = 0.0
-                for feature, effect_dict in rules.items():
-                    adjustment += effect_dict.get(datos.get(feature, ""), 0)
-                avg_consumption = consumption_per_pax * (1 + adjustment)
-                avg_consumption *= (1 + np.random.uniform(-noise, noise))
+                    # Añadir variables compartidas (se copian iguales para todos los ocupantes)
+                    datos.update(valores_compartidos)
 
-                datos['Consumo medio'] = avg_consumption
-                datos['Consumo total'] = avg_consumption * dias_estancia
+                    # Generar variables individuales (excluyendo 'ocupacion_habitacion')
+                    for key, info in individuales.items():
+                        if 'condicion' in info:
+                            cond_key = info['condicion']
+                            # priorizar los valores que ya están en datos (p.ej. nacionalidad compartida)
+                            if cond_key in datos:
+                                cond_value = datos[cond_key]
+                            else:
+                                # fallback a la fila (columnas base)
+                                cond_value = row[cond_key]
+                            probs_dict = info['probabilidades'][cond_value]
+                            options = np.array(list(probs_dict.keys()))
+                            probs = np.array(list(probs_dict.values()))
+                            datos[key] = np.random.choice(options, p=probs)
+                        else:
+                            probs_dict = info['probabilidades']
+                            options = np.array(list(probs_dict.keys()))
+                            probs = np.array(list(probs_dict.values()))
+                            datos[key] = np.random.choice(options, p=probs)
+
+                    # Ruido del consumo: se sortea aquí para conservar la secuencia aleatoria
+                    ruidos.append(np.random.uniform(-noise, noise))
+                    huespedes.append(datos)
+                    id_huesped_counter += 1
+
+                pax_restante -= n_ocupantes * dias_estancia
+                id_habitacion_counter += 1
 
-                huespedes.append(datos)
-                id_huesped_counter += 1
+            # Ajuste de consumo (un solo span por fila base, no uno por huésped)
+            with span('rules', rows=len(huespedes), inner=True):
+                for datos, ruido in zip(huespedes, ruidos):
+                    adjustment = 0.0
+                    for feature, effect_dict in rules.items():
+                        adjustment += effect_dict.get(datos.get(feature, ""), 0)
+                    avg_consumption = consumption_per_pax * (1 + adjustment)
+                    avg_consumption *= (1 + ruido)
 
-            pax_restante -= n_ocupantes * dias_estancia
-            id_habitacion_counter += 1
+                    datos['Consumo medio'] = avg_consumption
+                    datos['Consumo total'] = avg_consumption * datos['Dias de estancia']
 
-        # Concatenar todos los huéspedes generados para esta fila
-        df = pd.DataFrame(huespedes)
+            # Concatenar todos los huéspedes generados para esta fila
+            df = pd.DataFrame(huespedes)
+            sampled['rows'] = len(df)
 
         # --- Normalización de consumo ---
-        consumo_sintetico = df['Consumo total'].sum()
-        if consumo_sintetico > 0:
-            factor = consumo_total_real / consumo_sintetico
-
-            df['Consumo total'] *= factor
-            df['Consumo medio'] *= factor
-
-            factors_sum += factor
-            factors_sq_sum += factor ** 2
-            factors_min = min(factors_min, factor)
-            factors_max = max(factors_max, factor)
-            n_factors += 1
-        else:
-            print("[WARNING] Consumo sintético total es 0. No se puede normalizar.")
+        with span('normalization', rows=len(df), inner=True):
+            consumo_sintetico = df['Consumo total'].sum()
+            if consumo_sintetico > 0:
+                factor = consumo_total_real / consumo_sintetico
+
+                df['Consumo total'] *= factor
+                df['Consumo medio'] *= factor
+
+                factors.append(factor)
+            else:
+                print("[WARNING] Consumo sintético total es 0. No se puede normalizar.")
 
         chunks.append(df)
         break  # PARA PRUEBAS RÁPIDAS, QUITAR DESPUÉS
 
     forged_df = pd.concat(chunks, ignore_index=True)
 
-        # --- Estadísticas finales ---
+    normalization_info = summarize_normalization_factors(factors)
+
+    return forged_df, normalization_info
+
+
+def summarize_normalization_factors(factors):
+    """
+    Resume los factores de normalización aplicados por fila del dataset base.
+
+    Args:
+        factors (iterable): Factor consumo real / consumo sintético de cada fila normalizada.
+
+    Returns:
+        dict: Media, mínimo, máximo y desviación de los factores y su interpretación,
+              o {'normalization_applied': False} si no se normalizó ninguna fila.
+    """
+    factors = np.asarray(list(factors), dtype=float)
+    n_factors = len(factors)
+
+    # --- Estadísticas finales ---
     if n_factors > 0:
-        factor_mean = factors_sum / n_factors
-        factor_std = (factors_sq_sum / n_factors - factor_mean ** 2) ** 0.5
+        factor_mean = factors.sum() / n_factors
+        factor_std = max((factors ** 2).sum() / n_factors - factor_mean ** 2, 0.0) ** 0.5
 
         if factor_mean > 1.05:
             interpretation = "Rules tend to increase consumption (positive bias)"
@@ -209,10 +230,10 @@ def forge_daily_consumption(data, dist, rules, noise: float = 0.05):
 
         normalization_info = {
             "normalization_applied": True,
-            "factor_mean": round(factor_mean, 4),
-            "factor_min": round(factors_min, 4),
-            "factor_max": round(factors_max, 4),
-            "factor_std": round(factor_std, 4),
+            "factor_mean": round(float(factor_mean), 4),
+            "factor_min": round(float(factors.min()), 4),
+            "factor_max": round(float(factors.max()), 4),
+            "factor_std": round(float(factor_std), 4),
             "interpretation": interpretation
         }
     else:
@@ -220,4 +241,63 @@ def forge_daily_consumption(data, dist, rules, noise: float = 0.05):
             "normalization_applied": False
         }
 
-    return forged_df, normalization_info
\ No newline at end of file
+    return normalization_info
+
+
+# Claves que identifican la fila del dataset base de la que procede cada huésped
+BASE_ROW_KEYS = ['Hotel', 'Año', 'Mes']
+
+
+def rerule_daily_consumption(forged_df, rules, noise: float = 0.05):
+    """
+    Recalcula el consumo de un dataset diario ya forjado con unas reglas nuevas,
+    sin volver a muestrear ningún atributo de los huéspedes.
+
+    Solo cambian 'Consumo medio', 'Consumo total' y los factores de normalización.
+    Todo se calcula de forma vectorial sobre las columnas categóricas guardadas:
+      - Ajuste: suma de los efectos de `rules` según el valor de cada variable.
+      - Ruido: nuevo sorteo uniforme ±`noise` por huésped.
+      - Normalización: por fila del dataset base (Hotel, Año, Mes), para que el
+        consumo total vuelva a coincidir con el consumo real.
+
+    El consumo real de cada fila base es la suma del 'Consumo total' forjado (ya
+    normalizado) y el consumo por Pax es ese total entre la suma de 'Dias de estancia'
+    (igual a Pax por construcción), así que no hace falta el dataset base original.
+
+    Args:
+        forged_df (pd.DataFrame): Dataset diario forjado.
+        rules (dict): Nuevas reglas de ajuste, en formato {variable: {valor: ajuste}}.
+        noise (float, optional): Ruido aleatorio aplicado al consumo medio por huésped.
+
+    Returns:
+        tuple: (DataFrame con el consumo recalculado, normalization_info)
+    """
+    df = forged_df.copy()
+    groups = df.groupby(BASE_ROW_KEYS, sort=False).ngroup().to_numpy()
+
+    consumo_total_real = np.bincount(groups, weights=df['Consumo total'].to_numpy())
+    pax = np.bincount(groups, weights=df['Dias de estancia'].to_numpy())
+    consumption_per_pax = consumo_total_real / pax
+
+    # Ajuste de consumo
+    adjustment = np.zeros(len(df))
+    for feature, effect_dict in rules.items():
+        if feature in df.columns:
+            adjustment += df[feature].map(effect_dict).fillna(0).to_numpy(dtype=float)
+
+    avg_consumption = consumption_per_pax[groups] * (1 + adjustment)
+    avg_consumption *= 1 + np.random.uniform(-noise, noise, size=len(df))
+    total_consumption = avg_consumption * df['Dias de estancia'].to_numpy()
+
+    # --- Normalización de consumo ---
+    consumo_sintetico = np.bincount(groups, weights=total_consumption)
+    normalized = consumo_sintetico > 0
+    if not normalized.all():
+        print(f"[WARNING] Consumo sintético total es 0 en {int((~normalized).sum())} filas. No se pueden normalizar.")
+    factors = np.ones_like(consumo_sintetico)
+    factors[normalized] = consumo_total_real[normalized] / consumo_sintetico[normalized]
+
+    df['Consumo medio'] = avg_consumption * factors[groups]
+    df['Consumo total'] = total_consumption * factors[groups]
+
+    return df, summarize_normalization_factors(factors[normalized])
@@ -0,0 +1,219 @@
+import sys
+import numpy as np
+import pandas as pd
+
+from forge_hourly import HOURLY_COLUMNS
+from forge_vectorized import BASE_GUEST_COLUMNS, MAX_STAY_DAYS
+from utils.theorical_importance import calculate_marginals
+
+# Caracteres medios de un float escrito por `to_csv` (repr de 64 bits) y bytes de una referencia
+# a objeto en un DataFrame
+FLOAT_CSV_CHARS = 18
+OBJECT_POINTER_BYTES = 8
+
+
+def expected_room_counts(max_pax, occupancy):
+    """
+    Número esperado de habitaciones y de huéspedes (y varianza de los huéspedes) que
+    genera el forjado para un Pax dado.
+
+    El reparto de Pax en habitaciones es una cadena de Markov sobre el Pax pendiente R:
+    en cada paso se elige n ~ ocupación (recortado a R), una estancia uniforme en
+    1..min(7, R // n) y R baja en n × estancia. Las esperanzas (y el segundo momento
+    de los huéspedes, G(R) = n + G(R')) se obtienen por programación dinámica sobre
+    R = 0..max_pax, sin muestrear.
+
+    Args:
+        max_pax (int): Mayor Pax para el que se necesita la esperanza.
+        occupancy (dict): Probabilidades de 'ocupacion_habitacion' ({"1": p1, "2": p2, ...}).
+
+    Returns:
+        tuple: (habitaciones esperadas, huéspedes esperados, varianza de los huéspedes),
+        arrays indexados por Pax.
+    """
+    values = [int(k) for k in occupancy.keys()]
+    probs = np.array(list(occupancy.values()), dtype=float)
+    probs = probs / probs.sum()
+
+    rooms = np.zeros(max_pax + 1)
+    guests = np.zeros(max_pax + 1)
+    guests_sq = np.zeros(max_pax + 1)
+    for remaining in range(1, max_pax + 1):
+        expected_rooms = expected_guests = expected_guests_sq = 0.0
+        for n, p in zip(values, probs):
+            n = min(n, remaining)
+            stays = np.arange(1, min(MAX_STAY_DAYS, remaining // n) + 1)
+            following = remaining - n * stays
+            expected_rooms += p * (1 + rooms[following].mean())
+            expected_guests += p * (n + guests[following].mean())
+            expected_guests_sq += p * (n ** 2 + 2 * n * guests[following].mean() + guests_sq[following].mean())
+        rooms[remaining] = expected_rooms
+        guests[remaining] = expected_guests
+        guests_sq[remaining] = expected_guests_sq
+
+    return rooms, guests, np.clip(guests_sq - guests ** 2, 0, None)
+
+
+def _row_marginals(row, dist):
+    """Marginales esperados de las variables de `dist` para los huéspedes de una fila base."""
+    variables = [k for k in dist if k != 'ocupacion_habitacion']
+    return calculate_marginals(dist, row.to_frame().T, variables=variables)
+
+
+def _expected_adjustment(row, marginals, rules):
+    """E[ajuste] de `rules` para un huésped de la fila base, como en `forge_daily_consumption`."""
+    adjustment = 0.0
+    for feature, effect_dict in rules.items():
+        if feature in marginals:
+            adjustment += sum(p * effect_dict.get(value, 0) for value, p in marginals[feature].items())
+        elif feature in BASE_GUEST_COLUMNS:
+            adjustment += effect_dict.get(row[feature], 0)
+    return adjustment
+
+
+def _expected_value_sizes(probabilities):
+    """Bytes esperados de un valor de texto en CSV (UTF-8) y en memoria (objeto str de Python)."""
+    csv_bytes = sum(p * len(str(value).encode('utf-8')) for value, p in probabilities.items())
+    memory_bytes = sum(p * sys.getsizeof(str(value)) for value, p in probabilities.items())
+    return csv_bytes, memory_bytes
+
+
+def estimate_forge(data, dist, rules):
+    """
+    Estimación analítica (sin muestrear) del resultado de forjar `data`.
+
+    Para cada fila del dataset base calcula el número esperado de habitaciones y
+    huéspedes (ver `expected_room_counts`), los huésped-días (exactamente Pax, que es
+    también el número de filas horarias), los marginales esperados de cada variable
+    de `dist`, el ajuste esperado de `rules` y el 'Consumo medio' esperado antes y
+    después de la normalización. A partir de esos valores proyecta el tamaño de los
+    datasets diario y horario en memoria (DataFrame de pandas) y en disco (CSV; los
+    ZIP guardan el CSV sin comprimir, así que ocupan lo mismo).
+
+    El 'Consumo medio' esperado usa que el ajuste de cada huésped es independiente
+    de su estancia: E[consumo sintético] = consumo por Pax × (1 + E[ajuste]) × Pax, de
+    modo que el factor de normalización esperado es 1 / (1 + E[ajuste]).
+
+    Args:
+        data (pd.DataFrame): Dataset base con ['Pax', 'Consumo Kw Electricidad / Pax', 'Mes', 'Año', 'Estación', 'Hotel'].
+        dist (dict): Distribuciones normalizadas.
+        rules (dict): Reglas de ajuste del consumo medio por huésped.
+
+    Returns:
+        dict: {
+            'rows': DataFrame con los valores esperados por fila base,
+            'marginals': marginales esperados de cada variable (ponderados por huéspedes),
+            'totals': totales esperados de habitaciones, huéspedes y huésped-días,
+            'outputs': filas, bytes por fila, memoria (y pico aproximado) y disco
+                       de los datasets diario y horario
+        }
+    """
+    data = data.reset_index(drop=True)
+    occupancy = dist.get('ocupacion_habitacion', {'probabilidades': {"1": 1.0}})['probabilidades']
+    pax = data['Pax'].to_numpy(dtype=np.int64)
+    rooms, guests, _ = expected_room_counts(int(pax.max(initial=0)), occupancy)
+
+    rows = []
+    row_marginals = []
+    for _, row in data.iterrows():
+        marginals = _row_marginals(row, dist)
+        adjustment = _expected_adjustment(row, marginals, rules)
+        consumption_per_pax = row['Consumo Kw Electricidad / Pax']
+        row_marginals.append(marginals)
+        rows.append({
+            'Hotel': row['Hotel'],
+            'Año': row['Año'],
+            'Mes': row['Mes'],
+            'Pax': int(row['Pax']),
+            'expected_rooms': rooms[int(row['Pax'])],
+            'expected_guests': guests[int(row['Pax'])],
+            'guest_days': int(row['Pax']),
+            'expected_adjustment': adjustment,
+            'expected_factor': 1 / (1 + adjustment) if adjustment != -1 else np.nan,
+            'expected_consumo_medio_raw': consumption_per_pax * (1 + adjustment),
+            'expected_consumo_medio': consumption_per_pax,
+        })
+    rows_df = pd.DataFrame(rows)
+
+    # Marginales globales: media de los marginales por fila ponderada por huéspedes esperados
+    weights = rows_df['expected_guests'].to_numpy() if len(rows_df) else np.array([])
+    weights = weights / weights.sum() if weights.sum() > 0 else weights
+    global_marginals = {}
+    for marginals, w in zip(row_marginals, weights):
+        for variable, probabilities in marginals.items():
+            target = global_marginals.setdefault(variable, {})
+            for value, p in probabilities.items():
+                target[str(value)] = target.get(str(value), 0.0) + w * p
+
+    n_guests = float(rows_df['expected_guests'].sum()) if len(rows_df) else 0.0
+    n_days = int(rows_df['guest_days'].sum()) if len(rows_df) else 0
+
+    return {
+        'rows': rows_df,
+        'marginals': global_marginals,
+        'totals': {
+            'base_rows': len(rows_df),
+            'expected_rooms': float(rows_df['expected_rooms'].sum()) if len(rows_df) else 0.0,
+            'expected_guests': n_guests,
+            'guest_days': n_days,
+        },
+        'outputs': _project_outputs(data, global_marginals, n_guests, n_days),
+    }
+
+
+def _project_outputs(data, marginals, n_guests, n_days):
+    """Bytes por fila y tamaño total esperado de los datasets diario y horario."""
+    # Columnas de texto copiadas del dataset base (mismo peso que su frecuencia en los datos)
+    base_text = {}
+    for column in ['Hotel', 'Estación']:
+        frequencies = data[column].astype(str).value_counts(normalize=True).to_dict()
+        base_text[column] = _expected_value_sizes(frequencies)
+
+    hotel_code_chars = np.mean([len(''.join(w[0] for w in h.split())) for h in data['Hotel'].astype(str)]) if len(data) else 0
+    id_guest = f"{'X' * int(round(hotel_code_chars))}_YYYYMM_000000"
+    id_room = "000000"
+
+    def text_size(value):
+        return len(value.encode('utf-8')), sys.getsizeof(value)
+
+    # --- Diario: Mes, Año, Hotel, Estación, Dias de estancia, Dia inicio, id_huesped,
+    #     id_habitacion, ocupacion_habitacion, variables de dist, Consumo medio, Consumo total
+    daily_text = [base_text['Hotel'], base_text['Estación'], text_size(id_guest), text_size(id_room)]
+    daily_text += [_expected_value_sizes(probabilities) for probabilities in marginals.values()]
+    daily_numeric_chars = [2, 4, 1, 2, 1] + [FLOAT_CSV_CHARS] * 2
+    daily_csv = sum(c for c, _ in daily_text) + sum(daily_numeric_chars)
+    daily_csv += len(daily_text) + len(daily_numeric_chars)  # separadores y salto de línea
+    daily_memory = sum(OBJECT_POINTER_BYTES + m for _, m in daily_text) + 8 * len(daily_numeric_chars)
+
+    # --- Horario: id_huesped, id_habitacion, dia, mes, año, Hotel, profile_id,
+    #     Consumo diario, h0-h23
+    hourly_text = [text_size(id_guest), base_text['Hotel'], text_size('evening_active')]
+    hourly_numeric_chars = [6, 2, 2, 4] + [FLOAT_CSV_CHARS] * (1 + len(HOURLY_COLUMNS))
+    hourly_csv = sum(c for c, _ in hourly_text) + sum(hourly_numeric_chars)
+    hourly_csv += len(hourly_text) + len(hourly_numeric_chars)
+    hourly_memory = sum(OBJECT_POINTER_BYTES + m for _, m in hourly_text) + 8 * len(hourly_numeric_chars)
+    # `forge_hourly_consumption` acumula un dict por fila (con sus floats) antes de crear el DataFrame
+    row_dict = {f"c{i}": 0.0 for i in range(len(hourly_text) + len(hourly_numeric_chars))}
+    hourly_row_objects = sys.getsizeof(row_dict) + sys.getsizeof(0.0) * (1 + len(HOURLY_COLUMNS))
+
+    return {
+        'daily': {
+            'rows': n_guests,
+            'csv_bytes_per_row': daily_csv,
+            'memory_bytes_per_row': daily_memory,
+            'csv_bytes': n_guests * daily_csv,
+            'zip_bytes': n_guests * daily_csv,
+            'memory_bytes': n_guests * daily_memory,
+            # concat de los bloques por fila base: se duplica el DataFrame
+            'peak_memory_bytes': 2 * n_guests * daily_memory,
+        },
+        'hourly': {
+            'rows': n_days,
+            'csv_bytes_per_row': hourly_csv,
+            'memory_bytes_per_row': hourly_memory,
+            'csv_bytes': n_days * hourly_csv,
+            'zip_bytes': n_days * hourly_csv,
+            'memory_bytes': n_days * hourly_memory,
+            'peak_memory_bytes': n_days * (hourly_memory + hourly_row_objects),
+        },
+    }
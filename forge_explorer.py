@@ -0,0 +1,205 @@
+import numpy as np
+import pandas as pd
+
+from forge_hourly import HOURLY_COLUMNS
+from utils.io import daily_zip_columns, hourly_zip_columns, iter_daily_zip_chunks, iter_hourly_zip_chunks
+
+# Columnas del dataset diario que no son categorías de huésped
+DAILY_NON_CATEGORICAL = ['Hotel', 'Año', 'Mes', 'Dias de estancia', 'Dia inicio', 'id_huesped', 'id_habitacion',
+                         'Consumo medio', 'Consumo total', 'replicate']
+
+
+def lttb(x, y, n_out):
+    """
+    Largest-Triangle-Three-Buckets: índices de `n_out` puntos de la serie (x, y) que
+    conservan su forma visual (picos y valles) para dibujarla sin enviar todos los puntos.
+
+    El primer y el último punto se mantienen; el resto se reparte en `n_out - 2`
+    cubetas y de cada una se elige el punto que forma el triángulo de mayor área con
+    el punto elegido en la cubeta anterior y la media de la cubeta siguiente.
+
+    Args:
+        x (array-like): Abscisas crecientes (numéricas o fechas).
+        y (array-like): Valores.
+        n_out (int): Número de puntos de salida.
+
+    Returns:
+        np.ndarray: Índices de los puntos elegidos, en orden.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x)
+    x = (x.astype('datetime64[ns]').astype(np.int64) if np.issubdtype(x.dtype, np.datetime64) else x).astype(float)
+    y = np.asarray(y, dtype=float)
+
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    a = 0
+    for bucket in range(n_out - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # Media de la cubeta siguiente (el último punto para la última cubeta)
+        next_start, next_end = (edges[bucket + 1], edges[bucket + 2]) if bucket + 2 < len(edges) else (n - 1, n)
+        avg_x, avg_y = x[next_start:next_end].mean(), y[next_start:next_end].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(np.argmax(area))
+        indices[bucket + 1] = a
+    return indices
+
+
+def downsample(df, x, y, n_out, by=None):
+    """Reduce cada serie de `df` (una por valor de `by`) a `n_out` puntos con `lttb`."""
+    if by is None:
+        return df.iloc[lttb(df[x].to_numpy(), df[y].to_numpy(), n_out)]
+    return pd.concat([group.iloc[lttb(group[x].to_numpy(), group[y].to_numpy(), n_out)]
+                      for _, group in df.groupby(by, sort=False)], ignore_index=True)
+
+
+def _dates(year, month, day):
+    """Fecha de (año, mes, día); el día puede pasar del fin de mes (estancias que cruzan meses)."""
+    first = pd.to_datetime(pd.DataFrame({'year': year, 'month': month, 'day': 1}))
+    return first + pd.to_timedelta(np.asarray(day) - 1, unit='D')
+
+
+def _histogram(chunks, column, bins, value_range):
+    counts = np.zeros(bins, dtype=np.int64)
+    edges = np.linspace(*value_range, bins + 1) if value_range[1] > value_range[0] else np.linspace(value_range[0] - 0.5, value_range[0] + 0.5, bins + 1)
+    for chunk in chunks:
+        counts += np.histogram(chunk[column].to_numpy(dtype=float), bins=edges)[0]
+    return pd.DataFrame({'Desde': edges[:-1], 'Hasta': edges[1:], 'Frecuencia': counts})
+
+
+def _combine(partials, keys, sums):
+    """Suma por `keys` de los agregados parciales de cada bloque."""
+    if not partials:
+        return pd.DataFrame(columns=keys + sums)
+    return pd.concat(partials).groupby(keys, sort=True)[sums].sum().reset_index()
+
+
+def daily_categoricals(folder, index, replicate=None):
+    """Columnas categóricas (variables de huésped) de un ZIP diario."""
+    return [c for c in daily_zip_columns(folder, index, replicate) if c not in DAILY_NON_CATEGORICAL]
+
+
+def explore_daily(folder, index, replicate=None, categoricals=None, bins=50, chunksize=500_000):
+    """
+    Agregados de un ZIP diario calculados por bloques, sin cargar el dataset entero:
+    solo se leen las columnas necesarias (`usecols`).
+
+    Args:
+        folder (str): Carpeta de los ZIP diarios.
+        index (int): Índice del ZIP.
+        replicate (int, optional): Réplica de un ZIP particionado.
+        categoricals (list, optional): Variables con marginales. Por defecto, todas.
+        bins (int): Cubetas del histograma de 'Consumo medio'.
+        chunksize (int): Filas por bloque.
+
+    Returns:
+        dict: DataFrames 'por_hotel' (huéspedes y consumo por hotel), 'por_dia' (huéspedes
+        presentes y consumo por hotel y fecha, repartiendo 'Consumo total' entre los días
+        de estancia), 'histograma' ('Consumo medio') y 'marginales' (huéspedes, su
+        proporción y 'Consumo medio' por categoría), más 'filas'.
+    """
+    categoricals = daily_categoricals(folder, index, replicate) if categoricals is None else list(categoricals)
+    usecols = ['Hotel', 'Año', 'Mes', 'Dia inicio', 'Dias de estancia', 'Consumo medio', 'Consumo total']
+    usecols += [c for c in categoricals if c not in usecols]
+
+    hotels, days, marginals = [], [], []
+    rows, low, high = 0, np.inf, -np.inf
+    for chunk in iter_daily_zip_chunks(folder, index, chunksize=chunksize, usecols=usecols, replicate=replicate):
+        rows += len(chunk)
+        low, high = min(low, chunk['Consumo medio'].min()), max(high, chunk['Consumo medio'].max())
+
+        chunk['Huespedes'] = 1
+        hotels.append(chunk.groupby('Hotel')[['Huespedes', 'Consumo total', 'Consumo medio']].sum())
+
+        # Cada huésped aporta a cada día de su estancia 1 huésped y Consumo total / días
+        stay = chunk['Dias de estancia'].to_numpy(dtype=np.int64)
+        repeat = np.repeat(np.arange(len(chunk)), stay)
+        offset = np.arange(len(repeat)) - np.repeat(np.cumsum(stay) - stay, stay)
+        expanded = pd.DataFrame({
+            'Hotel': chunk['Hotel'].to_numpy()[repeat],
+            'Fecha': _dates(chunk['Año'].to_numpy()[repeat], chunk['Mes'].to_numpy()[repeat],
+                            chunk['Dia inicio'].to_numpy()[repeat] + offset),
+            'Huespedes': 1,
+            'Consumo diario': (chunk['Consumo total'].to_numpy(dtype=float) / stay)[repeat],
+        })
+        days.append(expanded.groupby(['Hotel', 'Fecha'])[['Huespedes', 'Consumo diario']].sum())
+
+        for column in categoricals:
+            counts = chunk.groupby(column)[['Huespedes', 'Consumo medio']].sum()
+            marginals.append(counts.set_index(pd.MultiIndex.from_product([[column], counts.index.astype(str)],
+                                                                         names=['Variable', 'Categoria'])))
+
+    by_hotel = _combine([h.reset_index() for h in hotels], ['Hotel'], ['Huespedes', 'Consumo total', 'Consumo medio'])
+    by_hotel['Consumo medio'] = by_hotel['Consumo medio'] / by_hotel['Huespedes']
+
+    by_marginal = _combine([m.reset_index() for m in marginals], ['Variable', 'Categoria'], ['Huespedes', 'Consumo medio'])
+    by_marginal['Consumo medio'] = by_marginal['Consumo medio'] / by_marginal['Huespedes']
+    by_marginal['Proporcion'] = by_marginal['Huespedes'] / by_marginal.groupby('Variable')['Huespedes'].transform('sum')
+
+    histogram = _histogram(
+        iter_daily_zip_chunks(folder, index, chunksize=chunksize, usecols=['Consumo medio'], replicate=replicate),
+        'Consumo medio', bins, (low, high)
+    ) if rows else pd.DataFrame(columns=['Desde', 'Hasta', 'Frecuencia'])
+
+    return {
+        'filas': rows,
+        'por_hotel': by_hotel,
+        'por_dia': _combine([d.reset_index() for d in days], ['Hotel', 'Fecha'], ['Huespedes', 'Consumo diario']),
+        'histograma': histogram,
+        'marginales': by_marginal,
+    }
+
+
+def explore_hourly(folder, index, bins=50, chunksize=500_000):
+    """
+    Agregados de un ZIP horario calculados por bloques, leyendo solo las columnas necesarias.
+
+    Returns:
+        dict: DataFrames 'por_hotel' (filas huésped-día y consumo), 'por_hora' (consumo
+        total y medio por hora del día y perfil), 'serie' (consumo por hotel y hora del
+        calendario, para reducir con `downsample`) e 'histograma' ('Consumo diario'),
+        más 'filas'.
+    """
+    columns = hourly_zip_columns(folder, index)
+    hours = [h for h in HOURLY_COLUMNS if h in columns]
+    usecols = ['Hotel', 'año', 'mes', 'dia', 'profile_id', 'Consumo diario'] + hours
+
+    hotels, profiles, series = [], [], []
+    rows, low, high = 0, np.inf, -np.inf
+    for chunk in iter_hourly_zip_chunks(folder, index, chunksize=chunksize, usecols=usecols):
+        rows += len(chunk)
+        low, high = min(low, chunk['Consumo diario'].min()), max(high, chunk['Consumo diario'].max())
+        chunk['Filas'] = 1
+        chunk['Fecha'] = _dates(chunk['año'].to_numpy(), chunk['mes'].to_numpy(), chunk['dia'].to_numpy())
+
+        hotels.append(chunk.groupby('Hotel')[['Filas', 'Consumo diario']].sum().reset_index())
+        profiles.append(chunk.groupby('profile_id')[['Filas'] + hours].sum().reset_index())
+        series.append(chunk.groupby(['Hotel', 'Fecha'])[hours].sum().reset_index())
+
+    by_profile = _combine(profiles, ['profile_id'], ['Filas'] + hours)
+    by_hour = by_profile.melt(id_vars=['profile_id', 'Filas'], value_vars=hours, var_name='Hora', value_name='Consumo')
+    by_hour['Hora'] = by_hour['Hora'].str[1:].astype(int)
+    by_hour['Consumo medio'] = by_hour['Consumo'] / by_hour['Filas']
+    by_hour = by_hour.drop(columns='Filas').sort_values(['profile_id', 'Hora'], ignore_index=True)
+
+    # Serie horaria del calendario: una fila por hotel, fecha y hora
+    by_day = _combine(series, ['Hotel', 'Fecha'], hours)
+    serie = by_day.melt(id_vars=['Hotel', 'Fecha'], value_vars=hours, var_name='Hora', value_name='Consumo')
+    serie['Instante'] = serie['Fecha'] + pd.to_timedelta(serie['Hora'].str[1:].astype(int), unit='h')
+    serie = serie[['Hotel', 'Instante', 'Consumo']].sort_values(['Hotel', 'Instante'], ignore_index=True)
+
+    histogram = _histogram(
+        iter_hourly_zip_chunks(folder, index, chunksize=chunksize, usecols=['Consumo diario']),
+        'Consumo diario', bins, (low, high)
+    ) if rows else pd.DataFrame(columns=['Desde', 'Hasta', 'Frecuencia'])
+
+    return {
+        'filas': rows,
+        'por_hotel': _combine(hotels, ['Hotel'], ['Filas', 'Consumo diario']),
+        'por_hora': by_hour,
+        'serie': serie,
+        'histograma': histogram,
+    }
@@ -1,6 +1,10 @@
 import pandas as pd
 import numpy as np
 
+from utils.instrumentation import span
+
+HOURLY_COLUMNS = [f'h{h}' for h in range(24)]
+
 
 def forge_hourly_consumption(
     forged_daily_df: pd.DataFrame,
@@ -24,7 +28,10 @@ def forge_hourly_consumption(
 
     Returns:
         pd.DataFrame: Hourly dataset with one row per guest per day and
-        columns h0–h23.
+        columns h0–h23. Each row also keeps its daily consumption
+        ('Consumo diario') and 'profile_id', so the profiles can later be
+        swapped with `reprofile_hourly_consumption` without redrawing the
+        daily split.
     """
 
     hourly_rows = []
@@ -37,46 +44,97 @@ def forge_hourly_consumption(
             profile_ids, size=len(forged_daily_df)
         )
 
-    for _, row in forged_daily_df.iterrows():
+    with span('expand', rows=len(forged_daily_df)):
+        for _, row in forged_daily_df.iterrows():
 
-        stay_days = int(row['Dias de estancia'])
-        total_consumption = row['Consumo total']
+            stay_days = int(row['Dias de estancia'])
+            total_consumption = row['Consumo total']
 
-        # Get hourly profile
-        profile = np.array(
-            hourly_profiles[row['profile_id']]['probabilidades'],
-            dtype=float
-        )
+            # Get hourly profile
+            profile = np.array(
+                hourly_profiles[row['profile_id']]['probabilidades'],
+                dtype=float
+            )
 
-        # Safety check (should already be normalized)
-        profile = profile / profile.sum()
+            # Safety check (should already be normalized)
+            profile = profile / profile.sum()
 
-        # Distribute total consumption across days with small variability
-        daily_weights = np.ones(stay_days)
-        daily_noise = np.random.uniform(
-            -noise_daily, noise_daily, size=stay_days
-        )
-        daily_weights = daily_weights * (1 + daily_noise)
-        daily_weights = daily_weights / daily_weights.sum()
+            # Distribute total consumption across days with small variability
+            daily_weights = np.ones(stay_days)
+            daily_noise = np.random.uniform(
+                -noise_daily, noise_daily, size=stay_days
+            )
+            daily_weights = daily_weights * (1 + daily_noise)
+            daily_weights = daily_weights / daily_weights.sum()
+
+            daily_consumptions = total_consumption * daily_weights
+
+            for day_offset, daily_consumption in enumerate(daily_consumptions):
+
+                hourly_consumption = daily_consumption * profile
+
+                hourly_row = {
+                    'id_huesped': row['id_huesped'],
+                    'id_habitacion': row['id_habitacion'],
+                    'dia': int(row['Dia inicio']) + day_offset,
+                    'mes': row['Mes'],
+                    'año': row['Año'],
+                    'Hotel': row['Hotel'],
+                    'profile_id': row['profile_id'],
+                    'Consumo diario': daily_consumption,
+                }
+
+                for h in range(24):
+                    hourly_row[f'h{h}'] = hourly_consumption[h]
+
+                hourly_rows.append(hourly_row)
+
+    with span('frame', rows=len(hourly_rows)):
+        hourly_df = pd.DataFrame(hourly_rows)
+    return hourly_df
 
-        daily_consumptions = total_consumption * daily_weights
 
-        for day_offset, daily_consumption in enumerate(daily_consumptions):
+def profile_matrix(hourly_profiles: dict):
+    """
+    Stack the hourly profiles into a (n_profiles, 24) matrix of normalized rows.
+
+    Returns:
+        tuple: (list of profile ids in row order, np.ndarray matrix)
+    """
+    profile_ids = list(hourly_profiles.keys())
+    matrix = np.array([hourly_profiles[p]['probabilidades'] for p in profile_ids], dtype=float)
+    return profile_ids, matrix / matrix.sum(axis=1, keepdims=True)
+
 
-            hourly_consumption = daily_consumption * profile
+def reprofile_hourly_consumption(hourly_df: pd.DataFrame, hourly_profiles: dict) -> pd.DataFrame:
+    """
+    Recompute the hourly columns of an hourly dataset with new profiles.
 
-            hourly_row = {
-                'id_huesped': row['id_huesped'],
-                'id_habitacion': row['id_habitacion'],
-                'dia': int(row['Dia inicio']) + day_offset,
-                'mes': row['Mes'],
-                'año': row['Año'],
-                'Hotel': row['Hotel'],
-            }
+    The daily consumption of every guest-day ('Consumo diario') and the profile
+    assigned to each guest ('profile_id') are kept, so only h0–h23 change: the
+    new values are a single gather-multiply of the daily consumption with the
+    row of the profile matrix selected by each row's profile.
+
+    Args:
+        hourly_df (pd.DataFrame): Hourly dataset generated by `forge_hourly_consumption`.
+        hourly_profiles (dict): New hourly profiles. Must contain every
+            'profile_id' present in `hourly_df`.
+
+    Returns:
+        pd.DataFrame: Copy of `hourly_df` with the new h0–h23 columns.
+    """
+    for column in ['profile_id', 'Consumo diario']:
+        if column not in hourly_df.columns:
+            raise ValueError(f"Hourly dataset has no '{column}' column; regenerate it with forge_hourly.")
 
-            for h in range(24):
-                hourly_row[f'h{h}'] = hourly_consumption[h]
+    profile_ids, matrix = profile_matrix(hourly_profiles)
+    codes = pd.Categorical(hourly_df['profile_id'], categories=profile_ids).codes
+    if (codes < 0).any():
+        missing = sorted(hourly_df.loc[codes < 0, 'profile_id'].unique())
+        raise KeyError(f"Hourly profiles {missing} are not defined in the new profiles.")
 
-            hourly_rows.append(hourly_row)
+    daily = hourly_df['Consumo diario'].to_numpy(dtype=float)
 
-    return pd.DataFrame(hourly_rows)
\ No newline at end of file
+    reprofiled_df = hourly_df.copy()
+    reprofiled_df[HOURLY_COLUMNS] = daily[:, None] * matrix[codes]
+    return reprofiled_df
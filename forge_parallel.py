@@ -0,0 +1,210 @@
+from multiprocessing import Pool, cpu_count, shared_memory
+
+import numpy as np
+from tqdm import tqdm
+
+from forge_daily import summarize_normalization_factors
+from forge_estimate import expected_room_counts
+from forge_vectorized import (compile_distribution, encode_base, rule_effects, sample_guest_codes,
+                              tile_structures, guest_consumption, guests_frame)
+
+# Margen de los buffers de salida sobre el número esperado de huéspedes (en desviaciones típicas)
+CAPACITY_SIGMAS = 8
+
+# Estado de cada proceso (se adjunta una sola vez en el initializer)
+_segments = []
+_tables = None
+_outputs = None
+_plan = None
+_options = None
+
+
+def _share(arrays):
+    """
+    Copia `arrays` en segmentos de `multiprocessing.shared_memory`.
+
+    Returns:
+        tuple: (segmentos creados, spec {clave: (nombre, forma, dtype)} para `_attach`)
+    """
+    segments, spec = [], {}
+    for key, values in arrays.items():
+        values = np.ascontiguousarray(values)
+        segment = shared_memory.SharedMemory(create=True, size=max(values.nbytes, 1))
+        np.ndarray(values.shape, dtype=values.dtype, buffer=segment.buf)[...] = values
+        segments.append(segment)
+        spec[key] = (segment.name, values.shape, values.dtype.str)
+    return segments, spec
+
+
+def _allocate(shapes):
+    """Reserva buffers vacíos en memoria compartida: {clave: (forma, dtype)}."""
+    return _share({key: np.zeros(shape, dtype=dtype) for key, (shape, dtype) in shapes.items()})
+
+
+def _attach(spec):
+    """Vistas numpy sobre los segmentos compartidos descritos en `spec` (sin copiar)."""
+    views = {}
+    for key, (name, shape, dtype) in spec.items():
+        segment = shared_memory.SharedMemory(name=name)
+        _segments.append(segment)
+        views[key] = np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+    return views
+
+
+def _init_worker(table_spec, output_spec, plan, options):
+    global _tables, _outputs, _plan, _options
+    _tables = _attach(table_spec)
+    _outputs = _attach(output_spec)
+    _options = options
+
+    # El plan viaja sin sus matrices: las CDF se leen de la memoria compartida
+    _plan = {
+        'occupancy': (_tables['occupancy/values'], _tables['occupancy/cdf']),
+        'variables': [{**entry, 'cdf': _tables[f"cdf/{entry['name']}"]} for entry in plan['variables']],
+    }
+
+
+def _forge_task(task):
+    """
+    Forja las filas base [row_start, row_end) y las estructuras [structure_start,
+    structure_end) y escribe las columnas en los buffers compartidos a partir de
+    `offset`. Solo devuelve el número de huéspedes y los factores de normalización.
+    """
+    task_id, row_start, row_end, structure_start, structure_end, offset, capacity, seed = task
+    rng = np.random.default_rng(seed)
+    n_structures = structure_end - structure_start
+
+    base = {key[5:]: values[row_start:row_end] for key, values in _tables.items() if key.startswith('base/')}
+    effects = {key[7:]: values for key, values in _tables.items() if key.startswith('effect/')}
+
+    if _options['resample_guests']:
+        guests = sample_guest_codes(base, _plan, n_structures, rng)
+    else:
+        guests = tile_structures(sample_guest_codes(base, _plan, 1, rng), n_structures)
+
+    guests['Consumo medio'], guests['Consumo total'], factors = guest_consumption(
+        guests, base, effects, _options['noise'], n_structures, rng
+    )
+    guests['base_row'] = guests['base_row'] + row_start
+    guests['structure'] = guests['structure'] + structure_start
+
+    n_guests = len(guests['base_row'])
+    if n_guests > capacity:
+        raise RuntimeError(f"Task {task_id} generated {n_guests} guests for a buffer of {capacity}.")
+    for key, values in _outputs.items():
+        values[offset:offset + n_guests] = guests[key]
+
+    return task_id, n_guests, factors
+
+
+def _task_capacity(pax, moments, n_structures, independent=True):
+    """
+    Huéspedes que caben en el buffer de una tarea: media + CAPACITY_SIGMAS desviaciones
+    típicas según `expected_room_counts`, sin superar Pax (cada huésped está al menos un día).
+    Si las estructuras repiten los mismos huéspedes (`independent=False`), sus
+    desviaciones se suman en lugar de sus varianzas.
+    """
+    _, mean, var = moments
+    expected = n_structures * mean[pax].sum()
+    sigma = np.sqrt(var[pax].sum()) * (np.sqrt(n_structures) if independent else n_structures)
+    return int(min(np.ceil(expected + CAPACITY_SIGMAS * sigma) + 16, n_structures * pax.sum()))
+
+
+def forge_daily_parallel(data, dist, rules, noise: float = 0.05, n_replicates: int = 1,
+                         resample_guests: bool = True, seed=None, n_jobs=None, tasks_per_job=4):
+    """
+    Versión multiproceso de `forge_daily_replicates` sin serialización en el camino crítico.
+
+    El dataset base codificado (`encode_base`), las tablas de muestreo compiladas
+    (CDF de cada variable) y los ajustes de las reglas se copian una sola vez en
+    `multiprocessing.shared_memory`. Los procesos se adjuntan a esos segmentos en el
+    initializer y cada tarea (un bloque de filas base × réplicas) escribe sus columnas
+    codificadas directamente en buffers de salida compartidos, en un offset reservado
+    a partir del número esperado de huéspedes (`expected_room_counts`). Por la tubería
+    solo viajan la descripción de la tarea y sus factores de normalización; el
+    DataFrame final se decodifica una vez en el proceso principal.
+
+    Args:
+        data (pd.DataFrame): Dataset base (ver `forge_daily_replicates`).
+        dist (dict): Distribuciones normalizadas.
+        rules (dict): Reglas de ajuste del consumo medio por huésped.
+        noise (float, optional): Ruido aleatorio aplicado al consumo medio por huésped.
+        n_replicates (int): Número de réplicas K.
+        resample_guests (bool): Si se muestrean huéspedes distintos en cada réplica.
+        seed (int, optional): Semilla; cada tarea usa un hijo independiente de la semilla.
+        n_jobs (int, optional): Procesos. Por defecto, `cpu_count()`.
+        tasks_per_job (int): Tareas por proceso, para equilibrar la carga.
+
+    Returns:
+        tuple: (DataFrame con las columnas de `forge_daily_replicates`, normalization_info)
+    """
+    n_jobs = n_jobs or cpu_count()
+    data = data.reset_index(drop=True)
+    plan = compile_distribution(dist)
+    base = encode_base(data, plan, rules)
+
+    occupancy = dist.get('ocupacion_habitacion', {'probabilidades': {"1": 1.0}})['probabilidades']
+    moments = expected_room_counts(int(base['pax'].max(initial=0)), occupancy)
+
+    # --- Tareas: bloques de filas base × bloques de réplicas ---
+    n_tasks = n_jobs * tasks_per_job
+    structure_blocks = min(n_replicates, n_tasks) if resample_guests else 1
+    row_blocks = max(1, min(len(data), n_tasks // structure_blocks))
+    row_edges = np.linspace(0, len(data), row_blocks + 1).astype(int)
+    structure_edges = np.linspace(0, n_replicates, structure_blocks + 1).astype(int)
+    seeds = np.random.SeedSequence(seed).spawn(row_blocks * structure_blocks)
+
+    tasks, offset = [], 0
+    for r0, r1 in zip(row_edges[:-1], row_edges[1:]):
+        for s0, s1 in zip(structure_edges[:-1], structure_edges[1:]):
+            capacity = _task_capacity(base['pax'][r0:r1], moments, s1 - s0, independent=resample_guests)
+            tasks.append((len(tasks), r0, r1, s0, s1, offset, capacity, seeds[len(tasks)]))
+            offset += capacity
+
+    # --- Memoria compartida: tablas de entrada y buffers de salida ---
+    tables = {f"base/{key}": values for key, values in base.items()}
+    tables['occupancy/values'], tables['occupancy/cdf'] = plan['occupancy']
+    tables.update({f"cdf/{entry['name']}": entry['cdf'] for entry in plan['variables']})
+    tables.update({f"effect/{name}": effect for name, effect in rule_effects(plan, rules).items()})
+
+    code_dtype = np.int16
+    output_shapes = {
+        'structure': ((offset,), np.int32), 'base_row': ((offset,), np.int32),
+        'Dias de estancia': ((offset,), np.int8), 'Dia inicio': ((offset,), np.int8),
+        'ocupacion_habitacion': ((offset,), np.int16),
+        'guest_counter': ((offset,), np.int32), 'room_counter': ((offset,), np.int32),
+        'Consumo medio': ((offset,), np.float64), 'Consumo total': ((offset,), np.float64),
+        **{f"codes/{entry['name']}": ((offset,), code_dtype) for entry in plan['variables']},
+    }
+
+    plan_meta = {'variables': [{k: v for k, v in entry.items() if k != 'cdf'} for entry in plan['variables']]}
+    options = {'noise': noise, 'resample_guests': resample_guests}
+
+    table_segments, table_spec = _share(tables)
+    output_segments, output_spec = _allocate(output_shapes)
+    try:
+        counts, factors = {}, {}
+        with Pool(processes=n_jobs, initializer=_init_worker,
+                  initargs=(table_spec, output_spec, plan_meta, options)) as pool:
+            for task_id, n_guests, task_factors in tqdm(pool.imap_unordered(_forge_task, tasks),
+                                                        total=len(tasks), desc="Forge tasks"):
+                counts[task_id] = n_guests
+                factors[task_id] = task_factors
+
+        # --- Compactar los tramos escritos y ordenar por (réplica, fila base) ---
+        outputs = {key: np.ndarray(shape, dtype=np.dtype(dtype), buffer=segment.buf)
+                   for segment, (key, (_, shape, dtype)) in zip(output_segments, output_spec.items())}
+        valid = np.concatenate([np.arange(t[5], t[5] + counts[t[0]]) for t in tasks])
+        guests = {key: values[valid].astype(np.int64 if values.dtype.kind == 'i' else values.dtype)
+                  for key, values in outputs.items()}
+        del outputs
+    finally:
+        for segment in table_segments + output_segments:
+            segment.close()
+            segment.unlink()
+
+    order = np.lexsort((guests['base_row'], guests['structure']))
+    guests = {key: values[order] for key, values in guests.items()}
+
+    all_factors = np.concatenate([factors[t[0]] for t in tasks]) if tasks else np.array([])
+    return guests_frame(data, plan, guests), summarize_normalization_factors(all_factors)
@@ -0,0 +1,446 @@
+import argparse
+import json
+import os
+import queue
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from concurrent.futures import Future
+from datetime import datetime
+from http.client import HTTPConnection
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from forge_daily import summarize_normalization_factors
+from forge_vectorized import compile_distribution, encode_base, rule_effects, forge_encoded
+from utils.aux import normalize_probabilities
+from utils.io import save_daily_to_zip
+from utils.paths import DATASET_PATH, DIST_DAILY_PATH, RULES_PATH, FORGED_DAILY_PATH
+
+# Parámetros de una solicitud de forjado y sus valores por defecto
+REQUEST_DEFAULTS = {
+    'data': 'default.csv', 'dist': 'default.json', 'rules': 'default.json',
+    'hotel': None, 'year': None, 'month': None,
+    'noise': 0.05, 'seed': None, 'replicates': 1, 'shared_guests': False, 'format': 'csv',
+}
+FORMATS = ['csv', 'json', 'zip']
+
+# Filas por bloque de la respuesta CSV en streaming
+CSV_CHUNK_ROWS = 50_000
+
+# Conexiones pendientes de aceptar (el valor por defecto de socketserver, 5, corta ráfagas concurrentes)
+LISTEN_BACKLOG = 256
+
+
+def parse_request(payload):
+    """
+    Validate a forge request and fill in the defaults of `REQUEST_DEFAULTS`.
+
+    `hotel`, `year` and `month` select the base rows to forge (a value or a list
+    of values; all rows when omitted). The rest mirror the `main.py
+    forge_daily_replicates` options.
+
+    Raises:
+        ValueError: Unknown parameters or invalid values.
+    """
+    unknown = set(payload) - set(REQUEST_DEFAULTS)
+    if unknown:
+        raise ValueError(f"Unknown request parameters: {sorted(unknown)}.")
+    request = {**REQUEST_DEFAULTS, **{k: v for k, v in payload.items() if v is not None}}
+    if request['format'] not in FORMATS:
+        raise ValueError(f"Unknown format '{request['format']}'; expected one of {FORMATS}.")
+    if not isinstance(request['replicates'], int) or request['replicates'] < 1:
+        raise ValueError("'replicates' must be a positive integer.")
+    request['noise'] = float(request['noise'])
+    request['shared_guests'] = bool(request['shared_guests'])
+    return request
+
+
+def select_rows(data, request):
+    """Positions of the base rows matching the `hotel`, `year` and `month` of `request`."""
+    mask = np.ones(len(data), dtype=bool)
+    for column, key in [('Hotel', 'hotel'), ('Año', 'year'), ('Mes', 'month')]:
+        if request[key] is not None:
+            values = request[key] if isinstance(request[key], list) else [request[key]]
+            mask &= data[column].isin(values).to_numpy()
+    rows = np.flatnonzero(mask)
+    if len(rows) == 0:
+        raise ValueError("No base rows match the requested hotel/year/month.")
+    return rows
+
+
+class ResidentStore:
+    """
+    Base datasets, distributions and rules kept in memory between requests.
+
+    The base dataset is encoded once per (data, dist, rules) with the compiled
+    distribution plan and the rule effects, so a request only slices the encoded
+    arrays. Every entry is checked against the mtime of its files, so edited
+    CSV/JSON files are picked up without restarting the service.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.loads = Counter()
+
+    def _cached(self, kind, key, paths, build):
+        stamp = tuple(os.stat(path).st_mtime_ns for path in paths)
+        with self._lock:
+            entry = self._entries.get((kind, key))
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        value = build()
+        with self._lock:
+            self._entries[(kind, key)] = (stamp, value)
+            self.loads[kind] += 1
+        return value
+
+    def distributions(self, dist):
+        """Raw distributions of `dist` (as saved in the ZIPs) and their compiled plan."""
+        path = os.path.join(DIST_DAILY_PATH, dist)
+
+        def build():
+            with open(path, 'r') as file:
+                distributions = json.load(file)
+            return distributions, compile_distribution(normalize_probabilities(distributions))
+        return self._cached('dist', dist, [path], build)
+
+    def rules(self, rules):
+        path = os.path.join(RULES_PATH, rules)
+
+        def build():
+            with open(path, 'r') as file:
+                return json.load(file)
+        return self._cached('rules', rules, [path], build)
+
+    def encoded(self, data, dist, rules):
+        """
+        Returns:
+            tuple: (dataset base, plan compilado, dataset codificado, efectos de las reglas)
+        """
+        paths = [os.path.join(DATASET_PATH, data), os.path.join(DIST_DAILY_PATH, dist), os.path.join(RULES_PATH, rules)]
+
+        def build():
+            data_df = pd.read_csv(paths[0])
+            _, plan = self.distributions(dist)
+            rules_dict = self.rules(rules)
+            return data_df, plan, encode_base(data_df, plan, rules_dict), rule_effects(plan, rules_dict)
+        return self._cached('encoded', (data, dist, rules), paths, build)
+
+    def entries(self):
+        with self._lock:
+            return [{'kind': kind, 'key': key} for kind, key in self._entries]
+
+
+class ForgeBatcher:
+    """
+    Coalesce concurrent forge requests into batched vectorized forges.
+
+    A single thread takes the first queued request, waits up to `window` seconds
+    for more (at most `max_batch`) and groups them by (data, dist, rules). Within
+    a group, requests without a seed that share noise, replicates and
+    shared_guests are forged together in one `forge_encoded` call over the
+    concatenation of their base rows and split afterwards. Requests with a seed
+    are forged on their own with that seed, so they return exactly what `forge_daily_replicates`
+    returns for the same rows and seed, whatever they are batched with.
+    """
+
+    def __init__(self, store, window=0.005, max_batch=64):
+        self.store = store
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = Counter()
+        self._queue = queue.Queue()
+        threading.Thread(target=self._run, name='forge-batcher', daemon=True).start()
+
+    def submit(self, request):
+        """Queue a parsed request; the future resolves to the dict of `_forge`."""
+        future = Future()
+        self._queue.put((request, future))
+        return future
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            self.stats['batches'] += 1
+            self.stats['requests'] += len(batch)
+            groups = {}
+            for request, future in batch:
+                groups.setdefault((request['data'], request['dist'], request['rules']), []).append((request, future))
+            for key, items in groups.items():
+                try:
+                    self._forge_group(key, items, len(batch))
+                except Exception as e:
+                    for _, future in items:
+                        if not future.done():
+                            future.set_exception(e)
+
+    def _forge_group(self, key, items, batch_size):
+        data_df, plan, base, effects = self.store.encoded(*key)
+
+        coalesced = {}
+        for request, future in items:
+            try:
+                rows = select_rows(data_df, request)
+            except ValueError as e:
+                future.set_exception(e)
+                continue
+            member = (request, future, rows)
+            if request['seed'] is None:
+                coalesced.setdefault((request['noise'], request['replicates'], request['shared_guests']), []).append(member)
+            else:
+                self._forge([member], data_df, plan, base, effects, request['seed'], batch_size)
+        for members in coalesced.values():
+            self._forge(members, data_df, plan, base, effects, None, batch_size)
+
+    def _forge(self, members, data_df, plan, base, effects, seed, batch_size):
+        request = members[0][0]
+        rows = np.concatenate([member[2] for member in members])
+        bounds = np.cumsum([0] + [len(member[2]) for member in members])
+
+        start = time.perf_counter()
+        forged_df, factors, guest_row = forge_encoded(
+            data_df.iloc[rows].reset_index(drop=True), plan, {name: values[rows] for name, values in base.items()},
+            effects, request['noise'], request['replicates'], not request['shared_guests'], seed
+        )
+        seconds = time.perf_counter() - start
+        self.stats['forges'] += 1
+
+        # Reparto de huéspedes y factores de normalización entre las solicitudes: los
+        # contadores de id_huesped son por (réplica, fila base), así que cada parte es
+        # idéntica a un forjado de solo sus filas. Los factores siguen el orden de los
+        # grupos (réplica, fila base) con huéspedes.
+        owner = np.searchsorted(bounds, guest_row, side='right') - 1
+        groups = np.unique(forged_df['replicate'].to_numpy() * len(rows) + guest_row)
+        if len(groups) != len(factors):
+            # Error interno: sin esta correspondencia no se pueden repartir los factores
+            raise RuntimeError(f"{len(factors)} normalization factors for {len(groups)} (replicate, base row) groups.")
+        group_owner = np.searchsorted(bounds, groups % len(rows), side='right') - 1
+        order = np.argsort(owner, kind='stable')
+        splits = np.searchsorted(owner[order], np.arange(len(members) + 1))
+
+        for i, (_, future, _) in enumerate(members):
+            part = forged_df.iloc[order[splits[i]:splits[i + 1]]].reset_index(drop=True)
+            future.set_result({
+                'frame': part,
+                'normalization_info': summarize_normalization_factors(factors[group_owner == i]),
+                'batch_requests': batch_size,
+                'coalesced_requests': len(members),
+                'forge_seconds': seconds,
+            })
+
+
+class ForgeHandler(BaseHTTPRequestHandler):
+    """
+    Endpoints:
+        POST /forge   JSON request (see `parse_request`); the response depends on 'format':
+                      'csv' streams the forged CSV, 'json' returns the rows as records,
+                      'zip' saves a daily ZIP in FORGED_DAILY_PATH and returns its index.
+        GET /health   Resident entries and batching counters.
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def address_string(self):
+        # En un socket Unix no hay dirección de cliente
+        return self.client_address[0] if isinstance(self.client_address, tuple) else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, default=str).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path != '/health':
+            return self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+        self._send_json(200, {
+            'resident': self.server.store.entries(),
+            'loads': dict(self.server.store.loads),
+            'stats': dict(self.server.batcher.stats),
+        })
+
+    def do_POST(self):
+        if self.path != '/forge':
+            return self._send_json(404, {'error': f"Unknown path '{self.path}'."})
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = parse_request(json.loads(self.rfile.read(length) or b'{}'))
+            result = self.server.batcher.submit(request).result()
+        except (ValueError, KeyError) as e:
+            return self._send_json(400, {'error': str(e)})
+        except FileNotFoundError as e:
+            return self._send_json(404, {'error': str(e)})
+        except Exception as e:
+            return self._send_json(500, {'error': f"{type(e).__name__}: {e}"})
+
+        forged_df = result.pop('frame')
+        # Con una sola réplica se devuelve como un forjado diario normal
+        if request['replicates'] == 1:
+            forged_df = forged_df.drop(columns='replicate')
+        summary = {
+            'rows': len(forged_df),
+            'num_guests': int(forged_df['id_huesped'].nunique()),
+            **result,
+        }
+
+        if request['format'] == 'json':
+            return self._send_json(200, {**summary, 'data': forged_df.to_dict(orient='records')})
+        if request['format'] == 'zip':
+            return self._send_json(200, {**summary, 'daily_index': self._save_zip(request, forged_df, result)})
+        self._stream_csv(forged_df, summary)
+
+    def _save_zip(self, request, forged_df, result):
+        distributions, _ = self.server.store.distributions(request['dist'])
+        info = {
+            'num_guests': int(forged_df.groupby('replicate')['id_huesped'].nunique().sum()) if 'replicate' in forged_df else int(forged_df['id_huesped'].nunique()),
+            'num_replicates': request['replicates'],
+            'resample_guests': not request['shared_guests'],
+            'data_file': request['data'],
+            'dist_file': request['dist'],
+            'rules_file': request['rules'],
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'noise_daily': request['noise'],
+            'seed': request['seed'],
+            'selection': {key: request[key] for key in ['hotel', 'year', 'month']},
+            'normalization_info': result['normalization_info'],
+        }
+        return save_daily_to_zip(forged_df, distributions, self.server.store.rules(request['rules']), info,
+                                 folder=FORGED_DAILY_PATH, partition_by='replicate' if request['replicates'] > 1 else None)
+
+    def _stream_csv(self, forged_df, summary):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.send_header('X-Forge-Summary', json.dumps({k: v for k, v in summary.items() if k != 'normalization_info'}))
+        self.end_headers()
+        for start in range(0, max(len(forged_df), 1), CSV_CHUNK_ROWS):
+            data = forged_df.iloc[start:start + CSV_CHUNK_ROWS].to_csv(index=False, header=start == 0).encode('utf-8')
+            self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = LISTEN_BACKLOG
+
+
+class ForgeHTTPServer(ThreadingHTTPServer):
+    request_queue_size = LISTEN_BACKLOG
+
+
+def serve(host='127.0.0.1', port=8765, unix_socket=None, window=0.005, max_batch=64, preload=None, verbose=False):
+    """
+    Run the forge service until interrupted, on `host:port` or on the Unix socket
+    `unix_socket`.
+
+    Args:
+        window (float): Seconds the batcher waits for more requests after the first one.
+        max_batch (int): Maximum requests coalesced in one batch.
+        preload (tuple, optional): (data, dist, rules) encoded before accepting requests.
+    """
+    store = ResidentStore()
+    if preload is not None:
+        start = time.perf_counter()
+        store.encoded(*preload)
+        print(f"Preloaded {preload} in {time.perf_counter() - start:.2f} s.")
+
+    if unix_socket is not None:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = ThreadingUnixHTTPServer(unix_socket, ForgeHandler)
+        address = unix_socket
+    else:
+        server = ForgeHTTPServer((host, port), ForgeHandler)
+        address = f"http://{host}:{port}"
+    server.store = store
+    server.batcher = ForgeBatcher(store, window=window, max_batch=max_batch)
+    server.verbose = verbose
+
+    print(f"Forge service listening on {address}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if unix_socket is not None and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+
+class UnixHTTPConnection(HTTPConnection):
+    """`HTTPConnection` over a Unix socket."""
+
+    def __init__(self, socket_path, timeout=None):
+        super().__init__('localhost', timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(self.socket_path)
+
+
+def connect(address='127.0.0.1:8765', timeout=None):
+    """Connection to a running service: 'host:port' or the path of its Unix socket."""
+    if os.path.sep in address or address.endswith('.sock'):
+        return UnixHTTPConnection(address, timeout=timeout)
+    host, port = address.rsplit(':', 1)
+    return HTTPConnection(host, int(port), timeout=timeout)
+
+
+def forge_request(connection, **params):
+    """
+    Send one forge request over `connection` (reusable, see `connect`).
+
+    Returns:
+        bytes | dict: The CSV for format 'csv', the decoded JSON otherwise.
+
+    Raises:
+        RuntimeError: The service answered with an error.
+    """
+    connection.request('POST', '/forge', body=json.dumps(params), headers={'Content-Type': 'application/json'})
+    response = connection.getresponse()
+    body = response.read()
+    if response.status != 200:
+        raise RuntimeError(f"Forge service error {response.status}: {json.loads(body)['error']}")
+    return body if response.getheader('Content-Type', '').startswith('text/csv') else json.loads(body)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Long-running forge service that keeps datasets, distributions and rules resident.")
+    parser.add_argument("--host", type=str, default='127.0.0.1', help="Address to listen on.")
+    parser.add_argument("--port", type=int, default=8765, help="TCP port to listen on.")
+    parser.add_argument("--socket", type=str, default=None, help="Listen on this Unix socket instead of TCP.")
+    parser.add_argument("--window", type=float, default=5, help="Milliseconds the batcher waits to coalesce concurrent requests.")
+    parser.add_argument("--max_batch", type=int, default=64, help="Maximum requests coalesced in one batch.")
+    parser.add_argument("--data", type=str, default=REQUEST_DEFAULTS['data'], help="Base dataset preloaded at startup.")
+    parser.add_argument("--dist", type=str, default=REQUEST_DEFAULTS['dist'], help="Distributions preloaded at startup.")
+    parser.add_argument("--rules", type=str, default=REQUEST_DEFAULTS['rules'], help="Rules preloaded at startup.")
+    parser.add_argument("--verbose", action='store_true', help="Log every request.")
+    args = parser.parse_args()
+
+    serve(args.host, args.port, args.socket, window=args.window / 1000, max_batch=args.max_batch,
+          preload=(args.data, args.dist, args.rules), verbose=args.verbose)
@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+from scipy.stats import chi2
+
+from forge_daily import BASE_ROW_KEYS
+from utils.aux import normalize_probabilities
+from utils.io import iter_daily_zip_chunks, load_daily_zip_info, load_daily_zip_json
+
+# Tolerancia relativa del cuadre de consumo por fila base
+CONSUMPTION_RTOL = 1e-6
+
+
+class ContingencyTable:
+    """
+    Conteos (condición × categoría) de una variable de dist.json, acumulados por
+    bloques con un único `np.bincount` sobre los códigos categóricos.
+
+    Los valores que no existen en la distribución (o condiciones sin
+    probabilidades) se cuentan aparte como inesperados.
+    """
+
+    def __init__(self, name, info):
+        self.name = name
+        self.condition = info.get('condicion')
+        self.shared = info.get('compartido_por_habitacion', False)
+
+        if self.condition is None:
+            self.cond_keys = None
+            self.categories = list(info['probabilidades'].keys())
+            probs = np.array([list(info['probabilidades'].values())], dtype=float)
+        else:
+            conditional = info['probabilidades']
+            self.cond_keys = list(conditional.keys())
+            self.categories = list(dict.fromkeys(value for p in conditional.values() for value in p))
+            probs = np.array([[conditional[k].get(c, 0.0) for c in self.categories] for k in self.cond_keys], dtype=float)
+
+        self.probs = probs
+        self.counts = np.zeros(probs.size, dtype=np.int64)
+        self.unexpected = 0
+
+    def update(self, chunk):
+        codes = pd.Categorical(chunk[self.name].astype(str), categories=self.categories).codes.astype(np.int64)
+        if self.cond_keys is None:
+            cond_codes = np.zeros(len(codes), dtype=np.int64)
+        else:
+            cond_codes = pd.Categorical(chunk[self.condition].astype(str), categories=self.cond_keys).codes.astype(np.int64)
+
+        valid = (codes >= 0) & (cond_codes >= 0)
+        self.unexpected += int((~valid).sum())
+        flat = cond_codes[valid] * len(self.categories) + codes[valid]
+        self.counts += np.bincount(flat, minlength=self.counts.size)
+
+    def summary(self):
+        """Chi-cuadrado y distancia de variación total (TVD) por condición y para la variable."""
+        observed = self.counts.reshape(self.probs.shape).astype(float)
+        conditions = {}
+        chi2_total, dof_total = 0.0, 0
+
+        for i in range(observed.shape[0]):
+            n = observed[i].sum()
+            if n == 0:
+                continue
+            stat, dof, impossible = _chi_square(observed[i], n * self.probs[i])
+            chi2_total += stat
+            dof_total += dof
+            key = 'all' if self.cond_keys is None else self.cond_keys[i]
+            conditions[key] = {
+                'n': int(n),
+                'chi2': round(stat, 4),
+                'dof': dof,
+                'p_value': _p_value(stat, dof),
+                'tvd': round(float(0.5 * np.abs(observed[i] / n - self.probs[i]).sum()), 6),
+                'impossible_values': impossible,
+            }
+
+        # TVD global: observado frente al esperado con las condiciones observadas
+        n_total = observed.sum()
+        expected = (observed.sum(axis=1, keepdims=True) * self.probs).sum(axis=0)
+        tvd = 0.5 * np.abs(observed.sum(axis=0) - expected).sum() / n_total if n_total else np.nan
+
+        return {
+            'condition': self.condition,
+            'unit': 'room' if self.shared else 'guest',
+            'n': int(n_total),
+            'chi2': round(chi2_total, 4),
+            'dof': dof_total,
+            'p_value': _p_value(chi2_total, dof_total),
+            'tvd': round(float(tvd), 6),
+            'unexpected_values': self.unexpected,
+            'conditions': conditions,
+        }
+
+
+def _chi_square(observed, expected):
+    """Chi-cuadrado de Pearson sobre las categorías con probabilidad > 0."""
+    possible = expected > 0
+    stat = float((((observed - expected) ** 2)[possible] / expected[possible]).sum())
+    return stat, int(possible.sum()) - 1, int(observed[~possible].sum())
+
+
+def _p_value(stat, dof):
+    return round(float(chi2.sf(stat, dof)), 6) if dof > 0 else None
+
+
+def validate_forged_daily(folder, index, data, chunksize=500_000, replicate=None):
+    """
+    Bondad de ajuste de un dataset diario forjado, en una sola pasada en streaming.
+
+    El CSV del ZIP (o todas sus particiones) se lee por bloques de `chunksize` filas y
+    solo se acumulan:
+      - Tablas de contingencia (condición × categoría) de cada variable de dist.json,
+        comparadas con las distribuciones normalizadas mediante chi-cuadrado y TVD,
+        por variable y por valor de la condición. Las variables compartidas se
+        cuentan una vez por habitación (primer huésped de cada habitación), ya
+        que sus huéspedes no son muestras independientes.
+      - Sumas de 'Consumo total' y 'Dias de estancia' por fila base (Hotel, Año, Mes
+        y réplica), que deben coincidir con 'Consumo Kw Electricidad' y 'Pax'.
+
+    La memoria no depende del número de filas, solo del bloque, del número de
+    categorías y del número de filas base.
+
+    Args:
+        folder (str): Carpeta de los ZIP diarios.
+        index (int): Índice del ZIP diario.
+        data (pd.DataFrame): Dataset base con las columnas de `BASE_ROW_KEYS`,
+                             'Consumo Kw Electricidad' y 'Pax'.
+        chunksize (int): Filas por bloque.
+        replicate (int, optional): Validar solo una réplica de un ZIP particionado.
+
+    Returns:
+        dict: {'rows', 'variables': {variable: resumen}, 'consumption': cuadre por fila base}
+    """
+    dist, _ = load_daily_zip_json(folder, index)
+    info = load_daily_zip_info(folder, index)
+    dist = normalize_probabilities({k: v for k, v in dist.items() if k != 'ocupacion_habitacion'})
+
+    tables = [ContingencyTable(name, entry) for name, entry in dist.items()]
+    conditions = {t.condition for t in tables if t.condition is not None}
+
+    if replicate is not None:
+        partitions = [replicate]
+    elif 'partitions' in info:
+        partitions = [int(value) for value in info['partitions']]
+    else:
+        partitions = [None]
+
+    row_keys = BASE_ROW_KEYS + (['replicate'] if partitions != [None] else [])
+    needed = set(dist) | conditions | set(BASE_ROW_KEYS) | {'replicate', 'id_habitacion', 'Consumo total', 'Dias de estancia'}
+
+    sums = None
+    n_rows = 0
+    for part in partitions:
+        previous_room = None
+        for chunk in iter_daily_zip_chunks(folder, index, chunksize, usecols=lambda c: c in needed, replicate=part):
+            n_rows += len(chunk)
+            if 'replicate' not in chunk.columns and part is not None:
+                chunk['replicate'] = part
+
+            # Primer huésped de cada habitación (los huéspedes de una habitación son consecutivos)
+            room = chunk[row_keys + ['id_habitacion']]
+            first_of_room = (room != room.shift()).any(axis=1).to_numpy(copy=True)
+            first_of_room[0] = tuple(room.iloc[0]) != previous_room
+            previous_room = tuple(room.iloc[-1])
+
+            for table in tables:
+                table.update(chunk[first_of_room] if table.shared else chunk)
+
+            block = chunk.groupby(row_keys)[['Consumo total', 'Dias de estancia']].sum()
+            sums = block if sums is None else sums.add(block, fill_value=0)
+
+    return {
+        'rows': n_rows,
+        'chunksize': chunksize,
+        'variables': {table.name: table.summary() for table in tables},
+        'consumption': _consumption_check(sums, data),
+    }
+
+
+def _consumption_check(sums, data):
+    """Cuadre de 'Consumo total' y 'Dias de estancia' forjados frente al dataset base."""
+    if sums is None:
+        return {'base_rows': 0}
+
+    forged = sums.reset_index()
+    base = data[BASE_ROW_KEYS + ['Consumo Kw Electricidad', 'Pax']]
+    merged = forged.merge(base, on=BASE_ROW_KEYS, how='left')
+
+    missing = merged['Consumo Kw Electricidad'].isna()
+    merged = merged[~missing]
+    abs_error = (merged['Consumo total'] - merged['Consumo Kw Electricidad']).abs()
+    rel_error = abs_error / merged['Consumo Kw Electricidad'].abs().where(lambda v: v > 0)
+    mismatched = ~np.isclose(merged['Consumo total'], merged['Consumo Kw Electricidad'], rtol=CONSUMPTION_RTOL)
+
+    return {
+        'base_rows': len(forged),
+        'base_rows_not_in_data': int(missing.sum()),
+        'mismatched_rows': int(mismatched.sum()),
+        'max_abs_error': round(float(abs_error.max()), 6) if len(merged) else None,
+        'max_rel_error': float(rel_error.max()) if len(merged) else None,
+        'pax_mismatched_rows': int((merged['Dias de estancia'] != merged['Pax']).sum()),
+        'mismatched': merged.loc[mismatched, BASE_ROW_KEYS].astype(str).to_dict(orient='records')[:20],
+    }
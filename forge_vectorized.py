@@ -0,0 +1,566 @@
+import calendar
+import numpy as np
+import pandas as pd
+
+from forge_daily import summarize_normalization_factors
+from utils.instrumentation import span
+
+# Columnas que el forjado añade a cada huésped antes de las variables de dist.json
+STAY_COLUMNS = ['Dias de estancia', 'Dia inicio', 'ocupacion_habitacion']
+MAX_STAY_DAYS = 7
+# Filas base por bloque: cada (réplica, bloque) se muestrea con su propio generador
+BLOCK_ROWS = 50
+
+
+def compile_distribution(dist):
+    """
+    Compila las distribuciones de dist.json en tablas de muestreo vectorial.
+
+    Cada variable se representa con sus categorías y una matriz de probabilidades
+    acumuladas (una fila por valor de la condición, una sola fila si no está
+    condicionada), de forma que muestrear N valores es una comparación de N números
+    uniformes con las filas correspondientes.
+
+    Args:
+        dist (dict): Distribuciones (ya normalizadas) con 'ocupacion_habitacion' opcional.
+
+    Returns:
+        dict: {
+            'occupancy': (valores de ocupación, probabilidades acumuladas),
+            'variables': lista de variables en orden de generación (primero las
+                         compartidas por habitación, después las individuales)
+        }
+    """
+    occupancy = dist.get('ocupacion_habitacion', {'probabilidades': {"1": 1.0}})['probabilidades']
+    occupancy_values = np.array([int(k) for k in occupancy.keys()])
+    occupancy_cdf = np.cumsum(np.array(list(occupancy.values()), dtype=float))
+
+    variables = []
+    for name, info in dist.items():
+        if name == 'ocupacion_habitacion':
+            continue
+
+        if 'condicion' in info:
+            conditional = info['probabilidades']
+            cond_keys = list(conditional.keys())
+            categories = list(dict.fromkeys(value for probs in conditional.values() for value in probs))
+            probs = np.array([[conditional[k].get(c, 0.0) for c in categories] for k in cond_keys], dtype=float)
+        else:
+            cond_keys = None
+            categories = list(info['probabilidades'].keys())
+            probs = np.array([list(info['probabilidades'].values())], dtype=float)
+
+        variables.append({
+            'name': name,
+            'shared': info.get('compartido_por_habitacion', False),
+            'condition': info.get('condicion'),
+            'cond_position': None if cond_keys is None else {str(k): i for i, k in enumerate(cond_keys)},
+            'categories': np.array(categories, dtype=object),
+            'cdf': np.cumsum(probs, axis=1),
+        })
+
+    # Las compartidas se generan antes que las individuales
+    variables.sort(key=lambda entry: not entry['shared'])
+
+    return {'occupancy': (occupancy_values, occupancy_cdf), 'variables': variables}
+
+
+def _random(rng, seq):
+    """
+    U(0, 1) for every element of the sequences (structure × base row) `seq`: from
+    `rng` in order, or from the generator of each element's block if `rng` is a
+    `BlockStreams`.
+    """
+    if isinstance(rng, BlockStreams):
+        return rng.random(seq)
+    return rng.random(len(seq))
+
+
+def _sample_codes(cdf, cond_idx, rng, seq, u=None):
+    """Inverse-CDF sampling of one category code per row of `cond_idx` (sequence `seq`, or uniforms `u`)."""
+    u = _random(rng, seq) if u is None else u
+    codes = (u[:, None] >= cdf[cond_idx]).sum(axis=1)
+    return np.minimum(codes, cdf.shape[1] - 1)
+
+
+def _positions(values, cond_position, name):
+    """Map condition values (category labels or base column values) to rows of the CDF matrix."""
+    positions = pd.Series(values).astype(str).map(cond_position)
+    if positions.isna().any():
+        missing = pd.Series(values)[positions.isna()].unique()[:5]
+        raise KeyError(f"Variable '{name}' has no probabilities for condition values {list(missing)}.")
+    return positions.to_numpy(dtype=np.int64)
+
+
+def sample_stays(pax, days_in_month, occupancy, rng):
+    """
+    Reparte el Pax de varias secuencias (fila base × réplica) en habitaciones, con la
+    misma lógica que `forge_daily_consumption`, pero avanzando todas las secuencias
+    a la vez: en cada paso se crea una habitación en cada secuencia con Pax pendiente.
+
+    Args:
+        pax (np.ndarray): Pax de cada secuencia.
+        days_in_month (np.ndarray): Días del mes de cada secuencia.
+        occupancy (tuple): (valores de ocupación, probabilidades acumuladas).
+        rng (np.random.Generator | BlockStreams): Generador aleatorio.
+
+    Returns:
+        dict: Arrays por habitación 'seq', 'n', 'dias', 'inicio', en orden de
+              secuencia y, dentro de cada secuencia, en orden de creación.
+    """
+    occupancy_values, occupancy_cdf = occupancy
+    remaining = pax.astype(np.int64).copy()
+    active = np.nonzero(remaining > 0)[0]
+    steps = []
+
+    while active.size:
+        rem = remaining[active]
+        # Ocupación, días y día de inicio de la habitación: tres números por secuencia en una sola petición
+        u = _random(rng, np.repeat(active, 3)).reshape(-1, 3)
+        n = occupancy_values[_sample_codes(occupancy_cdf[None, :], np.zeros(active.size, dtype=np.int64), rng, active, u[:, 0])]
+        n = np.minimum(n, rem)
+        # dias_estancia de forma que no sobrepase el Pax pendiente
+        dias = (u[:, 1] * np.minimum(MAX_STAY_DAYS, rem // n)).astype(np.int64) + 1
+        inicio = (u[:, 2] * (days_in_month[active] - dias + 1)).astype(np.int64) + 1
+
+        steps.append((active, n, dias, inicio))
+        remaining[active] -= n * dias
+        active = active[remaining[active] > 0]
+
+    seq, n, dias, inicio = (np.concatenate(parts) for parts in zip(*steps))
+    order = np.argsort(seq, kind='stable')
+    return {'seq': seq[order], 'n': n[order], 'dias': dias[order], 'inicio': inicio[order]}
+
+
+# Columnas del dataset base que se copian en cada huésped (las reglas también pueden usarlas)
+BASE_GUEST_COLUMNS = ['Mes', 'Año', 'Hotel', 'Estación']
+
+
+def condition_sources(plan, base_columns):
+    """
+    De dónde toma su condición cada variable, con el mismo orden de prioridad que
+    `forge_daily_consumption`: 'variable' (generada antes), 'stay' (columnas de la
+    estancia) o 'base' (columna del dataset base). Las compartidas condicionadas a
+    una columna base la leen siempre de la fila base.
+
+    Returns:
+        dict: {variable: None | ('variable' | 'stay' | 'base', clave de la condición)}
+    """
+    sources = {}
+    generated = set()
+    for entry in plan['variables']:
+        name, cond_key = entry['name'], entry['condition']
+        if cond_key is None:
+            sources[name] = None
+        elif cond_key in generated and not (entry['shared'] and cond_key in base_columns):
+            sources[name] = ('variable', cond_key)
+        elif cond_key in STAY_COLUMNS and not entry['shared']:
+            sources[name] = ('stay', cond_key)
+        elif cond_key in base_columns:
+            sources[name] = ('base', cond_key)
+        else:
+            raise KeyError(f"Condition '{cond_key}' of '{name}' is neither a base column nor a previously generated variable.")
+        generated.add(name)
+    return sources
+
+
+def encode_base(data, plan, rules):
+    """
+    Codifica el dataset base en arrays numéricos por fila, que es todo lo que
+    necesitan el muestreo y el cálculo de consumo:
+
+      - 'year', 'month', 'pax', 'days_in_month', 'consumption_per_pax', 'consumption_real'
+      - 'base_adjustment': suma de los ajustes de `rules` sobre columnas base copiadas
+        en el huésped (p. ej. 'Estación')
+      - 'cond/<variable>': fila de la matriz de probabilidades de las variables
+        condicionadas a una columna base
+
+    Returns:
+        dict: Arrays de longitud len(data).
+    """
+    years = data['Año'].to_numpy(dtype=np.int64)
+    months = data['Mes'].to_numpy(dtype=np.int64)
+    base = {
+        'year': years,
+        'month': months,
+        'pax': data['Pax'].to_numpy(dtype=np.int64),
+        'days_in_month': np.array([calendar.monthrange(y, m)[1] for y, m in zip(years, months)], dtype=np.int64),
+        'consumption_per_pax': data['Consumo Kw Electricidad / Pax'].to_numpy(dtype=float),
+        'consumption_real': data['Consumo Kw Electricidad'].to_numpy(dtype=float),
+        'base_adjustment': np.zeros(len(data)),
+    }
+
+    variable_names = {entry['name'] for entry in plan['variables']}
+    for feature, effect_dict in rules.items():
+        if feature in BASE_GUEST_COLUMNS and feature in data.columns and feature not in variable_names:
+            base['base_adjustment'] += data[feature].map(effect_dict).fillna(0).to_numpy(dtype=float)
+
+    for entry, source in zip(plan['variables'], condition_sources(plan, data.columns).values()):
+        if source is not None and source[0] == 'base':
+            base[f"cond/{entry['name']}"] = _positions(data[source[1]].to_numpy(), entry['cond_position'], entry['name'])
+
+    return base
+
+
+def rule_effects(plan, rules):
+    """Vector de ajuste por categoría de cada variable de `plan` con regla en `rules`."""
+    return {
+        entry['name']: np.array([rules[entry['name']].get(c, 0) for c in entry['categories']], dtype=float)
+        for entry in plan['variables'] if entry['name'] in rules
+    }
+
+
+def sample_guest_codes(base, plan, n_structures, rng):
+    """
+    Genera huéspedes para `n_structures` repeticiones independientes de todas las
+    filas de `base` (ver `encode_base`) en una sola llamada vectorial, sin
+    construir cadenas: cada variable queda como códigos de categoría.
+
+    Returns:
+        dict: Arrays por huésped 'structure', 'base_row', 'Dias de estancia',
+        'Dia inicio', 'ocupacion_habitacion', 'guest_counter', 'room_counter' y
+        'codes/<variable>'.
+    """
+    n_rows = len(base['pax'])
+    rooms = sample_stays(
+        np.tile(base['pax'], n_structures),
+        np.tile(base['days_in_month'], n_structures),
+        plan['occupancy'],
+        rng
+    )
+    room_row = rooms['seq'] % n_rows
+    room_counter = np.arange(len(rooms['seq'])) - np.searchsorted(rooms['seq'], rooms['seq']) + 1
+
+    guest_room = np.repeat(np.arange(len(rooms['seq'])), rooms['n'])
+    guest_seq = rooms['seq'][guest_room]
+    guest_row = guest_seq % n_rows
+
+    guests = {
+        'structure': guest_seq // n_rows,
+        'base_row': guest_row,
+        'Dias de estancia': rooms['dias'][guest_room],
+        'Dia inicio': rooms['inicio'][guest_room],
+        'ocupacion_habitacion': rooms['n'][guest_room],
+        'guest_counter': np.arange(len(guest_seq)) - np.searchsorted(guest_seq, guest_seq) + 1,
+        'room_counter': room_counter[guest_room],
+    }
+
+    # --- Variables de dist.json ---
+    codes = {}
+    for entry in plan['variables']:
+        name, cond_key = entry['name'], entry['condition']
+        size = len(room_row) if entry['shared'] else len(guest_row)
+
+        if cond_key is None:
+            cond_idx = np.zeros(size, dtype=np.int64)
+        elif f"cond/{name}" in base:
+            # Condición sobre una columna base, ya codificada por `encode_base`
+            cond_idx = base[f"cond/{name}"][room_row if entry['shared'] else guest_row]
+        elif cond_key in codes:
+            cond_entry, cond_codes = codes[cond_key]
+            if cond_entry['shared'] and not entry['shared']:
+                cond_codes = cond_codes[guest_room]
+            cond_idx = _positions(cond_entry['categories'][cond_codes], entry['cond_position'], name)
+        elif cond_key in STAY_COLUMNS and not entry['shared']:
+            cond_idx = _positions(guests[cond_key], entry['cond_position'], name)
+        else:
+            raise KeyError(f"Condition '{cond_key}' of '{name}' is neither a base column nor a previously generated variable.")
+
+        codes[name] = (entry, _sample_codes(entry['cdf'], cond_idx, rng, rooms['seq'] if entry['shared'] else guest_seq))
+
+    for name, (entry, var_codes) in codes.items():
+        guests[f"codes/{name}"] = var_codes[guest_room] if entry['shared'] else var_codes
+
+    return guests
+
+
+def tile_structures(guests, n_structures):
+    """Repite `n_structures` veces los huéspedes de una única estructura (réplicas con los mismos huéspedes)."""
+    tiled = {key: np.tile(values, n_structures) for key, values in guests.items()}
+    tiled['structure'] = np.repeat(np.arange(n_structures), len(guests['structure']))
+    return tiled
+
+
+def guest_consumption(guests, base, effects, noise, n_structures, rng):
+    """
+    Consumo medio y total de cada huésped (reglas, ruido y normalización por
+    estructura y fila base), como en `forge_daily_consumption`.
+
+    Returns:
+        tuple: (consumo medio, consumo total, factores de las filas normalizadas)
+    """
+    n_rows = len(base['pax'])
+    base_row = guests['base_row']
+
+    adjustment = base['base_adjustment'][base_row].copy()
+    for name, effect in effects.items():
+        adjustment += effect[guests[f"codes/{name}"]]
+
+    # --- Ruido U(-noise, noise) por huésped ---
+    group = guests['structure'] * n_rows + base_row
+    avg_consumption = base['consumption_per_pax'][base_row] * (1 + adjustment)
+    avg_consumption *= 1 + (-noise + 2 * noise * _random(rng, group))
+    total_consumption = avg_consumption * guests['Dias de estancia']
+
+    # --- Normalización de consumo por (estructura, fila base) ---
+    consumo_sintetico = np.bincount(group, weights=total_consumption, minlength=n_structures * n_rows)
+    consumo_real = np.tile(base['consumption_real'], n_structures)
+    normalized = consumo_sintetico > 0
+    factors = np.ones_like(consumo_sintetico)
+    factors[normalized] = consumo_real[normalized] / consumo_sintetico[normalized]
+
+    return avg_consumption * factors[group], total_consumption * factors[group], factors[normalized]
+
+
+def block_generators(seed, n_replicates, n_blocks):
+    """
+    Generadores independientes por (réplica, bloque de filas base), derivados de
+    `seed` con `SeedSequence.spawn`.
+
+    Returns:
+        list: generators[réplica][bloque]
+    """
+    return [[np.random.default_rng(child) for child in replicate.spawn(n_blocks)]
+            for replicate in np.random.SeedSequence(seed).spawn(n_replicates)]
+
+
+class BlockStreams:
+    """
+    Números aleatorios de `block_generators` para muestrear a la vez varias
+    réplicas y bloques de filas base: cada elemento de una secuencia (réplica ×
+    fila base) toma sus números del generador de su (réplica, bloque), en el orden
+    en que aparece. Cada generador consume así lo mismo que si su bloque se
+    muestreara solo, como hace `iter_daily_replicates`.
+
+    Los pasos de `sample_stays` piden pocos números a cada generador, así que cada
+    uno adelanta un búfer de `width` números y las peticiones pequeñas se sirven
+    de los búferes de una vez. Adelantar números no cambia la secuencia de ningún
+    generador.
+    """
+
+    def __init__(self, seed, n_replicates, n_rows, rows_per_chunk=BLOCK_ROWS):
+        self.n_rows = n_rows
+        self.rows_per_chunk = rows_per_chunk
+        self.n_blocks = max(-(-n_rows // rows_per_chunk), 1)
+        self.generators = [generator for replicate in block_generators(seed, n_replicates, self.n_blocks)
+                           for generator in replicate]
+        # Primera secuencia de cada (réplica, bloque), y el total al final
+        self._first_seq = np.append(
+            (np.arange(n_replicates)[:, None] * n_rows + np.arange(self.n_blocks) * rows_per_chunk).ravel(),
+            n_replicates * n_rows
+        )
+        # Búferes de como mucho 2^21 números en total
+        self.width = int(np.clip(2 ** 21 // len(self.generators), 64, 4096))
+        self._buffer = np.empty((len(self.generators), self.width))
+        self._pos = np.full(len(self.generators), self.width)
+
+    def random(self, seq):
+        """U(0, 1) para cada elemento de las secuencias `seq` (réplica * n_rows + fila base)."""
+        if len(self.generators) == 1:
+            return self.generators[0].random(len(seq))
+        # Las secuencias suelen venir ordenadas; si no, se ordenan por generador y se deshace al final
+        order = None
+        if (np.diff(seq) < 0).any():
+            stream = (seq // self.n_rows) * self.n_blocks + (seq % self.n_rows) // self.rows_per_chunk
+            order = np.argsort(stream, kind='stable')
+            bounds = np.searchsorted(stream[order], np.arange(len(self.generators) + 1))
+        else:
+            bounds = np.searchsorted(seq, self._first_seq)
+        counts = np.diff(bounds)
+        u = np.empty(len(seq))
+
+        # Peticiones grandes: lo que quede en el búfer y el resto directamente del generador
+        large = counts > self.width
+        for s in np.flatnonzero(large):
+            left = self._buffer[s, self._pos[s]:]
+            u[bounds[s]:bounds[s + 1]] = np.concatenate([left, self.generators[s].random(counts[s] - len(left))])
+            self._pos[s] = self.width
+
+        # Peticiones pequeñas: se sirven de los búferes, completados antes si no alcanzan
+        small = np.flatnonzero(~large & (counts > 0))
+        if small.size:
+            for s in small[self._pos[small] + counts[small] > self.width]:
+                left = self._buffer[s, self._pos[s]:]
+                self._buffer[s] = np.concatenate([left, self.generators[s].random(self.width - len(left))])
+                self._pos[s] = 0
+            stream = np.repeat(small, counts[small])
+            positions = (np.arange(len(seq)) if small.size == len(self.generators) or not large.any()
+                         else np.concatenate([np.arange(bounds[s], bounds[s + 1]) for s in small]))
+            u[positions] = self._buffer[stream, self._pos[stream] + positions - bounds[stream]]
+            self._pos[small] += counts[small]
+
+        if order is not None:
+            ordered, u = u, np.empty(len(seq))
+            u[order] = ordered
+        return u
+
+
+def guests_frame(data, plan, guests):
+    """
+    Decodifica los arrays de `sample_guest_codes` (y el consumo, si está) en el
+    DataFrame con las columnas de `forge_daily_consumption` más 'replicate'.
+    """
+    guest_row = guests['base_row']
+    years = data['Año'].to_numpy(dtype=np.int64)
+    months = data['Mes'].to_numpy(dtype=np.int64)
+
+    # --- Identificadores ---
+    hotel_codes = data['Hotel'].map(lambda hotel: ''.join([w[0].upper() for w in hotel.split()])).to_numpy()
+    prefixes = np.array([f"{c}_{y:04d}{m:02d}_" for c, y, m in zip(hotel_codes, years, months)], dtype=object)
+
+    frame = pd.DataFrame({
+        'Mes': months[guest_row],
+        'Año': years[guest_row],
+        'Hotel': data['Hotel'].to_numpy()[guest_row],
+        'Estación': data['Estación'].to_numpy()[guest_row],
+        **{column: guests[column] for column in STAY_COLUMNS},
+    })
+    # Tabla de contadores formateados: se construye una vez y se indexa
+    max_counter = int(max(guests['guest_counter'].max(initial=0), guests['room_counter'].max(initial=0)))
+    counters = np.array([f"{i:06d}" for i in range(max_counter + 1)], dtype=object)
+    frame.insert(6, 'id_huesped', prefixes[guest_row] + counters[guests['guest_counter']])
+    frame.insert(7, 'id_habitacion', counters[guests['room_counter']])
+
+    for entry in plan['variables']:
+        frame[entry['name']] = entry['categories'][guests[f"codes/{entry['name']}"]]
+
+    frame['replicate'] = guests['structure']
+    for column in ['Consumo medio', 'Consumo total']:
+        if column in guests:
+            frame[column] = guests[column]
+    return frame
+
+
+def forge_daily_replicates(data, dist, rules, noise: float = 0.05, n_replicates: int = 1,
+                           resample_guests: bool = True, seed=None, rows_per_chunk: int = BLOCK_ROWS):
+    """
+    Genera K réplicas del dataset diario sintético en una sola pasada vectorial.
+
+    Sigue la lógica de `forge_daily_consumption` (habitaciones, días de estancia,
+    variables compartidas e individuales, reglas, ruido y normalización por fila del
+    dataset base), pero con un eje de réplica en los arrays de muestreo:
+
+      - resample_guests=True: se muestrean K conjuntos independientes de huéspedes.
+      - resample_guests=False: los huéspedes se muestrean una vez y las K réplicas
+        solo difieren en el ruido del consumo (y por tanto en la normalización).
+
+    Cada (réplica, bloque de `rows_per_chunk` filas base) toma sus números de su
+    propio generador (ver `BlockStreams`), sin perder el muestreo vectorial. Con la misma
+    semilla y el mismo `rows_per_chunk`, el resultado es idéntico al de
+    `iter_daily_replicates` (modo `--pipeline`).
+
+    Args:
+        data (pd.DataFrame): Dataset base con ['Pax', 'Consumo Kw Electricidad',
+                             'Consumo Kw Electricidad / Pax', 'Mes', 'Año', 'Estación', 'Hotel'].
+        dist (dict): Distribuciones normalizadas.
+        rules (dict): Reglas de ajuste del consumo medio por huésped.
+        noise (float, optional): Ruido aleatorio aplicado al consumo medio por huésped.
+        n_replicates (int): Número de réplicas K.
+        resample_guests (bool): Si se muestrean huéspedes distintos en cada réplica.
+        seed (int, optional): Semilla del generador aleatorio.
+        rows_per_chunk (int): Filas del dataset base por bloque de muestreo.
+
+    Returns:
+        tuple: (DataFrame con las columnas de `forge_daily_consumption` más 'replicate',
+                normalization_info de todas las réplicas)
+    """
+    data = data.reset_index(drop=True)
+    with span('encode', rows=len(data)):
+        plan = compile_distribution(dist)
+        base = encode_base(data, plan, rules)
+
+    forged_df, factors, _ = forge_encoded(data, plan, base, rule_effects(plan, rules), noise,
+                                          n_replicates, resample_guests, seed, rows_per_chunk)
+    return forged_df, summarize_normalization_factors(factors)
+
+
+def forge_encoded(data, plan, base, effects, noise, n_replicates, resample_guests, seed=None,
+                  rows_per_chunk=BLOCK_ROWS):
+    """
+    Muestreo, consumo y decodificación de `forge_daily_replicates` sobre un dataset
+    base ya codificado (`encode_base`) y un plan ya compilado, para quien los
+    mantiene en memoria entre forjados (ver `forge_service.py`).
+
+    Returns:
+        tuple: (DataFrame de `forge_daily_replicates`, factores de normalización,
+                fila base de cada huésped)
+    """
+    rng = BlockStreams(seed, n_replicates, len(base['pax']), rows_per_chunk)
+    with span('sample') as sampled:
+        guests = sample_guest_codes(base, plan, n_replicates if resample_guests else 1, rng)
+        if not resample_guests:
+            guests = tile_structures(guests, n_replicates)
+        sampled['rows'] = len(guests['base_row'])
+
+    # Reglas, ruido y normalización del consumo
+    with span('rules', rows=len(guests['base_row'])):
+        guests['Consumo medio'], guests['Consumo total'], factors = guest_consumption(
+            guests, base, effects, noise, n_replicates, rng
+        )
+
+    with span('frame', rows=len(guests['base_row'])):
+        forged_df = guests_frame(data, plan, guests)
+    return forged_df, factors, guests['base_row']
+
+
+def iter_daily_replicates(data, dist, rules, noise: float = 0.05, n_replicates: int = 1,
+                          resample_guests: bool = True, seed=None, rows_per_chunk: int = BLOCK_ROWS, summary=None):
+    """
+    Versión por bloques de `forge_daily_replicates`: genera los datos réplica a réplica
+    y, dentro de cada réplica, en bloques de `rows_per_chunk` filas base, para que
+    `save_daily_stream_to_zip` pueda serializar y comprimir un bloque mientras se
+    genera el siguiente.
+
+    Cada bloque contiene todos los huéspedes de sus filas base, así que la
+    normalización por fila es la misma que en `forge_daily_replicates`. Con
+    resample_guests=False los códigos de los huéspedes de cada bloque se guardan
+    (son arrays enteros pequeños) y se reutilizan en todas las réplicas. Cada
+    (réplica, bloque) usa el generador de `block_generators`, así que con la misma
+    semilla y `rows_per_chunk` los bloques concatenados son idénticos al resultado
+    de `forge_daily_replicates`.
+
+    Args:
+        rows_per_chunk (int): Filas del dataset base por bloque.
+        summary (dict, optional): Al terminar se rellena con 'num_guests' y
+            'normalization_info' de todas las réplicas.
+        (resto: ver `forge_daily_replicates`)
+
+    Yields:
+        tuple: (réplica, DataFrame del bloque con las columnas de `forge_daily_replicates`)
+    """
+    data = data.reset_index(drop=True)
+    plan = compile_distribution(dist)
+    base = encode_base(data, plan, rules)
+    effects = rule_effects(plan, rules)
+
+    edges = list(range(0, len(data), rows_per_chunk)) + [len(data)]
+    blocks = list(zip(edges[:-1], edges[1:]))
+    generators = block_generators(seed, n_replicates, len(blocks))
+    block_data = [data.iloc[r0:r1].reset_index(drop=True) for r0, r1 in blocks]
+    block_base = [{key: values[r0:r1] for key, values in base.items()} for r0, r1 in blocks]
+    shared_guests = {}
+
+    factors, num_guests = [], 0
+    for replicate in range(n_replicates):
+        for b, block in enumerate(block_base):
+            rng = generators[replicate][b]
+            if resample_guests:
+                guests = sample_guest_codes(block, plan, 1, rng)
+            else:
+                # Los huéspedes compartidos se muestrean con el generador de la primera réplica
+                if b not in shared_guests:
+                    shared_guests[b] = sample_guest_codes(block, plan, 1, rng)
+                guests = dict(shared_guests[b])
+
+            guests['Consumo medio'], guests['Consumo total'], block_factors = guest_consumption(
+                guests, block, effects, noise, 1, rng
+            )
+            guests['structure'] = np.full(len(guests['base_row']), replicate)
+            factors.append(block_factors)
+            num_guests += len(guests['base_row'])
+
+            yield replicate, guests_frame(block_data[b], plan, guests)
+
+    if summary is not None:
+        summary['num_guests'] = num_guests
+        summary['normalization_info'] = summarize_normalization_factors(np.concatenate(factors) if factors else [])
@@ -1,82 +1,336 @@
 import argparse
 import os
+import sys
+import numpy as np
 import pandas as pd
 import json
-import zipfile
 from datetime import datetime
 
-from multiprocessing import Pool, cpu_count
-
-from utils.aux import  normalize_df, normalize_probabilities, redistribute_importance
-from utils.correlation import calculate_correlation
-from utils.theorical_importance import calculate_theorical_importance
-
-from forge_daily import forge_daily_consumption
-from forge_hourly import forge_hourly_consumption
-from modelling import train_and_evaluate_models
+# Solo lo que usan todos los subcomandos: las dependencias de cada etapa (sklearn,
+# xgboost, statsmodels, scipy...) se importan dentro de su subcomando
+from utils.aux import normalize_probabilities
 
 from utils.paths import DATASET_PATH, FORGED_DAILY_PATH, DIST_DAILY_PATH, RULES_PATH, FORGED_HOURLY_PATH, DIST_HOURLY_PATH
-from utils.paths import PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP, PREFIX_FORGED_CSV, PREFIX_DIST_JSON, PREFIX_RULES_JSON
-from utils.io import load_daily_zip, save_daily_to_zip, save_hourly_to_zip, save_experiment_results
+from utils.paths import PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP, PROFILES_SUBDIR, RESULTS_DIR, RESULTS_PREFIX
+from utils.instrumentation import span, attach, start_recording, stop_recording
+from utils.io import save_daily_stream_to_zip, calendar_csv_name, load_daily_zip, load_daily_zip_json, load_daily_zip_info, update_daily_zip_info, load_hourly_zip, save_daily_to_zip, save_hourly_to_zip
 
 ONE_HOTEL = 'Costa Adeje Gran Hotel'
 CORR_THRESHOLD=0.8
 VIF_THRESHOLD=10
 
-def main(args):
+def run_mode(args):
+
+    ### BASE DATASET -- SYNTHETIC GENERATOR
+
+    if(args.mode == 'generate_base'):
+        from forge_base import write_base_dataset
+
+        os.makedirs(DATASET_PATH, exist_ok=True)
+        # El primer hotel se llama ONE_HOTEL para que los modos de forjado lo seleccionen
+        summary = write_base_dataset(
+            os.path.join(DATASET_PATH, args.data), args.hotels, n_years=args.years, start_year=args.start_year,
+            pax_scale=args.pax_scale, seed=args.seed, names=[ONE_HOTEL]
+        )
+        print(f"[INFO] Base dataset {summary['file']}: {summary['hotels']} hotels, {summary['rows']} rows, {summary['pax']} guest-nights")
+        return summary
+
 
     ### FORGE SECTION -- DAILY
 
     if(args.mode == 'forge_daily'):
-        data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
-        
-        with open(os.path.join(DIST_DAILY_PATH, args.dist), 'r') as file:
-            distributions = json.load(file)
+        from forge_daily import forge_daily_consumption
 
-        with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
-            rules = json.load(file)
+        with span('load'):
+            data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+
+            with open(os.path.join(DIST_DAILY_PATH, args.dist), 'r') as file:
+                distributions = json.load(file)
+
+            with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
+                rules = json.load(file)
 
         ### Synthetic data
-        noise_daily = 0.05
+        noise_daily = 0.05 if args.noise is None else args.noise
+
+        if args.seed is not None:
+            np.random.seed(args.seed)
 
         # Filter the DataFrame for a specific hotel
         hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]  # Just one hotel
 
         # Normalizar distribuciones
-        norm_dist = normalize_probabilities(distributions)
+        with span('normalize'):
+            norm_dist = normalize_probabilities(distributions)
 
         # Forjar datos sintéticos diarios
-        forged_df, normalization_info = forge_daily_consumption(hotel_df, norm_dist, rules, noise_daily)
+        with span('forge') as forged:
+            forged_df, normalization_info = forge_daily_consumption(hotel_df, norm_dist, rules, noise_daily)
+            forged['rows'] = len(forged_df)
 
         info = {
             'daily_index': os.path.join(FORGED_DAILY_PATH, f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}.zip"),
             'num_guests': len(forged_df['id_huesped'].unique()),
+            'data_file': args.data,
             'dist_file': args.dist,
             'rules_file': args.rules,
             'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
             'noise_daily': noise_daily,
+            'seed': args.seed,
             'normalization_info': normalization_info
         }
 
         # Guardar resultados en ZIP
-        save_daily_to_zip(forged_df, distributions, rules, info, folder=FORGED_DAILY_PATH)
+        return save_daily_to_zip(forged_df, distributions, rules, info, folder=FORGED_DAILY_PATH, shards=args.shards, shard_by=args.shard_by)
+
+
+    ### FORGE SECTION -- DRY RUN (EXPECTED SIZES, NO SAMPLING)
+
+    if(args.mode == 'dry_run'):
+        from forge_estimate import estimate_forge
+
+        data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+
+        with open(os.path.join(DIST_DAILY_PATH, args.dist), 'r') as file:
+            distributions = json.load(file)
+
+        with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
+            rules = json.load(file)
+
+        hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]  # Just one hotel
+        with span('normalize'):
+            norm_dist = normalize_probabilities(distributions)
+
+        estimate = estimate_forge(hotel_df, norm_dist, rules)
+
+        summary = {
+            'data_file': args.data,
+            'dist_file': args.dist,
+            'rules_file': args.rules,
+            'totals': estimate['totals'],
+            'outputs': estimate['outputs'],
+            'marginals': estimate['marginals'],
+            'rows': estimate['rows'].to_dict(orient='records'),
+        }
+        print(json.dumps(summary, indent=4, ensure_ascii=False, default=lambda value: value.item()))
+        return summary
+
+
+    ### FORGE SECTION -- DAILY, K REPLICATES IN ONE VECTORIZED PASS
+
+    if(args.mode == 'forge_daily_replicates'):
+        from forge_vectorized import BLOCK_ROWS, forge_daily_replicates, iter_daily_replicates
+
+        with span('load'):
+            data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+
+            with open(os.path.join(DIST_DAILY_PATH, args.dist), 'r') as file:
+                distributions = json.load(file)
+
+            with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
+                rules = json.load(file)
+
+        noise_daily = 0.05 if args.noise is None else args.noise
+
+        hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]  # Just one hotel
+        with span('normalize'):
+            norm_dist = normalize_probabilities(distributions)
+
+        # Generación, serialización y compresión solapadas por bloques
+        if args.pipeline:
+            info = {
+                'num_replicates': args.replicates,
+                'resample_guests': not args.shared_guests,
+                'data_file': args.data,
+                'dist_file': args.dist,
+                'rules_file': args.rules,
+                'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                'noise_daily': noise_daily,
+                'seed': args.seed,
+                'block_rows': BLOCK_ROWS,
+            }
+            chunks = iter_daily_replicates(
+                hotel_df, norm_dist, rules, noise_daily, n_replicates=args.replicates,
+                resample_guests=not args.shared_guests, seed=args.seed, summary=info
+            )
+            return save_daily_stream_to_zip(chunks, distributions, rules, info, folder=FORGED_DAILY_PATH,
+                                            partition_by='replicate', queue_size=args.queue_size)
+
+        with span('forge') as forged:
+            forged_df, normalization_info = forge_daily_replicates(
+                hotel_df, norm_dist, rules, noise_daily,
+                n_replicates=args.replicates, resample_guests=not args.shared_guests, seed=args.seed
+            )
+            forged['rows'] = len(forged_df)
+
+        info = {
+            'num_guests': int(forged_df.groupby('replicate')['id_huesped'].nunique().sum()),
+            'num_replicates': args.replicates,
+            'resample_guests': not args.shared_guests,
+            'data_file': args.data,
+            'dist_file': args.dist,
+            'rules_file': args.rules,
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'noise_daily': noise_daily,
+            'seed': args.seed,
+            'block_rows': BLOCK_ROWS,
+            'normalization_info': normalization_info
+        }
+
+        return save_daily_to_zip(forged_df, distributions, rules, info, folder=FORGED_DAILY_PATH, partition_by='replicate')
+
+
+    ### FORGE SECTION -- DAILY, MULTI-PROCESS WITH SHARED MEMORY
+
+    if(args.mode == 'forge_daily_parallel'):
+        from forge_parallel import forge_daily_parallel
+
+        with span('load'):
+            data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+
+            with open(os.path.join(DIST_DAILY_PATH, args.dist), 'r') as file:
+                distributions = json.load(file)
+
+            with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
+                rules = json.load(file)
+
+        noise_daily = 0.05 if args.noise is None else args.noise
+
+        hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]  # Just one hotel
+        with span('normalize'):
+            norm_dist = normalize_probabilities(distributions)
+
+        with span('forge') as forged:
+            forged_df, normalization_info = forge_daily_parallel(
+                hotel_df, norm_dist, rules, noise_daily, n_replicates=args.replicates,
+                resample_guests=not args.shared_guests, seed=args.seed, n_jobs=args.n_jobs
+            )
+            forged['rows'] = len(forged_df)
+
+        info = {
+            'num_guests': int(forged_df.groupby('replicate')['id_huesped'].nunique().sum()),
+            'num_replicates': args.replicates,
+            'resample_guests': not args.shared_guests,
+            'data_file': args.data,
+            'dist_file': args.dist,
+            'rules_file': args.rules,
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'noise_daily': noise_daily,
+            'seed': args.seed,
+            'normalization_info': normalization_info
+        }
+
+        # Con una sola réplica se guarda como un forjado diario normal
+        if args.replicates == 1:
+            return save_daily_to_zip(forged_df.drop(columns='replicate'), distributions, rules, info, folder=FORGED_DAILY_PATH,
+                                     shards=args.shards, shard_by=args.shard_by)
+        return save_daily_to_zip(forged_df, distributions, rules, info, folder=FORGED_DAILY_PATH, partition_by='replicate')
+
+
+    ### FORGE SECTION -- DAILY, NEW RULES ON AN EXISTING ARCHIVE
+
+    if(args.mode == 'rerule_daily'):
+        from forge_daily import rerule_daily_consumption
+
+        with span('load'):
+            forged_data_df, forged_dist, _ = load_daily_zip(FORGED_DAILY_PATH, args.daily_index, args.replicate)
+
+            with open(os.path.join(RULES_PATH, args.rules), 'r') as file:
+                rules = json.load(file)
+
+        noise_daily = 0.05 if args.noise is None else args.noise
+
+        if args.seed is not None:
+            np.random.seed(args.seed)
+
+        with span('forge', rows=len(forged_data_df)):
+            rerule_df, normalization_info = rerule_daily_consumption(forged_data_df, rules, noise_daily)
+
+        info = {
+            'source_daily_zip': os.path.join(FORGED_DAILY_PATH, f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}.zip"),
+            'num_guests': len(rerule_df['id_huesped'].unique()),
+            'rules_file': args.rules,
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'noise_daily': noise_daily,
+            'seed': args.seed,
+            'normalization_info': normalization_info
+        }
+
+        return save_daily_to_zip(rerule_df, forged_dist, rules, info, folder=FORGED_DAILY_PATH, shards=args.shards, shard_by=args.shard_by)
+
+
+    ### FORGE SECTION -- GOODNESS OF FIT OF A DAILY ARCHIVE
+
+    if(args.mode == 'validate_daily'):
+        from forge_validation import validate_forged_daily
+
+        source_info = load_daily_zip_info(FORGED_DAILY_PATH, args.daily_index)
+        data_df = pd.read_csv(os.path.join(DATASET_PATH, source_info.get('data_file', args.data)))
+
+        validation = validate_forged_daily(
+            FORGED_DAILY_PATH, args.daily_index, data_df, chunksize=args.chunksize, replicate=args.replicate
+        )
+        validation['date_validated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        for name, summary in validation['variables'].items():
+            print(f"[INFO] {name}: chi2={summary['chi2']} (dof={summary['dof']}, p={summary['p_value']}), TVD={summary['tvd']}")
+        consumption = validation['consumption']
+        print(f"[INFO] Consumo total vs Consumo Kw Electricidad: {consumption['mismatched_rows']} of {consumption['base_rows']} base rows mismatched")
+
+        update_daily_zip_info(FORGED_DAILY_PATH, args.daily_index, {'validation': validation})
+        return validation
+
+
+    ### FORGE SECTION -- OCCUPANCY AND LOAD CALENDAR OF A DAILY ARCHIVE
+
+    if(args.mode == 'calendar_daily'):
+        from forge_calendar import occupancy_calendar_from_zip
+
+        calendar_df = occupancy_calendar_from_zip(FORGED_DAILY_PATH, args.daily_index, args.replicate)
+        calendar_name = calendar_csv_name(args.daily_index, args.replicate)
+
+        summary = {
+            'file': calendar_name,
+            'rows': len(calendar_df),
+            'first_date': str(calendar_df['Fecha'].min().date()),
+            'last_date': str(calendar_df['Fecha'].max().date()),
+            'max_guests': int(calendar_df['Huespedes'].max()),
+            'max_rooms': int(calendar_df['Habitaciones ocupadas'].max()),
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        print(f"[INFO] Calendar {summary['first_date']} - {summary['last_date']}: max {summary['max_guests']} guests, {summary['max_rooms']} rooms")
+
+        # El calendario se guarda dentro del propio ZIP diario
+        update_daily_zip_info(
+            FORGED_DAILY_PATH, args.daily_index, {'calendar': summary},
+            members={calendar_name: calendar_df.to_csv(index=False, date_format='%Y-%m-%d')}
+        )
+        return summary
 
 
     ### FORGE SECTION -- hourly
     if(args.mode == 'forge_hourly'):
-        forged_data_df, _, _ = load_daily_zip(FORGED_DAILY_PATH, args.daily_index)
+        from forge_hourly import forge_hourly_consumption
+
+        with span('load'):
+            forged_data_df, _, _ = load_daily_zip(FORGED_DAILY_PATH, args.daily_index, args.replicate)
+
+            with open(os.path.join(DIST_HOURLY_PATH, args.profiles), 'r') as file:
+                profiles = json.load(file)
 
-        with open(os.path.join(DIST_HOURLY_PATH, args.profiles), 'r') as file:
-            profiles = json.load(file)
-        
         for key, profile in profiles.items():
             if len(profile['probabilidades']) != 24:
                 raise ValueError(f"Hourly profile '{key}' must have 24 probabilities, got {len(profile['probabilidades'])}.")
 
         norm_dist = normalize_probabilities(profiles)
 
-        noise_daily = 0.1
-        forged_hourly_df = forge_hourly_consumption(forged_data_df, norm_dist, noise_daily)
+        noise_daily = 0.1 if args.noise is None else args.noise
+
+        if args.seed is not None:
+            np.random.seed(args.seed)
+
+        with span('forge_hourly', rows=len(forged_data_df)):
+            forged_hourly_df = forge_hourly_consumption(forged_data_df, norm_dist, noise_daily)
 
         info = {
             'forged_daily_index': os.path.join(FORGED_DAILY_PATH, f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}.zip"),
@@ -87,19 +341,62 @@ def main(args):
             'noise_daily': noise_daily,
         }
 
-        save_hourly_to_zip(forged_hourly_df, profiles, info, FORGED_HOURLY_PATH)
+        return save_hourly_to_zip(forged_hourly_df, profiles, info, FORGED_HOURLY_PATH)
+
+
+    ### FORGE SECTION -- hourly, NEW PROFILES ON AN EXISTING ARCHIVE
+    if(args.mode == 'reprofile_hourly'):
+        from forge_hourly import reprofile_hourly_consumption
+
+        with span('load'):
+            hourly_df, _, source_info = load_hourly_zip(FORGED_HOURLY_PATH, args.hourly_index)
+
+            with open(os.path.join(DIST_HOURLY_PATH, args.profiles), 'r') as file:
+                profiles = json.load(file)
+
+        for key, profile in profiles.items():
+            if len(profile['probabilidades']) != 24:
+                raise ValueError(f"Hourly profile '{key}' must have 24 probabilities, got {len(profile['probabilidades'])}.")
+
+        norm_dist = normalize_probabilities(profiles)
+
+        # El reparto diario y el perfil de cada huésped se mantienen: solo cambian h0-h23
+        with span('reprofile_hourly', rows=len(hourly_df)):
+            reprofiled_df = reprofile_hourly_consumption(hourly_df, norm_dist)
+
+        info = {
+            'source_hourly_zip': os.path.join(FORGED_HOURLY_PATH, f"{PREFIX_HOURLY_ZIP}{args.hourly_index:04d}.zip"),
+            'forged_daily_index': source_info.get('forged_daily_index'),
+            'profiles_file': os.path.join(DIST_HOURLY_PATH, args.profiles),
+            'num_guests': len(reprofiled_df['id_huesped'].unique()),
+            'num_rows': len(reprofiled_df),
+            'date_generated': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'noise_daily': source_info.get('noise_daily'),
+        }
+
+        return save_hourly_to_zip(reprofiled_df, profiles, info, FORGED_HOURLY_PATH)
 
 
 
     ### MODELLING SECTION
 
     if(args.mode == 'modelling'):
+        from utils.aux import normalize_df, redistribute_importance
+        from utils.correlation import calculate_correlation
+        from utils.theorical_importance import calculate_theorical_importance
+        from utils.io import save_experiment_results
+        from modelling import prepare_features, split_train_test, train_and_evaluate_models
+        from modelling_permutation import permutation_importance_models
+        from modelling_resampling import resample_models
+        from modelling_progressive import progressive_train_and_evaluate
         
         # Load forged daily data from ZIP using the new utility function
-        forged_data_df, forged_dist, rules = load_daily_zip(FORGED_DAILY_PATH, args.daily_index)
+        with span('load'):
+            forged_data_df, forged_dist, rules = load_daily_zip(FORGED_DAILY_PATH, args.daily_index, args.replicate)
+            forge_info = load_daily_zip_info(FORGED_DAILY_PATH, args.daily_index)
 
-        # Load the original dataset
-        data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+            # Load the original dataset
+            data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
 
         print(f"[INFO] Using daily forged ZIP index: {args.daily_index}")
 
@@ -108,7 +405,16 @@ def main(args):
         forged_df = forged_data_df[forged_data_df['Hotel'] == ONE_HOTEL]
         hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]
 
-        importance_df, eliminated_vars, model_storage = train_and_evaluate_models(forged_df)
+        with span('modelling', rows=len(forged_df)):
+            prepared = prepare_features(forged_df, CORR_THRESHOLD, VIF_THRESHOLD)
+            if args.progressive:
+                # Submuestras estratificadas crecientes hasta que importancias y errores convergen
+                importance_df, eliminated_vars, model_storage, progressive = progressive_train_and_evaluate(
+                    forged_df, prepared, start=args.progressive_start, growth=args.progressive_growth,
+                    tol=args.progressive_tol, patience=args.progressive_patience
+                )
+            else:
+                importance_df, eliminated_vars, model_storage = train_and_evaluate_models(forged_df, prepared=prepared)
         correlation = calculate_correlation(forged_df, eliminated_vars)
         theorical_importance = calculate_theorical_importance(rules, forged_dist, hotel_df)
 
@@ -125,6 +431,11 @@ def main(args):
             'experiment_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),  # Fecha y hora del experimento
             'input_data_file': os.path.join('data', args.data),
             'forged_data_file': os.path.join('forged', 'daily', f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}.zip"),
+            # Entradas del forjado, para comparar experimentos por caso (`utils.results_index`)
+            'dist_file': forge_info.get('dist_file'),
+            'rules_file': forge_info.get('rules_file'),
+            'noise_daily': forge_info.get('noise_daily'),
+            'seed': forge_info.get('seed'),
             'experiment_description': "Generación y análisis de datos sintéticos de turistas.",
             'library_versions': {
                 'scikit-learn': '1.5.2',
@@ -141,22 +452,218 @@ def main(args):
                 'encoding': 'One-Hot'
             }
         }
-    
-        save_experiment_results(info, model_storage, importance_combined_normalized, eliminated_vars)
 
-if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument(
-        '--mode',
-        choices=['forge_daily', 'forge_daily_parallel', 'forge_hourly', 'modelling'],
-        type=str,
-        help="Available modes: forge (daily), forge_hourly (hourly consumption), modelling."
-    )
-    parser.add_argument("--data", type=str, default="default.csv", help="Specifies the name of the CSV file located in the 'data/dataset' folder. Defaults to 'default.csv' if not provided.")
-    parser.add_argument("--dist", type=str, default="default.json", help="Specifies the name of the JSON file containing data daily distributions located in the 'data/dist/daily' folder. Defaults to 'default.json' if not provided.")
-    parser.add_argument("--rules", type=str, default="default.json", help="Specifies the name of the JSON file containing consumption rules located in the 'data/rules' folder. Defaults to 'default.csv' if not provided.")
-    parser.add_argument("--profiles", type=str, default="default.json", help="Specifies the name of the JSON file containing hourly consumption profiles located in the 'data/dist/hourly' folder. Defaults to 'default.csv' if not provided.")
-    parser.add_argument(
+        extra_info = {}
+        extra_importances = {}
+
+        if args.progressive:
+            info['experiment_parameters']['progressive'] = {
+                'start': args.progressive_start,
+                'growth': args.progressive_growth,
+                'tol': args.progressive_tol,
+                'patience': args.progressive_patience
+            }
+            info['progressive_sampling'] = {key: progressive[key] for key in ['sample_sizes', 'train_rows', 'converged']}
+            extra_info['progressive_sampling'] = progressive
+
+        # Intervalos de confianza por remuestreo (bootstrap o validación cruzada)
+        if args.resampling != 'none':
+            X, y, _, _ = prepared
+            with span('resampling', rows=len(X)):
+                importance_summary, error_summary = resample_models(
+                    X, y, method=args.resampling, n_splits=args.n_splits, n_jobs=args.n_jobs
+                )
+            extra_importances['importance_resampling'] = importance_summary
+            extra_info['error_metrics_resampling'] = error_summary
+            info['experiment_parameters']['resampling'] = args.resampling
+            info['experiment_parameters']['n_splits'] = args.n_splits
+
+        # Importancia por permutación (comparable entre modelos)
+        if args.permutation_repeats > 0:
+            X, y, _, _ = prepared
+            _, X_test, _, y_test = split_train_test(X, y)
+            with span('permutation', rows=len(X_test)):
+                extra_importances['permutation_importance'] = permutation_importance_models(
+                    model_storage['models'], X_test, y_test, n_repeats=args.permutation_repeats, n_jobs=args.n_jobs
+                )
+            info['experiment_parameters']['permutation_repeats'] = args.permutation_repeats
+
+        return save_experiment_results(info, model_storage, importance_combined_normalized, eliminated_vars,
+                                       extra_info=extra_info, extra_importances=extra_importances)
+
+    ### MODELLING SECTION -- OUT-OF-CORE
+
+    if(args.mode == 'modelling_chunked'):
+        from utils.aux import normalize_df, redistribute_importance
+        from utils.theorical_importance import calculate_theorical_importance
+        from utils.io import save_experiment_results
+        from modelling_chunked import train_and_evaluate_models_chunked
+
+        # Only the JSON files are read; the forged CSV is streamed in chunks
+        forged_dist, rules = load_daily_zip_json(FORGED_DAILY_PATH, args.daily_index)
+        forge_info = load_daily_zip_info(FORGED_DAILY_PATH, args.daily_index)
+
+        data_df = pd.read_csv(os.path.join(DATASET_PATH, args.data))
+        hotel_df = data_df[data_df['Hotel'] == ONE_HOTEL]
+
+        print(f"[INFO] Using daily forged ZIP index: {args.daily_index} (chunks of {args.chunksize} rows)")
+
+        with span('modelling'):
+            importance_df, eliminated_vars, model_storage, correlation = train_and_evaluate_models_chunked(
+                FORGED_DAILY_PATH, args.daily_index, hotel=ONE_HOTEL, chunksize=args.chunksize,
+                corr_threshold=CORR_THRESHOLD, vif_threshold=VIF_THRESHOLD, replicate=args.replicate
+            )
+        theorical_importance = calculate_theorical_importance(rules, forged_dist, hotel_df)
+
+        updated_importance = redistribute_importance(eliminated_vars, theorical_importance)
+
+        importance_combined = pd.merge(importance_df, updated_importance, on='Feature', how='inner')
+        importance_combined = pd.merge(importance_combined, correlation, on='Feature', how='inner')
+
+        importance_combined_normalized = normalize_df(importance_combined)
+
+        info = {
+            'experiment_id': '',
+            'experiment_date': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            'input_data_file': os.path.join('data', args.data),
+            'forged_data_file': os.path.join('forged', 'daily', f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}.zip"),
+            # Entradas del forjado, para comparar experimentos por caso (`utils.results_index`)
+            'dist_file': forge_info.get('dist_file'),
+            'rules_file': forge_info.get('rules_file'),
+            'noise_daily': forge_info.get('noise_daily'),
+            'seed': forge_info.get('seed'),
+            'experiment_description': "Generación y análisis de datos sintéticos de turistas (entrenamiento out-of-core).",
+            'library_versions': {
+                'scikit-learn': '1.5.2',
+                'xgboost': '2.1.3',
+                'pandas': '2.2.2'
+            },
+            'experiment_parameters': {
+                'corr_threshold': CORR_THRESHOLD,
+                'vif_threshold': VIF_THRESHOLD,
+                'chunksize': args.chunksize
+            },
+            'data_processing': {
+                'missing_values': 'Eliminados',
+                'scaling': 'Sí',
+                'encoding': 'One-Hot'
+            }
+        }
+
+        return save_experiment_results(info, model_storage, importance_combined_normalized, eliminated_vars)
+
+    ### PREDICTION SECTION -- SAVED EXPERIMENT MODELS ON A DAILY ZIP
+
+    if(args.mode == 'predict'):
+        from modelling_prediction import score_daily_zip
+
+        experiment = f"{RESULTS_PREFIX}{args.experiment:04d}"
+        prediction_dir = os.path.join(RESULTS_DIR, experiment, 'prediction')
+        os.makedirs(prediction_dir, exist_ok=True)
+        stem = f"{PREFIX_DAILY_ZIP}{args.daily_index:04d}" + ('' if args.replicate is None else f"_replicate_{args.replicate:04d}")
+
+        print(f"[INFO] Scoring daily forged ZIP {args.daily_index} with {experiment} (chunks of {args.chunksize} rows)")
+        with span('predict'):
+            errors = score_daily_zip(
+                experiment, FORGED_DAILY_PATH, args.daily_index, replicate=args.replicate, hotel=ONE_HOTEL,
+                models=args.models, chunksize=args.chunksize, n_jobs=args.n_jobs,
+                output=os.path.join(prediction_dir, f"{stem}.csv") if args.save_predictions else None
+            )
+        print(errors.to_string(index=False))
+
+        errors_path = os.path.join(prediction_dir, f"{stem}_errors.json")
+        with open(errors_path, 'w') as file:
+            json.dump(attach({'daily_index': args.daily_index, 'replicate': args.replicate, 'hotel': ONE_HOTEL,
+                              'error_metrics': errors.set_index('Model').to_dict(orient='index')}), file, indent=4)
+        return errors_path
+
+# Modos que guardan un ZIP nuevo: el índice devuelto da nombre a los informes de --profile
+DAILY_OUTPUT_MODES = ['forge_daily', 'forge_daily_replicates', 'forge_daily_parallel', 'rerule_daily']
+HOURLY_OUTPUT_MODES = ['forge_hourly', 'reprofile_hourly']
+
+def profile_output(args, result):
+    """
+    Folder and file stem of the --profile reports: the 'profiles' folder next to the
+    ZIP written by the run (or inside the experiment folder), named after its index.
+    Runs that fail or write no new output use the daily folder with the mode and time.
+    """
+    if args.mode in DAILY_OUTPUT_MODES and isinstance(result, int):
+        return os.path.join(FORGED_DAILY_PATH, PROFILES_SUBDIR), f"{PREFIX_DAILY_ZIP}{result:04d}"
+    if args.mode in HOURLY_OUTPUT_MODES and isinstance(result, int):
+        return os.path.join(FORGED_HOURLY_PATH, PROFILES_SUBDIR), f"{PREFIX_HOURLY_ZIP}{result:04d}"
+    if args.mode in ['modelling', 'modelling_chunked'] and isinstance(result, str):
+        return os.path.join(result, PROFILES_SUBDIR), 'experiment'
+    if args.mode == 'predict' and isinstance(result, str):
+        return os.path.join(os.path.dirname(result), PROFILES_SUBDIR), os.path.basename(result)[:-len('_errors.json')]
+    return os.path.join(FORGED_DAILY_PATH, PROFILES_SUBDIR), f"{args.mode}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+
+def main(args):
+    """
+    Run a subcommand while recording its stages (`utils.instrumentation`). The spans
+    finished before the outputs are saved are stored in their info JSON; with
+    `--events`, every span is also streamed to a JSON-lines file.
+
+    With `--profile` and/or `--profile_lines` the run is also profiled and the
+    reports are written where `profile_output` says, even if the run fails.
+    """
+    profiler = None
+    if getattr(args, 'profile', None) or getattr(args, 'profile_lines', False):
+        from utils.profiling import RunProfiler
+        profiler = RunProfiler(args.profile, interval=args.profile_interval / 1000, line_functions=args.profile_lines)
+
+    start_recording(getattr(args, 'events', None))
+    result = None
+    try:
+        if profiler is not None:
+            profiler.start()
+        result = run_mode(args)
+        return result
+    finally:
+        if profiler is not None:
+            profiler.stop()
+            folder, stem = profile_output(args, result)
+            for path in profiler.write(folder, stem, top=args.profile_top):
+                print(f"[INFO] Profile report: {path}")
+        stop_recording()
+
+# Subcomandos: (descripción, grupos de opciones)
+SUBCOMMANDS = {
+    'generate_base': ("Write a synthetic base dataset to 'data/dataset'.", ['output', 'generator']),
+    'forge_daily': ("Forge the daily guest dataset.", ['inputs', 'forge', 'source', 'shards']),
+    'forge_daily_parallel': ("Multi-process forge over shared memory.", ['inputs', 'forge', 'replicates', 'jobs', 'shards']),
+    'dry_run': ("Expected forge sizes without sampling.", ['inputs']),
+    'forge_daily_replicates': ("K replicates in one vectorized pass.", ['inputs', 'forge', 'replicates', 'pipeline']),
+    'rerule_daily': ("New rules on an existing daily ZIP.", ['inputs', 'forge', 'source', 'shards']),
+    'validate_daily': ("Goodness of fit of a daily ZIP.", ['inputs', 'source', 'chunks']),
+    'calendar_daily': ("Daily occupancy and load calendar of a daily ZIP.", ['source']),
+    'forge_hourly': ("Hourly consumption of a daily ZIP.", ['forge', 'source', 'profiles']),
+    'reprofile_hourly': ("New profiles on an existing hourly ZIP.", ['profiles']),
+    'modelling': ("Train the models on a daily ZIP.", ['inputs', 'source', 'jobs', 'resampling', 'progressive']),
+    'modelling_chunked': ("Out-of-core modelling on a daily ZIP.", ['inputs', 'source', 'chunks']),
+    'predict': ("Score a daily ZIP with the saved models of an experiment.", ['source', 'chunks', 'jobs', 'prediction']),
+}
+
+def _option_groups():
+    """Parsers padre con las opciones de cada grupo de `SUBCOMMANDS`."""
+    groups = {name: argparse.ArgumentParser(add_help=False) for name in
+              ['output', 'generator', 'inputs', 'forge', 'source', 'shards', 'replicates', 'jobs', 'pipeline', 'chunks', 'profiles', 'resampling', 'progressive', 'prediction', 'instrumentation', 'profiling']}
+
+    groups['inputs'].add_argument("--data", type=str, default="default.csv", help="Specifies the name of the CSV file located in the 'data/dataset' folder. Defaults to 'default.csv' if not provided.")
+    groups['inputs'].add_argument("--dist", type=str, default="default.json", help="Specifies the name of the JSON file containing data daily distributions located in the 'data/dist/daily' folder. Defaults to 'default.json' if not provided.")
+    groups['inputs'].add_argument("--rules", type=str, default="default.json", help="Specifies the name of the JSON file containing consumption rules located in the 'data/rules' folder. Defaults to 'default.csv' if not provided.")
+
+    groups['output'].add_argument("--data", type=str, default="synthetic.csv", help="Name of the CSV written to the 'data/dataset' folder. Defaults to 'synthetic.csv'.")
+
+    groups['generator'].add_argument("--hotels", type=int, default=10, help="Number of hotels of the synthetic base dataset. Defaults to 10.")
+    groups['generator'].add_argument("--years", type=int, default=2, help="Consecutive years of the synthetic base dataset. Defaults to 2.")
+    groups['generator'].add_argument("--start_year", type=int, default=2022, help="First year of the synthetic base dataset. Defaults to 2022.")
+    groups['generator'].add_argument("--pax_scale", type=float, default=1.0, help="Scale of the monthly Pax (1 ≈ 1500-6500 guest-nights per hotel and month). Defaults to 1.")
+    groups['generator'].add_argument("--seed", type=int, default=None, help="Random seed of the generator. Not fixed by default.")
+
+    groups['forge'].add_argument("--noise", type=float, default=None, help="Relative noise of the forge modes. Defaults to 0.05 for forge_daily and 0.1 for forge_hourly.")
+    groups['forge'].add_argument("--seed", type=int, default=None, help="Random seed of the forge modes. Not fixed by default.")
+
+    groups['source'].add_argument(
     "-i",
     "--daily_index",
     type=int,
@@ -165,6 +672,70 @@ if __name__ == "__main__":
          "For example, 1 → TouristForge_0001.zip. "
          "Used by hourly forge and modelling modes."
     )
-    args = parser.parse_args()
+    groups['source'].add_argument("--replicate", type=int, default=None, help="Replicate to read from a daily ZIP generated with 'forge_daily_replicates'.")
+
+    groups['shards'].add_argument("--shards", type=int, default=None, help="Split the forged CSV of 'forge_daily', 'rerule_daily' and single-replicate 'forge_daily_parallel' ZIPs into this many shards with a manifest. Not sharded by default.")
+    groups['shards'].add_argument("--shard_by", choices=['month', 'rows'], default='month', help="Shard boundaries: whole hotel months ('month') or equal row ranges ('rows'). Defaults to 'month'.")
+
+    groups['replicates'].add_argument("--replicates", type=int, default=10, help="Number of replicates generated in 'forge_daily_replicates' and 'forge_daily_parallel' modes. Defaults to 10.")
+    groups['replicates'].add_argument("--shared_guests", action='store_true', help="In 'forge_daily_replicates' and 'forge_daily_parallel' modes, sample the guests once and vary only the consumption noise across replicates.")
+
+    groups['jobs'].add_argument("--n_jobs", type=int, default=None, help="Number of worker processes for parallel stages. Defaults to the number of CPUs.")
+
+    groups['pipeline'].add_argument("--pipeline", action='store_true', help="In 'forge_daily_replicates' mode, overlap generation, CSV serialization and compression with bounded queues.")
+    groups['pipeline'].add_argument("--queue_size", type=int, default=4, help="Chunks held by each queue of the --pipeline mode. Defaults to 4.")
+
+    groups['chunks'].add_argument("--chunksize", type=int, default=100_000, help="Rows per chunk streamed from the daily forged ZIP in 'modelling_chunked' and 'validate_daily' modes. Defaults to 100000.")
+
+    groups['profiles'].add_argument("--profiles", type=str, default="default.json", help="Specifies the name of the JSON file containing hourly consumption profiles located in the 'data/dist/hourly' folder. Defaults to 'default.csv' if not provided.")
+    groups['profiles'].add_argument("--hourly_index", type=int, default=1, help="Index of the hourly forged ZIP used as input by 'reprofile_hourly' mode. Defaults to 1.")
+
+    groups['resampling'].add_argument("--resampling", choices=['none', 'bootstrap', 'cv'], default='none', help="Resampling used in 'modelling' mode to estimate confidence intervals of importances and errors. Defaults to 'none'.")
+    groups['resampling'].add_argument("--n_splits", type=int, default=100, help="Number of bootstrap replicates or CV folds when --resampling is enabled. Defaults to 100.")
+    groups['resampling'].add_argument("--permutation_repeats", type=int, default=0, help="Repeats of the grouped permutation importance computed in 'modelling' mode. Disabled (0) by default.")
+
+    groups['progressive'].add_argument("--progressive", action='store_true', help="In 'modelling' mode, train on stratified subsamples of growing size of the training split and stop once importances and errors converge.")
+    groups['progressive'].add_argument("--progressive_start", type=int, default=5000, help="Rows of the first --progressive step. Defaults to 5000.")
+    groups['progressive'].add_argument("--progressive_growth", type=float, default=2.0, help="Size ratio between consecutive --progressive steps. Defaults to 2.")
+    groups['progressive'].add_argument("--progressive_tol", type=float, default=0.03, help="Largest importance shift (total variation) and relative RMSE change between steps accepted as converged. Defaults to 0.03.")
+    groups['progressive'].add_argument("--progressive_patience", type=int, default=1, help="Consecutive converged --progressive steps needed to stop. Defaults to 1.")
+
+    groups['prediction'].add_argument("--experiment", type=int, required=True, help="Index of the experiment whose saved models are used, e.g. 3 → results/experiment_0003.")
+    groups['prediction'].add_argument("--models", nargs='+', default=None, help="Models of the experiment to score with. Defaults to all the saved models.")
+    groups['prediction'].add_argument("--save_predictions", action='store_true', help="Write the per-row predictions to the 'prediction' folder of the experiment, next to the errors JSON.")
+
+    groups['instrumentation'].add_argument("--events", type=str, default=None, help="Append the start and end of every stage (wall and CPU time, rows, RSS) to this JSON-lines file. Disabled by default.")
+
+    groups['profiling'].add_argument("--profile", choices=['sample', 'cprofile'], default=None, help="Profile the run with a sampling profiler ('sample', low overhead) or cProfile ('cprofile', exact call counts) and write collapsed stacks and a top-N summary next to its output. Disabled by default.")
+    groups['profiling'].add_argument("--profile_interval", type=float, default=10.0, help="Milliseconds between samples of --profile sample. Defaults to 10.")
+    groups['profiling'].add_argument("--profile_top", type=int, default=30, help="Functions listed in the top-N summary of --profile. Defaults to 30.")
+    groups['profiling'].add_argument("--profile_lines", action='store_true', help="Time forge_daily_consumption and forge_hourly_consumption line by line (high overhead; diagnostic runs only).")
+    return groups
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Synthetic tourist consumption: forge, validation and modelling stages.")
+    subparsers = parser.add_subparsers(dest='mode', required=True, metavar='mode')
+    groups = _option_groups()
+    for mode, (description, options) in SUBCOMMANDS.items():
+        subparsers.add_parser(mode, help=description, description=description, parents=[groups[name] for name in options + ['instrumentation', 'profiling']])
+    return parser
+
+def parse_args(argv=None):
+    """
+    Parse the command line. The former `--mode <mode>` form is still accepted and
+    rewritten as the `<mode>` subcommand.
+    """
+    argv = list(sys.argv[1:] if argv is None else argv)
+    for position, value in enumerate(argv):
+        if value == '--mode' and position + 1 < len(argv):
+            argv = [argv[position + 1]] + argv[:position] + argv[position + 2:]
+            break
+        if value.startswith('--mode='):
+            argv = [value.split('=', 1)[1]] + argv[:position] + argv[position + 1:]
+            break
+    return build_parser().parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
 
-    main(args)
\ No newline at end of file
+    main(args)
@@ -8,10 +8,72 @@ from sklearn.metrics import root_mean_squared_error, mean_absolute_error
 from statsmodels.stats.outliers_influence import variance_inflation_factor
 import numpy as np
 
-def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
+from utils.instrumentation import span
+
+# Variables used to predict 'Consumo medio'
+FEATURES = ['Dias de estancia']
+CATEGORICAL_FEATURES = ['sexo','nacionalidad','edad','tipo_habitacion','uso_instalaciones','viaje','comparte_habitacion']
+TARGET = 'Consumo medio'
+
+def build_models():
     """
-    Train multiple models to predict ‘Average consumption’, applying correlation thresholds and VIFs 
-    to remove highly correlated and multicollinear features.
+    Build the zoo of regression models trained in every experiment.
+
+    Returns:
+        dict: Model name -> unfitted estimator.
+    """
+    return {
+        'RandomForest': RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42),
+        'AdaBoost': AdaBoostRegressor(n_estimators=100, random_state=42),
+        'Ridge': Ridge(alpha=1.0, random_state=42),
+        'Lasso': Lasso(alpha=0.1, random_state=42),
+        #'NaiveBayes': GaussianNB(),  # Para clasificación, no regresión, pero puede adaptarse
+        'BayesianRidge': BayesianRidge(),  # Alternativa bayesiana para regresión
+        'XGBoost': xgb.XGBRegressor(n_estimators=100, random_state=42)
+    }
+
+def extract_importance(model):
+    """
+    Extract the feature importances of a fitted model.
+
+    Args:
+        model: Fitted estimator.
+
+    Returns:
+        np.ndarray | float: `feature_importances_` for tree ensembles, `abs(coef_)` for
+        linear models, NaN if the model exposes neither.
+    """
+    if hasattr(model, 'feature_importances_'):
+        return model.feature_importances_
+    elif hasattr(model, 'coef_'):
+        return np.abs(model.coef_)  # Usamos el valor absoluto de los coeficientes
+    else:
+        return np.nan  # En caso de que el modelo no tenga importancias
+
+def feature_schema(categories, columns):
+    """
+    Encoded feature layout of a trained experiment, saved as `info/feature_schema.json`
+    so new data can be scored with the same columns (`modelling_prediction`).
+
+    Args:
+        categories (dict): Categorical column -> levels, in `pd.get_dummies` order.
+        columns (list): Columns the models were fitted on, after correlation/VIF pruning.
+
+    Returns:
+        dict: 'features' (numeric, scaled with `X_scaler` and cast to int64 as in
+        `prepare_features`), 'categories' (levels as strings, the suffix of the
+        one-hot column names), 'columns' and 'target'.
+    """
+    return {
+        'features': list(FEATURES),
+        'categories': {col: [str(value) for value in levels] for col, levels in categories.items()},
+        'columns': list(columns),
+        'target': TARGET,
+    }
+
+def prepare_features(data, corr_threshold=0.8, vif_threshold=10):
+    """
+    Encode, clean, prune and scale the features used to predict ‘Average consumption’.
 
     Args:
         data: A DataFrame containing the dataset with features and the target variable ‘Average Consumption’.
@@ -19,18 +81,17 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
         vif_threshold: Variance Inflation Factor (VIF) threshold to remove multicollinear features.
 
     Returns:
-        importance_df: DataFrame with the importance of the features for each trained model.
+        X: DataFrame with the encoded, pruned and scaled features.
+        y: Array with the scaled target.
         eliminated_vars: Dictionary with the eliminated variables and the variables with which they are correlated or their VIF.
-        model_storage: Dictionary with the trained models and the scalers used.
+        scalers: Dictionary with the fitted 'X_scaler' and 'y_scaler'.
     """
-
-
-    # Variables used to predict 'Consumo medio'
-    features = ['Dias de estancia']
-    categorical_features = ['sexo','nacionalidad','edad','tipo_habitacion','uso_instalaciones','viaje','comparte_habitacion']
+    features = FEATURES
+    categorical_features = CATEGORICAL_FEATURES
 
     # Convert categorical variables to dummy variables (one-hot encoding)
-    data_encoded = pd.get_dummies(data, columns=categorical_features, drop_first=False)
+    with span('encode', rows=len(data)):
+        data_encoded = pd.get_dummies(data, columns=categorical_features, drop_first=False)
 
     # Convertir solo columnas booleanas a 0 y 1
     for col in data_encoded.columns:
@@ -39,7 +100,7 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
 
     # Define X and y
     X = data_encoded[features + [col for col in data_encoded.columns if col.startswith(tuple(categorical_features))]]
-    y = data_encoded['Consumo medio']
+    y = data_encoded[TARGET]
 
     # Make a copy of X to avoid the SettingWithCopyWarning
     X = X.copy()
@@ -65,22 +126,23 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
             X.drop(col, axis=1, inplace=True)  # Drop the variable
 
     # Remove multicollinear features based on VIF threshold
-    while True:
-        vif = pd.DataFrame()
-        vif['Variable'] = X.columns
-        vif['VIF'] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
-
-        if vif['VIF'].max() > vif_threshold:
-            max_vif_var = vif.sort_values(by='VIF', ascending=False).iloc[0]['Variable']
-            print(f'Eliminating {max_vif_var} due to high VIF: {vif["VIF"].max()}')
-            vif_value = vif.loc[vif['Variable'] == max_vif_var, 'VIF'].values[0]
-            # Convertir a string, manejando el caso de Infinity
-            if np.isinf(vif_value):
-                vif_value = 'Infinity'
-            eliminated_vars['VIF'][max_vif_var] = {'VIF': str(vif_value)}
-            X.drop(max_vif_var, axis=1, inplace=True)  # Drop the variable
-        else:
-            break
+    with span('VIF', rows=len(X)):
+        while True:
+            vif = pd.DataFrame()
+            vif['Variable'] = X.columns
+            vif['VIF'] = [variance_inflation_factor(X.values, i) for i in range(X.shape[1])]
+
+            if vif['VIF'].max() > vif_threshold:
+                max_vif_var = vif.sort_values(by='VIF', ascending=False).iloc[0]['Variable']
+                print(f'Eliminating {max_vif_var} due to high VIF: {vif["VIF"].max()}')
+                vif_value = vif.loc[vif['Variable'] == max_vif_var, 'VIF'].values[0]
+                # Convertir a string, manejando el caso de Infinity
+                if np.isinf(vif_value):
+                    vif_value = 'Infinity'
+                eliminated_vars['VIF'][max_vif_var] = {'VIF': str(vif_value)}
+                X.drop(max_vif_var, axis=1, inplace=True)  # Drop the variable
+            else:
+                break
 
     # Scale numerical variables
     scaler_X = StandardScaler()
@@ -90,18 +152,43 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
     X.loc[:, features] = scaled_values.astype(np.int64)
     y = scaler_y.fit_transform(y.values.reshape(-1, 1)).flatten()
 
+    return X, y, eliminated_vars, {'X_scaler': scaler_X, 'y_scaler': scaler_y}
+
+def split_train_test(X, y):
+    """
+    Hold-out split used by every experiment (80/20, fixed seed), so later stages
+    can rebuild the exact test set of `train_and_evaluate_models`.
+    """
+    return train_test_split(X, y, test_size=0.2, random_state=42)
+
+def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10, prepared=None, sample=None):
+    """
+    Train multiple models to predict ‘Average consumption’, applying correlation thresholds and VIFs 
+    to remove highly correlated and multicollinear features.
+
+    Args:
+        data: A DataFrame containing the dataset with features and the target variable ‘Average Consumption’.
+        corr_threshold: Correlation threshold to remove highly correlated variables.
+        vif_threshold: Variance Inflation Factor (VIF) threshold to remove multicollinear features.
+        prepared: Optional output of `prepare_features` for `data`, to avoid encoding it twice.
+        sample: Optional positions within the training split to fit on (see `modelling_progressive`).
+            The models are always evaluated on the whole test split.
+
+    Returns:
+        importance_df: DataFrame with the importance of the features for each trained model.
+        eliminated_vars: Dictionary with the eliminated variables and the variables with which they are correlated or their VIF.
+        model_storage: Dictionary with the trained models and the scalers used.
+    """
+    if prepared is None:
+        prepared = prepare_features(data, corr_threshold, vif_threshold)
+    X, y, eliminated_vars, scalers = prepared
+
     # Split data into training and testing sets
-    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    X_train, X_test, y_train, y_test = split_train_test(X, y)
+    if sample is not None:
+        X_train, y_train = X_train.iloc[sample], y_train[sample]
 
-    models = {
-        'RandomForest': RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42),
-        'AdaBoost': AdaBoostRegressor(n_estimators=100, random_state=42),
-        'Ridge': Ridge(alpha=1.0, random_state=42),
-        'Lasso': Lasso(alpha=0.1, random_state=42),
-        #'NaiveBayes': GaussianNB(),  # Para clasificación, no regresión, pero puede adaptarse
-        'BayesianRidge': BayesianRidge(),  # Alternativa bayesiana para regresión
-        'XGBoost': xgb.XGBRegressor(n_estimators=100, random_state=42)
-    }
+    models = build_models()
 
     # Crear un DataFrame para almacenar las importancias
     importance_df = pd.DataFrame({'Feature': X.columns})
@@ -109,13 +196,16 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
     # Diccionario para guardar los modelos y escaladores
     model_storage = {
         'models': {},
-        'scalers': {'X_scaler': scaler_X, 'y_scaler': scaler_y},
-        'error_metrics': {}
+        'scalers': scalers,
+        'error_metrics': {},
+        # Mismos niveles (y orden) que pd.get_dummies en prepare_features
+        'schema': feature_schema({col: pd.Categorical(data[col]).categories for col in CATEGORICAL_FEATURES}, X.columns)
     }
 
     # Entrenar cada modelo y extraer las importancias
     for name, model in models.items():
-        model.fit(X_train, y_train)
+        with span(f'fit_{name}', rows=len(X_train)):
+            model.fit(X_train, y_train)
 
         # Guardar el modelo en el diccionario
         model_storage['models'][name] = model
@@ -133,14 +223,7 @@ def train_and_evaluate_models(data, corr_threshold=0.8, vif_threshold=10):
         model_storage['error_metrics'][name] = {'RMSE': rmse, 'MAE': mae}
 
         # Calculo de importancias
-        if hasattr(model, 'feature_importances_'):
-            importance = model.feature_importances_
-        elif hasattr(model, 'coef_'):
-            importance = np.abs(model.coef_)  # Usamos el valor absoluto de los coeficientes
-        else:
-            importance = np.nan  # En caso de que el modelo no tenga importancias
-        
-        importance_df[name] = importance
+        importance_df[name] = extract_importance(model)
 
     # Ordenar el DataFrame por la importancia del Random Forest
     importance_df = importance_df.sort_values(by='RandomForest', ascending=False)
@@ -0,0 +1,464 @@
+import inspect
+import tempfile
+import numpy as np
+import pandas as pd
+import xgboost as xgb
+from sklearn.linear_model import BayesianRidge, Lasso, Ridge
+from sklearn.preprocessing import StandardScaler
+from statsmodels.stats.outliers_influence import variance_inflation_factor
+
+from modelling import FEATURES, CATEGORICAL_FEATURES, TARGET, feature_schema
+from utils.io import iter_daily_zip_chunks
+
+TEST_SIZE = 0.2
+SPLIT_SEED = 42
+
+# statsmodels >= 0.15 estandariza las columnas en `variance_inflation_factor`
+VIF_STANDARDIZE = 'standardize' in inspect.signature(variance_inflation_factor).parameters
+
+
+class StreamingMoments:
+    """
+    Sufficient statistics of a stream of numeric matrices: row count, column sums
+    and the uncentered Gram matrix (X^T X).
+
+    They are enough to recover means, Pearson correlations and the
+    Variance Inflation Factors exactly, without keeping the rows in memory.
+    """
+
+    def __init__(self, n_cols):
+        self.n = 0
+        self.sum = np.zeros(n_cols)
+        self.gram = np.zeros((n_cols, n_cols))
+
+    def update(self, values):
+        self.n += values.shape[0]
+        self.sum += values.sum(axis=0)
+        self.gram += values.T @ values
+
+    def corr(self):
+        """Pearson correlation matrix (NaN for constant columns, as `DataFrame.corr`)."""
+        mean = self.sum / self.n
+        cov = (self.gram - self.n * np.outer(mean, mean)) / (self.n - 1)
+        std = np.sqrt(np.clip(np.diag(cov), 0, None))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return cov / np.outer(std, std)
+
+    def vif(self, idx, standardize=VIF_STANDARDIZE):
+        """
+        VIF of each column in `idx` against the others, computed as statsmodels'
+        `variance_inflation_factor` does: OLS of the column on the others without
+        an added constant.
+
+        With `standardize` (statsmodels >= 0.15) the columns are centered first,
+        so the R^2 is the centered one and it is clipped at 1 - 1e-15 (a perfect
+        fit gives the same finite VIF for every column, as in `prepare_features`).
+        Otherwise the R^2 is centered when the others contain an implicit constant
+        (the column of ones is in their span, e.g. all the levels of a one-hot
+        variable) and uncentered if not, and a perfect fit gives an infinite VIF.
+        """
+        gram = self.gram[np.ix_(idx, idx)]
+        sums = self.sum[idx]
+        if standardize:
+            gram = gram - np.outer(sums, sums) / self.n
+        vifs = np.empty(len(idx))
+        for i in range(len(idx)):
+            others = [j for j in range(len(idx)) if j != i]
+            g_ii = gram[i, i]
+            ssr, has_constant = g_ii, False
+            if others:
+                g_io = gram[others, i]
+                beta, ones = np.linalg.lstsq(gram[np.ix_(others, others)], np.column_stack([g_io, sums[others]]),
+                                             rcond=None)[0].T
+                ssr = g_ii - g_io @ beta
+                # Residuo de la regresión de la columna de unos sobre las demás
+                has_constant = self.n - sums[others] @ ones <= 1e-9 * self.n
+            if ssr <= 1e-12 * g_ii:
+                ssr = 0.0
+
+            if standardize:
+                # Una columna constante no se estandariza y su R^2 (-inf) se recorta a 0
+                r_sq = 1.0 - ssr / g_ii if g_ii > 1e-20 * self.n else 0.0
+                r_sq = np.clip(r_sq, 0.0, 1.0 - 1e-15)
+            else:
+                tss = g_ii - sums[i] ** 2 / self.n if has_constant else g_ii
+                r_sq = 1.0 - ssr / tss
+            with np.errstate(divide='ignore'):
+                vifs[i] = np.float64(1.0) / (1.0 - r_sq)
+        return vifs
+
+    def centered(self, n_x):
+        """
+        Statistics of [X | y] (y being the last column) centered on their means:
+        (X means, y mean, Xc^T Xc, Xc^T yc, yc^T yc).
+        """
+        mean = self.sum / self.n
+        cov = self.gram - self.n * np.outer(mean, mean)
+        return mean[:n_x], mean[n_x], cov[:n_x, :n_x], cov[:n_x, n_x], cov[n_x, n_x]
+
+
+def _filter_hotel(chunk, hotel):
+    return chunk if hotel is None else chunk[chunk['Hotel'] == hotel]
+
+
+def scan_categories(folder, index, hotel=None, chunksize=100_000, replicate=None):
+    """
+    Stream the categorical columns of a forged daily ZIP once and collect their levels.
+
+    Returns:
+        dict: Categorical column -> sorted list of observed values (the same
+        levels, in the same order, that `pd.get_dummies` would produce).
+    """
+    levels = {col: set() for col in CATEGORICAL_FEATURES}
+    usecols = CATEGORICAL_FEATURES + ([] if hotel is None else ['Hotel'])
+    for chunk in iter_daily_zip_chunks(folder, index, chunksize, usecols=usecols, replicate=replicate):
+        chunk = _filter_hotel(chunk, hotel)
+        for col in CATEGORICAL_FEATURES:
+            levels[col].update(chunk[col].dropna().unique())
+    return {col: sorted(values) for col, values in levels.items()}
+
+
+def encoded_feature_names(categories):
+    """Column names of the encoded matrix, following `pd.get_dummies` naming."""
+    return FEATURES + [f"{col}_{value}" for col in CATEGORICAL_FEATURES for value in categories[col]]
+
+
+def encode_chunk(chunk, categories):
+    """
+    One-hot encode a chunk with a fixed set of levels so every chunk yields the same layout.
+
+    Args:
+        chunk (pd.DataFrame): Rows of the forged daily dataset.
+        categories (dict): Levels per categorical column (see `scan_categories`).
+
+    Returns:
+        tuple: (X, y) float arrays, with non-finite rows removed.
+    """
+    blocks = [chunk[FEATURES].to_numpy(dtype=float)]
+    for col in CATEGORICAL_FEATURES:
+        codes = pd.Categorical(chunk[col], categories=categories[col]).codes
+        onehot = np.zeros((len(chunk), len(categories[col])))
+        rows = np.nonzero(codes >= 0)[0]
+        onehot[rows, codes[rows]] = 1.0
+        blocks.append(onehot)
+
+    X = np.hstack(blocks)
+    y = chunk[TARGET].to_numpy(dtype=float)
+    finite = np.isfinite(X).all(axis=1) & np.isfinite(y)
+    return X[finite], y[finite]
+
+
+def select_features(moments, names, corr_threshold=0.8, vif_threshold=10):
+    """
+    Apply the correlation and VIF elimination of `train_and_evaluate_models`
+    using streamed sufficient statistics instead of the full matrix.
+
+    Args:
+        moments (StreamingMoments): Statistics of [X | y].
+        names (list): Names of the X columns.
+
+    Returns:
+        tuple: (keep, eliminated_vars) where `keep` are the indices of the kept columns.
+    """
+    n_x = len(names)
+    corr = np.abs(moments.corr()[:n_x, :n_x])
+    upper = np.triu(corr, k=1)
+
+    eliminated_vars = {'correlation': {}, 'VIF': {}}
+    keep = list(range(n_x))
+
+    for j in range(n_x):
+        correlated = np.nonzero(upper[:, j] > corr_threshold)[0]
+        if correlated.size:
+            correlated_with = [names[i] for i in correlated]
+            eliminated_vars['correlation'][names[j]] = {'correlated_with': correlated_with}
+            print(f'Eliminating {names[j]} due to high correlation with {correlated_with}')
+            keep.remove(j)
+
+    while keep:
+        vif = pd.DataFrame({'Variable': [names[i] for i in keep], 'VIF': moments.vif(keep)})
+        if vif['VIF'].max() > vif_threshold:
+            # Mismo desempate que `prepare_features` entre variables con el mismo VIF
+            pos = vif.sort_values(by='VIF', ascending=False).index[0]
+            max_vif_var = vif.loc[pos, 'Variable']
+            print(f'Eliminating {max_vif_var} due to high VIF: {vif["VIF"].max()}')
+            vif_value = 'Infinity' if np.isinf(vif.loc[pos, 'VIF']) else vif.loc[pos, 'VIF']
+            eliminated_vars['VIF'][max_vif_var] = {'VIF': str(vif_value)}
+            keep.pop(pos)
+        else:
+            break
+
+    return keep, eliminated_vars
+
+
+def _pointbiserial_from_moments(moments, names):
+    """
+    Point-biserial correlation of every binary column with the target, normalized
+    to sum 1, as `utils.correlation.pointbiserialr_correlation` returns it.
+    """
+    n_x = len(names)
+    corr = moments.corr()[:n_x, n_x]
+    counts = moments.sum[:n_x]
+    binary = [i for i in range(len(FEATURES), n_x) if 0 < counts[i] < moments.n]
+
+    results_df = pd.DataFrame({
+        'Feature': [names[i] for i in binary],
+        'Correlation': np.abs(corr[binary])
+    })
+    total_corr = results_df['Correlation'].sum()
+    if total_corr > 0:
+        results_df['Correlation'] = results_df['Correlation'] / total_corr
+    return results_df
+
+
+def _fitted(model, coef, intercept, **attributes):
+    """`model` with the attributes `fit` would set, so `predict` and pickling work as usual."""
+    model.coef_ = coef
+    model.intercept_ = float(intercept)
+    model.n_features_in_ = len(coef)
+    for name, value in attributes.items():
+        setattr(model, name, value)
+    return model
+
+
+def fit_ridge(moments, alpha=1.0):
+    """
+    `Ridge(alpha)` solved exactly from the statistics of [X | y]: the normal
+    equations (Xc^T Xc + alpha I) coef = Xc^T yc on the centered data, as the
+    'cholesky' solver does, and intercept = mean(y) - mean(X) coef.
+    """
+    n_x = len(moments.sum) - 1
+    x_mean, y_mean, xtx, xty, _ = moments.centered(n_x)
+    coef = np.linalg.solve(xtx + alpha * np.eye(n_x), xty)
+    return _fitted(Ridge(alpha=alpha), coef, y_mean - x_mean @ coef, n_iter_=None, solver_='cholesky')
+
+
+def fit_lasso(moments, alpha=0.1, max_iter=1000, tol=1e-4):
+    """
+    `Lasso(alpha)` fitted by cyclic coordinate descent on the centered Gram matrix
+    (scikit-learn's `precompute=True` path): minimizes
+    (1 / 2n) ||yc - Xc coef||^2 + alpha ||coef||_1 and stops with the same
+    duality-gap criterion (gap < tol · yc^T yc).
+    """
+    n_x = len(moments.sum) - 1
+    x_mean, y_mean, xtx, xty, yty = moments.centered(n_x)
+    l1 = alpha * moments.n
+    tol = tol * yty
+
+    coef = np.zeros(n_x)
+    h_coef = np.zeros(n_x)  # Xc^T Xc coef
+    gap = tol + 1.0
+    for n_iter in range(max_iter):
+        w_max = d_w_max = 0.0
+        for j in range(n_x):
+            if xtx[j, j] == 0.0:
+                continue
+            rho = xty[j] - h_coef[j] + xtx[j, j] * coef[j]
+            new = np.sign(rho) * max(abs(rho) - l1, 0.0) / xtx[j, j]
+            if new != coef[j]:
+                h_coef += xtx[:, j] * (new - coef[j])
+            d_w_max = max(d_w_max, abs(new - coef[j]))
+            w_max = max(w_max, abs(new))
+            coef[j] = new
+
+        if w_max == 0.0 or d_w_max / w_max < 1e-4 or n_iter == max_iter - 1:
+            # Brecha de dualidad, como `enet_coordinate_descent_gram`
+            r_norm2 = yty - 2.0 * coef @ xty + coef @ h_coef
+            dual_norm = np.max(np.abs(xty - h_coef)) if n_x else 0.0
+            const = l1 / dual_norm if dual_norm > l1 else 1.0
+            gap = 0.5 * r_norm2 * (1.0 + const ** 2) if dual_norm > l1 else r_norm2
+            gap += l1 * np.abs(coef).sum() - const * (yty - coef @ xty)
+            if gap < tol:
+                break
+
+    return _fitted(Lasso(alpha=alpha), coef, y_mean - x_mean @ coef, n_iter_=n_iter + 1, dual_gap_=gap)
+
+
+def fit_bayesian_ridge(moments, max_iter=300, tol=1e-3, alpha_1=1e-6, alpha_2=1e-6, lambda_1=1e-6, lambda_2=1e-6):
+    """
+    `BayesianRidge()` fitted from the statistics of [X | y] with scikit-learn's
+    evidence maximization: the SVD of the centered X is replaced by the
+    eigendecomposition of its Gram matrix (same right singular vectors,
+    eigenvalues S^2) and the residual sum of squares is computed from the Gram.
+    """
+    n_x = len(moments.sum) - 1
+    x_mean, y_mean, xtx, xty, yty = moments.centered(n_x)
+    eigen_vals, vecs = np.linalg.eigh(xtx)
+    eigen_vals = np.clip(eigen_vals, 0.0, None)
+    vt_y = vecs.T @ xty
+
+    def update_coef(alpha_, lambda_):
+        coef = vecs @ (vt_y / (eigen_vals + lambda_ / alpha_))
+        return coef, yty - 2.0 * coef @ xty + coef @ xtx @ coef
+
+    alpha_ = 1.0 / (yty / moments.n + np.finfo(np.float64).eps)
+    lambda_ = 1.0
+    coef_old = None
+    for n_iter in range(max_iter):
+        coef, sse = update_coef(alpha_, lambda_)
+        gamma = np.sum((alpha_ * eigen_vals) / (lambda_ + alpha_ * eigen_vals))
+        lambda_ = (gamma + 2 * lambda_1) / (np.sum(coef ** 2) + 2 * lambda_2)
+        alpha_ = (moments.n - gamma + 2 * alpha_1) / (sse + 2 * alpha_2)
+        if n_iter != 0 and np.sum(np.abs(coef_old - coef)) < tol:
+            break
+        coef_old = coef
+
+    coef, _ = update_coef(alpha_, lambda_)
+    return _fitted(
+        BayesianRidge(max_iter=max_iter, tol=tol, alpha_1=alpha_1, alpha_2=alpha_2, lambda_1=lambda_1, lambda_2=lambda_2),
+        coef, y_mean - x_mean @ coef,
+        n_iter_=n_iter + 1, alpha_=alpha_, lambda_=lambda_, scores_=[],
+        sigma_=vecs @ (vecs.T / (alpha_ * eigen_vals + lambda_)[:, np.newaxis]),
+        X_offset_=x_mean, X_scale_=np.ones(n_x)
+    )
+
+
+class _ChunkIter(xgb.DataIter):
+    """XGBoost data iterator that re-streams the training chunks on every reset."""
+
+    def __init__(self, make_batches, feature_names, cache_prefix):
+        self._make_batches = make_batches
+        self._batches = None
+        self._feature_names = feature_names
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self._batches is None:
+            self._batches = self._make_batches()
+        try:
+            X, y = next(self._batches)
+        except StopIteration:
+            return False
+        input_data(data=X, label=y, feature_names=self._feature_names)
+        return True
+
+    def reset(self):
+        self._batches = None
+
+
+def train_and_evaluate_models_chunked(folder, index, hotel=None, chunksize=100_000,
+                                      corr_threshold=0.8, vif_threshold=10, replicate=None):
+    """
+    Out-of-core version of `train_and_evaluate_models`: the forged daily ZIP is
+    streamed in chunks and never loaded in full.
+
+    Passes over the archive:
+      1. Levels of the categorical features.
+      2. Sufficient statistics of [X | y] (correlation, VIF, point-biserial
+         correlation) and the scalers, fitted with `partial_fit`.
+      3. Sufficient statistics of the scaled training rows, from which Ridge and
+         BayesianRidge are solved exactly and Lasso is fitted by coordinate
+         descent (`fit_ridge`, `fit_bayesian_ridge`, `fit_lasso`).
+      4. Training of XGBoost with an iterator-based external-memory DMatrix.
+      5. Evaluation of RMSE and MAE on the test rows.
+
+    The train/test split is a seeded Bernoulli draw per row (20% test), reproduced
+    identically on every pass. RandomForest and AdaBoost have no exact
+    out-of-core fit and are not trained, so their importance columns are missing.
+
+    Args:
+        folder (str): Folder with the forged daily ZIPs.
+        index (int): Index of the daily ZIP.
+        hotel (str, optional): Keep only the rows of this hotel.
+        chunksize (int): Rows per chunk.
+        corr_threshold: Correlation threshold to remove highly correlated variables.
+        vif_threshold: Variance Inflation Factor (VIF) threshold to remove multicollinear features.
+        replicate (int, optional): Replicate to read from a ZIP partitioned by 'replicate'.
+
+    Returns:
+        importance_df: DataFrame with the importance of the features for each trained model.
+        eliminated_vars: Dictionary with the eliminated variables and the variables with which they are correlated or their VIF.
+        model_storage: Dictionary with the trained models, the scalers and the error metrics.
+        correlation_df: Point-biserial correlation per feature (as `calculate_correlation`).
+    """
+    categories = scan_categories(folder, index, hotel, chunksize, replicate)
+    names = encoded_feature_names(categories)
+    n_f = len(FEATURES)
+
+    def stream():
+        for chunk in iter_daily_zip_chunks(folder, index, chunksize, replicate=replicate):
+            chunk = _filter_hotel(chunk, hotel)
+            if len(chunk):
+                yield encode_chunk(chunk, categories)
+
+    # --- Estadísticas suficientes y escaladores ---
+    moments = StreamingMoments(len(names) + 1)
+    scaler_X = StandardScaler()
+    scaler_y = StandardScaler()
+    for X, y in stream():
+        if not len(y):
+            continue
+        moments.update(np.column_stack([X, y]))
+        scaler_X.partial_fit(pd.DataFrame(X[:, :n_f], columns=FEATURES))
+        scaler_y.partial_fit(y.reshape(-1, 1))
+
+    keep, eliminated_vars = select_features(moments, names, corr_threshold, vif_threshold)
+    kept_names = [names[i] for i in keep]
+    correlation_df = _pointbiserial_from_moments(moments, names)
+
+    def split_batches(test):
+        rng = np.random.default_rng(SPLIT_SEED)
+        for X, y in stream():
+            is_test = rng.random(len(y)) < TEST_SIZE
+            mask = is_test if test else ~is_test
+            if not mask.any():
+                continue
+            X, y = X[mask], y[mask]
+            X[:, :n_f] = scaler_X.transform(pd.DataFrame(X[:, :n_f], columns=FEATURES)).astype(np.int64)
+            y = scaler_y.transform(y.reshape(-1, 1)).flatten()
+            yield X[:, keep], y
+
+    # --- Entrenamiento ---
+    train = StreamingMoments(len(keep) + 1)
+    for X, y in split_batches(test=False):
+        train.update(np.column_stack([X, y]))
+    models = {
+        'Ridge': fit_ridge(train, alpha=1.0),
+        'Lasso': fit_lasso(train, alpha=0.1),
+        'BayesianRidge': fit_bayesian_ridge(train),
+    }
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        train_iter = _ChunkIter(lambda: split_batches(test=False), kept_names, f"{cache_dir}/cache")
+        dtrain = xgb.DMatrix(train_iter)
+        models['XGBoost'] = xgb.train(
+            {'objective': 'reg:squarederror', 'tree_method': 'hist', 'seed': 42},
+            dtrain,
+            num_boost_round=100
+        )
+        del dtrain
+
+    # --- Evaluación ---
+    sse = dict.fromkeys(models, 0.0)
+    sae = dict.fromkeys(models, 0.0)
+    n_test = 0
+    for X, y in split_batches(test=True):
+        n_test += len(y)
+        for name, model in models.items():
+            y_pred = model.inplace_predict(X) if name == 'XGBoost' else model.predict(X)
+            sse[name] += float(np.sum((y - y_pred) ** 2))
+            sae[name] += float(np.sum(np.abs(y - y_pred)))
+
+    model_storage = {
+        'models': models,
+        'scalers': {'X_scaler': scaler_X, 'y_scaler': scaler_y},
+        'error_metrics': {
+            name: {'RMSE': np.sqrt(sse[name] / n_test), 'MAE': sae[name] / n_test}
+            for name in models
+        },
+        'schema': feature_schema(categories, kept_names)
+    }
+
+    # --- Importancias ---
+    importance_df = pd.DataFrame({'Feature': kept_names})
+    for name in ('Ridge', 'Lasso', 'BayesianRidge'):
+        importance_df[name] = np.abs(models[name].coef_)
+    gain = models['XGBoost'].get_score(importance_type='gain')
+    xgb_importance = np.array([gain.get(feature, 0.0) for feature in kept_names])
+    if xgb_importance.sum() > 0:
+        xgb_importance = xgb_importance / xgb_importance.sum()
+    importance_df['XGBoost'] = xgb_importance
+
+    importance_df = importance_df.sort_values(by='XGBoost', ascending=False)
+
+    return importance_df, eliminated_vars, model_storage, correlation_df
@@ -0,0 +1,115 @@
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from modelling import FEATURES, CATEGORICAL_FEATURES
+
+# Estado compartido por los procesos (se envía una sola vez en el initializer)
+_models = None
+_X_test = None
+_y_test = None
+_baseline_rmse = None
+_columns = None
+
+
+def feature_groups(columns):
+    """
+    Group the encoded columns by original variable: every one-hot column of a
+    categorical feature belongs to the same group, numeric features are their own group.
+
+    Returns:
+        dict: Original variable -> list of column positions in `columns`.
+    """
+    groups = {}
+    for i, col in enumerate(columns):
+        if col in FEATURES:
+            groups.setdefault(col, []).append(i)
+            continue
+        for cat in CATEGORICAL_FEATURES:
+            if col.startswith(f"{cat}_"):
+                groups.setdefault(cat, []).append(i)
+                break
+    return groups
+
+
+def _init_worker(models, X_test, y_test, baseline_rmse, columns):
+    global _models, _X_test, _y_test, _baseline_rmse, _columns
+    _models = models
+    _X_test = X_test
+    _y_test = y_test
+    _baseline_rmse = baseline_rmse
+    _columns = columns
+
+
+def _permute_group(task):
+    """
+    Score all the repeats of one (model, group) pair with a single batched
+    prediction: the permuted copies of the test matrix are stacked vertically.
+    """
+    name, group, columns, n_repeats, seed = task
+    n_rows = _X_test.shape[0]
+    rng = np.random.default_rng(seed)
+
+    stacked = np.tile(_X_test, (n_repeats, 1))
+    for r in range(n_repeats):
+        perm = rng.permutation(n_rows)
+        # La misma permutación para todas las columnas one-hot de la variable
+        stacked[r * n_rows:(r + 1) * n_rows, columns] = _X_test[perm][:, columns]
+
+    y_pred = _models[name].predict(pd.DataFrame(stacked, columns=_columns)).reshape(n_repeats, n_rows)
+    rmse = np.sqrt(np.mean((y_pred - _y_test) ** 2, axis=1))
+    return name, group, rmse - _baseline_rmse[name]
+
+
+def permutation_importance_models(models, X_test, y_test, n_repeats=10, n_jobs=None, seed=42):
+    """
+    Model-agnostic permutation importance, comparable across every model of the zoo.
+
+    The importance of a variable is the increase of test RMSE when its values are
+    shuffled across rows. Categorical variables are permuted as a whole (all their
+    one-hot columns with the same permutation). Each model's baseline RMSE is
+    computed once from its cached baseline predictions, and the
+    (model, variable) tasks run on a process pool, predicting all repeats of a
+    task in one batch. All models see the same permutations of a variable.
+
+    Args:
+        models (dict): Fitted models, as in `model_storage['models']`.
+        X_test (pd.DataFrame): Test features used to evaluate the models.
+        y_test (np.ndarray): Test target.
+        n_repeats (int): Permutations per variable.
+        n_jobs (int, optional): Worker processes. Defaults to `cpu_count()`.
+        seed (int): Base seed of the permutations.
+
+    Returns:
+        pd.DataFrame: One row per original variable with the columns '<model>'
+        (mean RMSE increase) and '<model>_std'.
+    """
+    n_jobs = n_jobs or cpu_count()
+    X = X_test.to_numpy(dtype=float)
+    y = np.asarray(y_test, dtype=float)
+    groups = feature_groups(list(X_test.columns))
+
+    # Predicciones base cacheadas (una vez por modelo)
+    baseline_pred = {name: model.predict(X_test) for name, model in models.items()}
+    baseline_rmse = {name: np.sqrt(np.mean((pred - y) ** 2)) for name, pred in baseline_pred.items()}
+
+    # Misma semilla por variable en todos los modelos: se comparan con las mismas permutaciones
+    tasks = [
+        (name, group, columns, n_repeats, seed + g)
+        for name in models
+        for g, (group, columns) in enumerate(groups.items())
+    ]
+
+    results = {}
+    with Pool(processes=n_jobs, initializer=_init_worker, initargs=(models, X, y, baseline_rmse, list(X_test.columns))) as pool:
+        for name, group, deltas in tqdm(pool.imap_unordered(_permute_group, tasks), total=len(tasks), desc="Permutation importance"):
+            results[(name, group)] = deltas
+
+    permutation_df = pd.DataFrame({'Feature': list(groups)})
+    for name in models:
+        permutation_df[name] = [results[(name, group)].mean() for group in groups]
+        permutation_df[f"{name}_std"] = [results[(name, group)].std() for group in groups]
+
+    return permutation_df
@@ -0,0 +1,235 @@
+import functools
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from modelling import CATEGORICAL_FEATURES, TARGET, feature_schema
+from utils.io import iter_daily_zip_chunks
+from utils.paths import RESULTS_DIR
+
+SCHEMA_FILE = 'feature_schema.json'
+
+# Experimentos con modelos cargados que se mantienen en memoria
+EXPERIMENT_CACHE_SIZE = 8
+
+# Columnas identificativas copiadas en el CSV de predicciones
+ID_COLUMNS = ['Hotel', 'Año', 'Mes', 'id_huesped']
+
+
+def schema_from_models(models):
+    """
+    Feature schema of an experiment saved without `feature_schema.json`, rebuilt
+    from the column names stored in the fitted models (`feature_names_in_` of the
+    scikit-learn API, `feature_names` of an XGBoost Booster).
+
+    Args:
+        models (iterable): Fitted models, tried in order until one has column names.
+
+    Returns:
+        dict: Schema as `modelling.feature_schema`.
+
+    Raises:
+        ValueError: No model stores its column names.
+    """
+    for model in models:
+        columns = getattr(model, 'feature_names_in_', None)
+        if columns is None:
+            columns = getattr(model, 'feature_names', None)
+        if columns is None:
+            continue
+        categories = {col: [] for col in CATEGORICAL_FEATURES}
+        for column in columns:
+            for col in CATEGORICAL_FEATURES:
+                if column.startswith(f"{col}_"):
+                    categories[col].append(column[len(col) + 1:])
+                    break
+        return feature_schema(categories, list(columns))
+    raise ValueError("The experiment has no feature_schema.json and no model stores its column names.")
+
+
+class ExperimentPredictor:
+    """
+    Score new data with the models saved by `save_experiment_results`.
+
+    The scalers and the feature schema are read when the predictor is created;
+    each model is unpickled the first time it is used and kept afterwards.
+    """
+
+    def __init__(self, experiment_dir):
+        import joblib
+
+        self.path = experiment_dir
+        self.model_names = sorted(name[:-len('.pkl')] for name in os.listdir(os.path.join(experiment_dir, 'model'))
+                                  if name.endswith('.pkl'))
+        self.X_scaler = joblib.load(os.path.join(experiment_dir, 'scaler', 'X_scaler.pkl'))
+        self.y_scaler = joblib.load(os.path.join(experiment_dir, 'scaler', 'y_scaler.pkl'))
+        self._models = {}
+        self._lock = threading.Lock()
+
+        schema_path = os.path.join(experiment_dir, 'info', SCHEMA_FILE)
+        if os.path.exists(schema_path):
+            with open(schema_path, 'r') as file:
+                self.schema = json.load(file)
+        else:
+            self.schema = schema_from_models(self.model(name) for name in self.model_names)
+
+        # Posición de cada columna one-hot conservada: (variable, nivel) -> columna de X
+        columns = {column: i for i, column in enumerate(self.schema['columns'])}
+        self._onehot = {
+            col: {level: columns[f"{col}_{level}"] for level in levels if f"{col}_{level}" in columns}
+            for col, levels in self.schema['categories'].items()
+        }
+
+    def model(self, name):
+        """Fitted model `name`, unpickled on first use."""
+        with self._lock:
+            if name not in self._models:
+                import joblib
+                self._models[name] = joblib.load(os.path.join(self.path, 'model', f'{name}.pkl'))
+            return self._models[name]
+
+    def source_columns(self):
+        """Columns of the forged dataset needed to build the features."""
+        return self.schema['features'] + list(self.schema['categories'])
+
+    def encode(self, data):
+        """
+        Build the encoded feature matrix of `data` with the exact layout of the
+        training run: numeric features scaled with `X_scaler` and cast to int64
+        (as `prepare_features` does), one-hot columns of the kept levels only.
+        Levels unseen in training encode as all zeros.
+
+        Returns:
+            tuple: (X as a float array in `schema['columns']` order, mask of the rows
+            with finite features)
+        """
+        columns = {column: i for i, column in enumerate(self.schema['columns'])}
+        X = np.zeros((len(data), len(columns)))
+
+        numeric = data[self.schema['features']].to_numpy(dtype=float)
+        finite = np.isfinite(numeric).all(axis=1)
+        scaled = np.zeros_like(numeric)
+        if finite.any():
+            scaled[finite] = self.X_scaler.transform(
+                pd.DataFrame(numeric[finite], columns=self.schema['features'])
+            ).astype(np.int64)
+        for i, feature in enumerate(self.schema['features']):
+            if feature in columns:
+                X[:, columns[feature]] = scaled[:, i]
+
+        for col, positions in self._onehot.items():
+            if not positions:
+                continue
+            target = data[col].astype(str).map(positions)
+            rows = np.flatnonzero(target.notna().to_numpy())
+            X[rows, target.to_numpy()[rows].astype(np.int64)] = 1.0
+        return X, finite
+
+    def _predict_model(self, name, X, frame):
+        model = self.model(name)
+        if hasattr(model, 'inplace_predict') and not hasattr(model, 'get_params'):
+            # Booster de xgb.train (modelling_chunked)
+            y_pred = model.inplace_predict(X)
+        elif getattr(model, 'feature_names_in_', None) is not None:
+            y_pred = model.predict(frame)
+        else:
+            y_pred = model.predict(X)
+        return self.y_scaler.inverse_transform(np.asarray(y_pred, dtype=float).reshape(-1, 1)).ravel()
+
+    def predict(self, data, models=None, n_jobs=None):
+        """
+        Inverse-scaled predictions of 'Consumo medio' for every row of `data`.
+
+        Args:
+            data (pd.DataFrame): Rows of a forged daily dataset (see `source_columns`).
+            models (list, optional): Models to use. Defaults to all the saved models.
+            n_jobs (int, optional): Threads scoring the models concurrently. Defaults
+                to one per model.
+
+        Returns:
+            pd.DataFrame: One column per model, aligned with `data` (NaN for rows
+            with non-finite features).
+        """
+        models = list(models or self.model_names)
+        X, finite = self.encode(data)
+        X = X[finite]
+        frame = pd.DataFrame(X, columns=self.schema['columns'])
+
+        predictions = pd.DataFrame(np.nan, index=data.index, columns=models)
+        if not len(X):
+            return predictions
+        with ThreadPoolExecutor(max_workers=n_jobs or len(models)) as pool:
+            for name, y_pred in zip(models, pool.map(lambda name: self._predict_model(name, X, frame), models)):
+                predictions.loc[finite, name] = y_pred
+        return predictions
+
+
+@functools.lru_cache(maxsize=EXPERIMENT_CACHE_SIZE)
+def load_experiment(experiment, base_path=RESULTS_DIR):
+    """Predictor of `base_path/<experiment>`, cached (with its loaded models) across calls."""
+    return ExperimentPredictor(os.path.join(base_path, experiment))
+
+
+def score_daily_zip(experiment, folder, index, replicate=None, hotel=None, models=None,
+                    chunksize=100_000, n_jobs=None, output=None, base_path=RESULTS_DIR):
+    """
+    Score a forged daily ZIP with the models of an experiment, streaming the CSV in
+    chunks (only the feature, target and, with `output`, identifier columns are read).
+
+    Args:
+        experiment (str): Experiment directory name (e.g. 'experiment_0003').
+        folder (str): Folder of the daily ZIPs.
+        index (int): Index of the ZIP.
+        replicate (int, optional): Replicate of a partitioned ZIP.
+        hotel (str, optional): Score only this hotel.
+        models (list, optional): Models to use. Defaults to all the saved models.
+        chunksize (int): Rows per chunk.
+        n_jobs (int, optional): Threads scoring the models of a chunk concurrently.
+        output (str, optional): CSV written with the identifier columns, the target
+            and one 'pred_<model>' column per model.
+
+    Returns:
+        pd.DataFrame: One row per model with the scored 'rows' and, against
+        'Consumo medio', 'RMSE', 'MAE' and 'Bias' (mean of prediction - target), plus
+        'RMSE_scaled' and 'MAE_scaled' in the scaled target units of `error_metrics.json`.
+    """
+    predictor = load_experiment(experiment, base_path)
+    models = list(models or predictor.model_names)
+    usecols = predictor.source_columns() + [TARGET] + ([] if hotel is None else ['Hotel'])
+    if output is not None:
+        usecols += [c for c in ID_COLUMNS if c not in usecols]
+
+    # Acumuladores por modelo: filas, suma de errores, de errores absolutos y al cuadrado
+    totals = {name: np.zeros(4) for name in models}
+    y_scale = predictor.y_scaler.scale_[0]
+    header = True
+    for chunk in iter_daily_zip_chunks(folder, index, chunksize, usecols=list(dict.fromkeys(usecols)), replicate=replicate):
+        if hotel is not None:
+            chunk = chunk[chunk['Hotel'] == hotel]
+        if not len(chunk):
+            continue
+        predictions = predictor.predict(chunk, models, n_jobs)
+        y = chunk[TARGET].to_numpy(dtype=float)
+        for name in models:
+            error = predictions[name].to_numpy() - y
+            error = error[np.isfinite(error)]
+            totals[name] += [len(error), error.sum(), np.abs(error).sum(), (error ** 2).sum()]
+
+        if output is not None:
+            out = chunk[[c for c in ID_COLUMNS + [TARGET] if c in chunk]].copy()
+            for name in models:
+                out[f"pred_{name}"] = predictions[name]
+            out.to_csv(output, mode='w' if header else 'a', header=header, index=False)
+            header = False
+
+    rows = []
+    for name, (n, total, absolute, squared) in totals.items():
+        n = n or np.nan
+        rmse, mae = np.sqrt(squared / n), absolute / n
+        rows.append({'Model': name, 'rows': int(totals[name][0]), 'RMSE': rmse, 'MAE': mae, 'Bias': total / n,
+                     'RMSE_scaled': rmse / y_scale, 'MAE_scaled': mae / y_scale})
+    return pd.DataFrame(rows)
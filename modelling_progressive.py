@@ -0,0 +1,144 @@
+import time
+
+import numpy as np
+
+from modelling import CATEGORICAL_FEATURES, split_train_test, train_and_evaluate_models
+from utils.instrumentation import span
+
+# Columnas que definen los estratos del submuestreo (las que falten en los datos se ignoran)
+STRATA_COLUMNS = ['Hotel', 'Estación'] + CATEGORICAL_FEATURES
+
+
+def stratified_order(strata, seed=42):
+    """
+    Random order of the rows such that every prefix is a proportionally stratified
+    sample: the i-th row of a stratum with n rows gets the key (i + u) / n, u ~ U(0, 1),
+    and the rows are sorted by key. Growing prefixes are therefore nested samples.
+
+    Args:
+        strata (np.ndarray): Stratum code of each row (0..k-1).
+        seed (int): Seed of the shuffle.
+
+    Returns:
+        np.ndarray: Row positions in sampling order.
+    """
+    rng = np.random.default_rng(seed)
+    order = rng.permutation(len(strata))
+    codes = strata[order]
+    counts = np.bincount(codes)
+
+    # Posición de cada fila dentro de su estrato (en el orden aleatorio)
+    by_stratum = np.argsort(codes, kind='stable')
+    rank = np.empty(len(codes))
+    rank[by_stratum] = np.arange(len(codes)) - (np.cumsum(counts) - counts)[codes[by_stratum]]
+
+    key = (rank + rng.random(len(codes))) / counts[codes]
+    return order[np.argsort(key, kind='stable')]
+
+
+def sample_sizes(n_rows, start, growth):
+    """Geometric schedule start, start·growth, ... ending with all `n_rows`."""
+    sizes = []
+    size = min(start, n_rows)
+    while size < n_rows:
+        sizes.append(int(size))
+        size = max(size * growth, size + 1)
+    return sizes + [n_rows]
+
+
+def importance_shift(previous, current):
+    """
+    Change of the importance vectors between two steps, per model: total variation
+    distance (half the L1 distance, in [0, 1]) of the absolute importances
+    normalized to sum 1.
+    """
+    previous = previous.set_index('Feature')
+    current = current.set_index('Feature').reindex(previous.index)
+    shift = {}
+    for name in previous.columns:
+        a, b = previous[name].abs().to_numpy(dtype=float), current[name].abs().to_numpy(dtype=float)
+        if a.sum() > 0 and b.sum() > 0:
+            shift[name] = float(np.abs(a / a.sum() - b / b.sum()).sum() / 2)
+        else:
+            shift[name] = float(a.sum() != b.sum())
+    return shift
+
+
+def error_shift(previous, current):
+    """Relative change of the test RMSE between two steps, per model."""
+    return {name: abs(current[name]['RMSE'] - previous[name]['RMSE']) / previous[name]['RMSE']
+            if previous[name]['RMSE'] > 0 else 0.0 for name in previous}
+
+
+def progressive_train_and_evaluate(data, prepared, start=5000, growth=2.0, tol=0.03, patience=1, seed=42):
+    """
+    `train_and_evaluate_models` on stratified subsamples of growing size of the
+    training split, stopping once the models have converged.
+
+    The rows of the training split are ordered once with `stratified_order`
+    (strata: `STRATA_COLUMNS`) and every step fits the model zoo on the first
+    `size` rows, so the samples are nested and keep the proportions of the
+    strata. Every step is evaluated on the whole test split. After each step the
+    largest `importance_shift` and `error_shift` over the models are compared
+    with `tol`; after `patience` consecutive steps within it the last step is
+    kept. If they never converge, the last step uses the whole training split and
+    matches `train_and_evaluate_models` exactly. Feature elimination and scaling
+    are not resampled: all steps use the columns of `prepared`.
+
+    Args:
+        data (pd.DataFrame): Forged daily rows (for the strata).
+        prepared (tuple): Output of `prepare_features` for `data`.
+        start (int): Rows of the first step.
+        growth (float): Size ratio between consecutive steps.
+        tol (float): Convergence tolerance of both shifts.
+        patience (int): Consecutive converged steps needed to stop.
+        seed (int): Seed of the sampling order.
+
+    Returns:
+        importance_df, eliminated_vars, model_storage: As `train_and_evaluate_models`, for the last step.
+        summary: Dictionary with 'sample_sizes' (rows of every step fitted),
+            'train_rows', 'converged' and 'history' (per step: rows, seconds,
+            errors and shifts).
+    """
+    X, y, _, _ = prepared
+    X_train, _, _, _ = split_train_test(X, y)
+
+    columns = [col for col in STRATA_COLUMNS if col in data.columns]
+    strata = data.loc[X_train.index, columns].astype(str).groupby(columns, sort=False).ngroup().to_numpy()
+    order = stratified_order(strata, seed)
+
+    history = []
+    converged_steps = 0
+    previous = None
+    for size in sample_sizes(len(order), start, growth):
+        step_start = time.perf_counter()
+        with span('progressive_step', rows=size):
+            result = train_and_evaluate_models(data, prepared=prepared, sample=np.sort(order[:size]))
+        importance_df, _, model_storage = result
+
+        step = {
+            'rows': size,
+            'seconds': time.perf_counter() - step_start,
+            'error_metrics': model_storage['error_metrics'],
+        }
+        if previous is not None:
+            step['importance_shift'] = importance_shift(previous[0], importance_df)
+            step['error_shift'] = error_shift(previous[2]['error_metrics'], model_storage['error_metrics'])
+            within = max(step['importance_shift'].values()) <= tol and max(step['error_shift'].values()) <= tol
+            converged_steps = converged_steps + 1 if within else 0
+        history.append(step)
+        print(f"[INFO] Progressive step: {size} rows, {step['seconds']:.1f} s"
+              + (f", importance shift {max(step['importance_shift'].values()):.4f},"
+                 f" RMSE shift {max(step['error_shift'].values()):.4f}" if previous is not None else ""))
+
+        previous = result
+        if converged_steps >= patience:
+            break
+
+    summary = {
+        'sample_sizes': [step['rows'] for step in history],
+        'train_rows': int(len(order)),
+        'converged': converged_steps >= patience,
+        'history': history,
+    }
+    return (*previous, summary)
@@ -0,0 +1,139 @@
+import os
+import tempfile
+from multiprocessing import Pool, cpu_count
+
+import numpy as np
+import pandas as pd
+from sklearn.model_selection import KFold
+from sklearn.metrics import root_mean_squared_error, mean_absolute_error
+from tqdm import tqdm
+
+from modelling import build_models, extract_importance
+
+# Matriz codificada compartida por los procesos (cargada con mmap en cada worker)
+_X = None
+_y = None
+
+
+def _init_worker(x_path, y_path):
+    global _X, _y
+    _X = np.load(x_path, mmap_mode='r')
+    _y = np.load(y_path, mmap_mode='r')
+
+
+def _split_indices(method, split_id, n_splits, n_rows, seed):
+    """
+    Train/test indices of one resampling split.
+
+    - 'bootstrap': n rows drawn with replacement; the out-of-bag rows are the test set.
+    - 'cv': fold `split_id` of a shuffled `KFold(n_splits)`.
+    """
+    if method == 'bootstrap':
+        rng = np.random.default_rng(seed + split_id)
+        train_idx = rng.integers(0, n_rows, n_rows)
+        oob = np.ones(n_rows, dtype=bool)
+        oob[train_idx] = False
+        return train_idx, np.nonzero(oob)[0]
+    elif method == 'cv':
+        folds = KFold(n_splits=n_splits, shuffle=True, random_state=seed).split(np.empty(n_rows))
+        for fold_id, (train_idx, test_idx) in enumerate(folds):
+            if fold_id == split_id:
+                return train_idx, test_idx
+    raise ValueError(f"Unknown resampling method '{method}'. Use 'bootstrap' or 'cv'.")
+
+
+def _fit_split(task):
+    """Fit the whole model zoo on one split. Runs inside a worker process."""
+    method, split_id, n_splits, seed = task
+    train_idx, test_idx = _split_indices(method, split_id, n_splits, _X.shape[0], seed)
+
+    X_train, y_train = _X[train_idx], _y[train_idx]
+    X_test, y_test = _X[test_idx], _y[test_idx]
+
+    importances = {}
+    errors = {}
+    for name, model in build_models().items():
+        # Un hilo por modelo: el paralelismo está en los procesos
+        if 'n_jobs' in model.get_params():
+            model.set_params(n_jobs=1)
+        model.fit(X_train, y_train)
+
+        y_pred = model.predict(X_test)
+        errors[name] = (root_mean_squared_error(y_test, y_pred), mean_absolute_error(y_test, y_pred))
+        importances[name] = np.broadcast_to(extract_importance(model), (_X.shape[1],)).astype(float)
+
+    return split_id, importances, errors
+
+
+def _summary(values, ci):
+    """Mean, std and percentile interval along the first axis."""
+    lower = (1 - ci) / 2 * 100
+    upper = 100 - lower
+    return {
+        'mean': np.nanmean(values, axis=0),
+        'std': np.nanstd(values, axis=0),
+        f'p{lower:g}': np.nanpercentile(values, lower, axis=0),
+        f'p{upper:g}': np.nanpercentile(values, upper, axis=0),
+    }
+
+
+def resample_models(X, y, method='bootstrap', n_splits=100, n_jobs=None, ci=0.95, seed=42):
+    """
+    Fit the model zoo of `train_and_evaluate_models` on `n_splits` bootstrap or
+    cross-validation splits in parallel, to estimate the variability of the
+    feature importances and of the error metrics.
+
+    The encoded matrix is written once to a temporary `.npy` cache and every
+    worker maps it read-only, so the splits share it instead of receiving a copy.
+    Feature elimination and scaling are not resampled: all splits use the columns
+    of `X` as given by `prepare_features`.
+
+    Args:
+        X (pd.DataFrame): Encoded, pruned and scaled features.
+        y (np.ndarray): Scaled target.
+        method (str): 'bootstrap' (out-of-bag test rows) or 'cv' (K-fold).
+        n_splits (int): Number of bootstrap replicates or folds.
+        n_jobs (int, optional): Worker processes. Defaults to `cpu_count()`.
+        ci (float): Coverage of the percentile interval.
+        seed (int): Base seed of the splits.
+
+    Returns:
+        importance_summary: DataFrame with one row per feature and the columns
+            '<model>_mean', '<model>_std', '<model>_p<lower>' and '<model>_p<upper>'.
+        error_summary: Dictionary {model: {'RMSE': {...}, 'MAE': {...}}} with the same statistics.
+    """
+    n_jobs = n_jobs or cpu_count()
+    feature_names = list(X.columns)
+    tasks = [(method, split_id, n_splits, seed) for split_id in range(n_splits)]
+
+    importances = {}
+    errors = {}
+    with tempfile.TemporaryDirectory() as cache_dir:
+        x_path = os.path.join(cache_dir, 'X.npy')
+        y_path = os.path.join(cache_dir, 'y.npy')
+        np.save(x_path, X.to_numpy(dtype=float))
+        np.save(y_path, np.asarray(y, dtype=float))
+
+        with Pool(processes=n_jobs, initializer=_init_worker, initargs=(x_path, y_path)) as pool:
+            for split_id, split_importances, split_errors in tqdm(
+                pool.imap_unordered(_fit_split, tasks), total=n_splits, desc=f"Resampling ({method})"
+            ):
+                for name, importance in split_importances.items():
+                    importances.setdefault(name, np.empty((n_splits, len(feature_names))))[split_id] = importance
+                for name, error in split_errors.items():
+                    errors.setdefault(name, np.empty((n_splits, 2)))[split_id] = error
+
+    importance_summary = pd.DataFrame({'Feature': feature_names})
+    for name, values in importances.items():
+        for stat, stat_values in _summary(values, ci).items():
+            importance_summary[f"{name}_{stat}"] = stat_values
+
+    error_summary = {}
+    for name, values in errors.items():
+        stats = _summary(values, ci)
+        error_summary[name] = {
+            metric: {stat: float(stat_values[i]) for stat, stat_values in stats.items()}
+            for i, metric in enumerate(['RMSE', 'MAE'])
+        }
+
+    return importance_summary, error_summary
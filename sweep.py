@@ -0,0 +1,215 @@
+import argparse
+import itertools
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import redirect_stdout, redirect_stderr
+
+import pandas as pd
+
+from utils.io import reserve_next_index
+from utils.paths import SWEEPS_DIR, PREFIX_SWEEP
+
+# Parámetros que definen un forjado: los runs que los comparten reutilizan el mismo ZIP diario
+FORGE_KEYS = ['data', 'dist', 'rules', 'noise', 'seed']
+FORGE_DEFAULTS = {'data': 'default.csv', 'dist': 'default.json', 'rules': 'default.json', 'noise': None, 'seed': None}
+
+
+def expand_config(config):
+    """
+    Expand a sweep configuration into the list of runs.
+
+    The configuration may contain:
+      - "grid": {parameter: [values]} -> cartesian product of every parameter.
+      - "runs": [{parameter: value}] -> explicit list of runs.
+
+    Forge parameters are `data`, `dist`, `rules`, `noise` and `seed`; any other
+    parameter is passed to the modelling stage as a `main.py` option
+    (e.g. "mode": "modelling_chunked", "permutation_repeats": 10).
+
+    Returns:
+        list: One dict per run.
+    """
+    runs = []
+    grid = config.get('grid', {})
+    if grid:
+        keys = list(grid)
+        for values in itertools.product(*(grid[k] if isinstance(grid[k], list) else [grid[k]] for k in keys)):
+            runs.append(dict(zip(keys, values)))
+    runs.extend(config.get('runs', []))
+    return [{**FORGE_DEFAULTS, 'mode': 'modelling', **run} for run in runs]
+
+
+def _to_argv(params):
+    """Command line of `main.py` for `params`: `True` is a bare flag, `False` and `None` are left out."""
+    argv = [params['mode']]
+    for key, value in params.items():
+        if key == 'mode' or value is None or value is False:
+            continue
+        argv += [f"--{key}"] if value is True else [f"--{key}", str(value)]
+    return argv
+
+
+def _modelling_params(run, daily_index):
+    """Options of the modelling job of `run` on the daily ZIP `daily_index`."""
+    from main import SUBCOMMANDS
+
+    params = {k: v for k, v in run.items() if k not in FORGE_KEYS or k == 'data'}
+    params['daily_index'] = daily_index
+    # Un proceso por job: el paralelismo lo da el barrido (solo en los modos con --n_jobs)
+    _, groups = SUBCOMMANDS.get(params['mode'], (None, []))
+    if 'jobs' in groups:
+        params.setdefault('n_jobs', 1)
+    return params
+
+
+def check_runs(runs):
+    """
+    Parse the command line of every job of the sweep before launching any of them.
+
+    Raises:
+        ValueError: Some run has an unknown mode or options its mode does not accept.
+    """
+    import io
+    import main as pipeline
+
+    errors = []
+    for run_id, run in enumerate(runs):
+        forge = {'mode': 'forge_daily', **{k: run[k] for k in FORGE_KEYS}}
+        for argv in (_to_argv(forge), _to_argv(_modelling_params(run, 1))):
+            stderr = io.StringIO()
+            try:
+                with redirect_stderr(stderr):
+                    pipeline.parse_args(argv)
+            except SystemExit:
+                message = stderr.getvalue().strip().splitlines()
+                errors.append(f"run {run_id} ({' '.join(argv)}): {message[-1] if message else 'invalid arguments'}")
+    if errors:
+        raise ValueError("Invalid sweep configuration:\n  " + "\n  ".join(errors))
+
+
+def _run_job(argv, log_path):
+    """
+    Run one `main.py` invocation in this worker, logging its output to `log_path`.
+
+    Errors, including the `SystemExit` of argparse or of a fatal error in
+    `main.py`, are recorded as a failed job instead of stopping the sweep.
+    """
+    import main as pipeline
+
+    start = time.perf_counter()
+    with open(log_path, 'w') as log, redirect_stdout(log), redirect_stderr(log):
+        try:
+            value = pipeline.main(pipeline.parse_args(argv))
+            status, error = 'ok', ''
+        except (Exception, SystemExit) as e:
+            traceback.print_exc()
+            value, status, error = None, 'failed', repr(e)
+
+    return {'status': status, 'error': error, 'value': value, 'seconds': round(time.perf_counter() - start, 2)}
+
+
+def _error_metrics(results_dir):
+    """Flatten `info/error_metrics.json` of an experiment into '<model>_<metric>' columns."""
+    path = os.path.join(results_dir, 'info', 'error_metrics.json')
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        metrics = json.load(f)
+    return {f"{model}_{metric}": value for model, values in metrics.items() for metric, value in values.items()}
+
+
+def run_sweep(config, max_jobs=None):
+    """
+    Run every forge → modelling pipeline of a sweep on a bounded process pool.
+
+    Runs with identical forge parameters share a single `forge_daily` job; its
+    modelling jobs are submitted as soon as the forge finishes. At most
+    `max_jobs` jobs run at the same time. Each job's console output goes to
+    `logs/` and the summary table is rewritten after every finished run, so an
+    interrupted sweep keeps the runs already completed. The options of every job
+    are checked with `check_runs` before anything is launched.
+
+    Args:
+        config (dict): Sweep configuration (see `expand_config`).
+        max_jobs (int, optional): Concurrent jobs. Defaults to `config['max_jobs']` or the CPU count.
+
+    Returns:
+        str: Path of the summary CSV.
+    """
+    runs = expand_config(config)
+    check_runs(runs)
+    max_jobs = max_jobs or config.get('max_jobs') or os.cpu_count()
+
+    sweep_index = reserve_next_index(SWEEPS_DIR, prefix=PREFIX_SWEEP, is_dir=True)
+    sweep_dir = os.path.join(SWEEPS_DIR, f"{PREFIX_SWEEP}{sweep_index:04d}")
+    log_dir = os.path.join(sweep_dir, 'logs')
+    os.makedirs(log_dir, exist_ok=True)
+    summary_path = os.path.join(sweep_dir, 'summary.csv')
+    with open(os.path.join(sweep_dir, 'config.json'), 'w') as f:
+        json.dump(config, f, indent=4)
+
+    # Deduplicar forjados idénticos
+    forges = {}
+    for run_id, run in enumerate(runs):
+        key = tuple(run[k] for k in FORGE_KEYS)
+        forges.setdefault(key, []).append(run_id)
+
+    rows = [{'run_id': run_id, **run, 'daily_index': None, 'results_dir': None, 'status': 'pending', 'error': ''}
+            for run_id, run in enumerate(runs)]
+
+    def write_summary():
+        pd.DataFrame(rows).to_csv(summary_path, index=False)
+
+    print(f"[INFO] Sweep {sweep_dir}: {len(runs)} runs, {len(forges)} forges, {max_jobs} concurrent jobs")
+
+    with ProcessPoolExecutor(max_workers=max_jobs) as executor:
+        pending = {}
+        for forge_id, (key, run_ids) in enumerate(forges.items()):
+            params = {'mode': 'forge_daily', **dict(zip(FORGE_KEYS, key))}
+            future = executor.submit(_run_job, _to_argv(params), os.path.join(log_dir, f"forge_{forge_id:04d}.log"))
+            pending[future] = ('forge', forge_id, run_ids)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                kind, job_id, run_ids = pending.pop(future)
+                result = future.result()
+
+                if kind == 'forge':
+                    for run_id in run_ids:
+                        rows[run_id]['daily_index'] = result['value']
+                        rows[run_id]['forge_seconds'] = result['seconds']
+                        if result['status'] != 'ok':
+                            rows[run_id].update(status='forge_failed', error=result['error'])
+                            continue
+                        params = _modelling_params(runs[run_id], result['value'])
+                        future = executor.submit(_run_job, _to_argv(params), os.path.join(log_dir, f"run_{run_id:04d}.log"))
+                        pending[future] = ('modelling', run_id, [run_id])
+                else:
+                    row = rows[job_id]
+                    row.update(status=result['status'], error=result['error'],
+                               results_dir=result['value'], modelling_seconds=result['seconds'])
+                    if result['status'] == 'ok':
+                        row.update(_error_metrics(result['value']))
+                    print(f"[INFO] Run {job_id} {result['status']} ({result['seconds']} s)")
+
+                write_summary()
+
+    write_summary()
+    print(f"[INFO] Sweep summary: {summary_path}")
+    return summary_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a grid of forge → modelling experiments in parallel.")
+    parser.add_argument("--config", type=str, required=True, help="JSON file with the sweep 'grid' and/or explicit 'runs'.")
+    parser.add_argument("--max_jobs", type=int, default=None, help="Maximum number of concurrent jobs. Defaults to the config 'max_jobs' or the number of CPUs.")
+    args = parser.parse_args()
+
+    with open(args.config, 'r') as file:
+        config = json.load(file)
+
+    run_sweep(config, args.max_jobs)
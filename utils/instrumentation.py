@@ -0,0 +1,167 @@
+import json
+import os
+import resource
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# ru_maxrss is in bytes on macOS and in KiB on Linux
+_MAXRSS_UNIT = 1 if sys.platform == 'darwin' else 1024
+_PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+# Active recorder (None when nothing is being recorded: spans are then no-ops)
+_recorder = None
+
+
+def _peak_rss_bytes():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _MAXRSS_UNIT
+
+
+def _rss_bytes():
+    """Current RSS from /proc (Linux); None where it is not available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _cpu_seconds():
+    """CPU time of this process (every thread) plus its finished child processes."""
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return time.process_time() + children.ru_utime + children.ru_stime
+
+
+class Recorder:
+    """
+    Aggregates the spans of a run by path ('forge/sample/rules'): number of calls,
+    wall time, CPU time, rows, RSS at the end and growth of the peak RSS.
+
+    Spans with the same path are merged, so spans inside per-row loops cost a few
+    timer reads per call and never grow the report. Inner spans (`inner=True`)
+    only read the timers: no memory readings and no events.
+    """
+
+    def __init__(self, events_path=None):
+        self.start = time.perf_counter()
+        self.spans = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._events = open(events_path, 'a', buffering=1, encoding='utf-8') if events_path else None
+
+    def _stack(self):
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def emit(self, event, **fields):
+        """Write one JSON-lines event (if an events file was given)."""
+        if self._events is None:
+            return
+        record = {'event': event, 'time': round(time.time(), 6), **fields}
+        with self._lock:
+            self._events.write(json.dumps(record, ensure_ascii=False, default=str) + '\n')
+
+    @contextmanager
+    def span(self, name, rows=None, inner=False):
+        stack = self._stack()
+        stack.append(name)
+        path = '/'.join(stack)
+        record = {'rows': rows}
+        if not inner:
+            peak_before = _peak_rss_bytes()
+            self.emit('span_start', span=path)
+        wall_start, cpu_start = time.perf_counter(), _cpu_seconds()
+        try:
+            yield record
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, _cpu_seconds() - cpu_start
+            stack.pop()
+            with self._lock:
+                entry = self.spans.setdefault(path, {'span': path, 'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0, 'rows': None})
+                entry['calls'] += 1
+                entry['wall_seconds'] += wall
+                entry['cpu_seconds'] += cpu
+                if record['rows'] is not None:
+                    entry['rows'] = (entry['rows'] or 0) + int(record['rows'])
+            if not inner:
+                peak = _peak_rss_bytes()
+                with self._lock:
+                    entry['rss_bytes'] = _rss_bytes()
+                    entry['peak_rss_bytes'] = peak
+                    entry['peak_rss_growth_bytes'] = entry.get('peak_rss_growth_bytes', 0) + peak - peak_before
+                self.emit('span_end', span=path, wall_seconds=round(wall, 6), cpu_seconds=round(cpu, 6),
+                          rows=record['rows'], rss_bytes=entry['rss_bytes'], peak_rss_bytes=peak)
+
+    def summary(self):
+        """Spans in the order they first finished, with rows/sec where rows were recorded."""
+        with self._lock:
+            spans = [dict(entry) for entry in self.spans.values()]
+        for entry in spans:
+            entry['wall_seconds'] = round(entry['wall_seconds'], 6)
+            entry['cpu_seconds'] = round(entry['cpu_seconds'], 6)
+            if entry['rows'] is not None and entry['wall_seconds'] > 0:
+                entry['rows_per_sec'] = round(entry['rows'] / entry['wall_seconds'], 2)
+        return {
+            'wall_seconds': round(time.perf_counter() - self.start, 6),
+            'peak_rss_bytes': _peak_rss_bytes(),
+            'spans': spans,
+        }
+
+    def close(self):
+        if self._events is not None:
+            self._events.close()
+            self._events = None
+
+
+def start_recording(events_path=None):
+    """Start recording spans for this process (optionally streaming JSON-lines events to `events_path`)."""
+    global _recorder
+    stop_recording()
+    _recorder = Recorder(events_path)
+    _recorder.emit('run_start', pid=os.getpid())
+    return _recorder
+
+
+def stop_recording():
+    """Stop the active recorder and return its summary (None if nothing was recorded)."""
+    global _recorder
+    if _recorder is None:
+        return None
+    summary = _recorder.summary()
+    _recorder.emit('run_end', wall_seconds=summary['wall_seconds'], peak_rss_bytes=summary['peak_rss_bytes'])
+    _recorder.close()
+    _recorder = None
+    return summary
+
+
+def snapshot():
+    """Summary of the spans finished so far, or None when nothing is being recorded."""
+    return None if _recorder is None else _recorder.summary()
+
+
+@contextmanager
+def span(name, rows=None, inner=False):
+    """
+    Time a stage of the run. Yields a dict whose 'rows' can be set inside the block
+    to report rows/sec. Does nothing (beyond yielding the dict) when no recorder is active.
+
+    Args:
+        name (str): Span name; nested spans are reported as 'outer/inner'.
+        rows (int, optional): Rows processed by the span.
+        inner (bool): Span inside a hot loop: timers only, no memory readings and no events.
+    """
+    if _recorder is None:
+        yield {'rows': rows}
+        return
+    with _recorder.span(name, rows, inner) as record:
+        yield record
+
+
+def attach(info):
+    """Store the spans finished so far in `info['instrumentation']` (when recording)."""
+    summary = snapshot()
+    if summary is not None:
+        info['instrumentation'] = summary
+    return info
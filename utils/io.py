@@ -1,11 +1,20 @@
 import os
+import io
 import json
+import hashlib
+import queue
+import shutil
+import threading
+import time
 import pandas as pd
 import zipfile
-import joblib
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 
+from utils.instrumentation import span, attach
+from utils.results_index import update_experiment_index
 from utils.paths import RESULTS_DIR, FORGED_DAILY_PATH, FORGED_HOURLY_PATH
-from utils.paths import RESULTS_PREFIX, PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP, PREFIX_DIST_JSON, PREFIX_RULES_JSON, PREFIX_FORGED_CSV, PREFIX_PROFILE_JSON, PREFIX_INFO_JSON
+from utils.paths import RESULTS_PREFIX, PREFIX_DAILY_ZIP, PREFIX_HOURLY_ZIP, PREFIX_DIST_JSON, PREFIX_RULES_JSON, PREFIX_FORGED_CSV, PREFIX_PROFILE_JSON, PREFIX_INFO_JSON, PREFIX_CALENDAR_CSV, PREFIX_MANIFEST_JSON
 
 def get_next_index(path, prefix="", ext="", is_dir=False):
     """
@@ -51,39 +60,290 @@ def get_next_index(path, prefix="", ext="", is_dir=False):
 
     return max(numbers) + 1 if numbers else 1
 
-def load_daily_zip(folder, index):
+def reserve_next_index(path, prefix="", ext="", is_dir=False):
+    """
+    Like `get_next_index`, but also claims the index by atomically creating the
+    matching file (empty placeholder) or directory, so concurrent processes writing
+    to the same folder never get the same index.
+
+    Args:
+        path (str): Path to the folder where files or directories are checked.
+        prefix (str): Expected prefix of the files or directories.
+        ext (str): Expected file extension. Leave empty for directories.
+        is_dir (bool): If True, reserves a directory; if False, a file.
+
+    Returns:
+        int: The reserved index.
+    """
+    index = get_next_index(path, prefix, ext, is_dir)
+    while True:
+        target = os.path.join(path, f"{prefix}{index:04d}{ext}")
+        try:
+            if is_dir:
+                os.makedirs(target)
+            else:
+                open(target, 'x').close()
+            return index
+        except FileExistsError:
+            index += 1
+
+def calendar_csv_name(index, replicate=None):
+    """Name of the occupancy calendar CSV stored in a forged daily ZIP."""
+    suffix = "" if replicate is None else f"_replicate_{int(replicate):04d}"
+    return f"{PREFIX_CALENDAR_CSV}{index:04d}{suffix}.csv"
+
+# Columnas que identifican el mes de hotel de cada fila (fila del dataset base)
+SHARD_KEYS = ['Hotel', 'Año', 'Mes']
+
+def _json_value(value):
+    return value.item() if hasattr(value, 'item') else value
+
+def partition_csv_name(index, partition_by, value):
+    """Name of the CSV holding one partition (e.g. one replicate) of a forged daily ZIP."""
+    return f"{PREFIX_FORGED_CSV}{index:04d}_{partition_by}_{int(value):04d}.csv"
+
+def shard_csv_name(index, shard):
+    """Name of the CSV holding one shard of a forged daily ZIP."""
+    return f"{PREFIX_FORGED_CSV}{index:04d}_shard_{shard:04d}.csv"
+
+def shard_assignment(dataframe, n_shards, shard_by='month'):
+    """
+    Deterministic shard of every row of a forged daily dataset (non-decreasing, so
+    each shard is a contiguous row range). Shards that would get no rows are not
+    created: the shards are numbered 0..k-1 with k <= `n_shards` (with 'month', k is
+    at most the number of hotel-month runs).
+
+    Args:
+        dataframe (pd.DataFrame): Forged daily data.
+        n_shards (int): Maximum number of shards.
+        shard_by (str): 'rows' splits into equal row ranges; 'month' keeps every
+            consecutive run of the same (Hotel, Año, Mes) in a single shard,
+            cutting between runs as close as possible to equal row ranges.
+
+    Returns:
+        np.ndarray: Shard of each row.
+    """
+    n_rows = len(dataframe)
+    positions = np.arange(n_rows)
+    if shard_by == 'month':
+        keys = dataframe[SHARD_KEYS]
+        run_start = (keys != keys.shift()).any(axis=1).to_numpy()
+        # Cada fila toma la posición de la primera fila de su mes
+        positions = positions[run_start][np.cumsum(run_start) - 1]
+    elif shard_by != 'rows':
+        raise ValueError(f"Unknown shard_by '{shard_by}', expected 'month' or 'rows'.")
+    shard = positions * n_shards // max(n_rows, 1)
+    # Renumerar sin huecos: los cortes que no separan filas no crean fragmentos vacíos
+    return np.cumsum(np.diff(shard, prepend=shard[:1]) > 0)
+
+def daily_csv_members(z, index, replicate=None):
+    """
+    Forged CSV members of an open daily ZIP: the single CSV, one replicate of a
+    partitioned ZIP, or every shard listed in the manifest of a sharded ZIP.
+
+    Returns:
+        list: (member name, manifest entry or None) in row order.
+    """
+    if replicate is not None:
+        return [(partition_csv_name(index, 'replicate', replicate), None)]
+
+    csv_filename = f"{PREFIX_FORGED_CSV}{index:04d}.csv"
+    manifest_filename = f"{PREFIX_MANIFEST_JSON}{index:04d}.json"
+    names = set(z.namelist())
+    if csv_filename in names:
+        return [(csv_filename, None)]
+    if manifest_filename in names:
+        with z.open(manifest_filename) as f:
+            return [(shard['file'], shard) for shard in json.load(f)['shards']]
+    raise KeyError(f"{z.filename} has no {csv_filename}; pass the replicate of a partitioned ZIP.")
+
+def _read_shard(zip_filename, member, verify):
+    name, shard = member
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        if not verify or shard is None:
+            with z.open(name) as f:
+                return pd.read_csv(f)
+        data = z.read(name)
+    if hashlib.sha256(data).hexdigest() != shard['sha256']:
+        raise ValueError(f"Checksum mismatch in shard {name} of {zip_filename}.")
+    return pd.read_csv(io.BytesIO(data))
+
+def load_daily_zip(folder, index, replicate=None, n_threads=None, verify=False):
     """
     Load a forged **daily** ZIP file containing CSV, distributions JSON, and rules JSON.
 
+    The shards of a sharded ZIP are read concurrently by a thread pool (each thread
+    with its own handle on the archive) and concatenated once, in manifest order.
+
     Args:
         folder (str): Path to the folder where the ZIPs are stored.
         index (int): Index of the ZIP file (used in naming).
+        replicate (int, optional): Replicate to load from a ZIP partitioned by 'replicate'.
+        n_threads (int, optional): Threads reading the shards. Defaults to one per
+            shard, up to the number of CPUs.
+        verify (bool): Check the SHA-256 of every shard against the manifest.
 
     Returns:
         tuple: (forged_df, dist_dict, rules_dict)
     """
     zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
-    csv_filename = f"{PREFIX_FORGED_CSV}{index:04d}.csv"
     dist_filename = f"{PREFIX_DIST_JSON}{index:04d}.json"
     rules_filename = f"{PREFIX_RULES_JSON}{index:04d}.json"
 
     with zipfile.ZipFile(zip_filename, 'r') as z:
-        with z.open(csv_filename) as f:
-            forged_df = pd.read_csv(f)
+        members = daily_csv_members(z, index, replicate)
         with z.open(dist_filename) as f:
             dist_dict = json.load(f)
         with z.open(rules_filename) as f:
             rules_dict = json.load(f)
 
-    print(f"[INFO] Loaded ZIP: {zip_filename}, internal CSV: {csv_filename}")
+    if len(members) == 1:
+        forged_df = _read_shard(zip_filename, members[0], verify)
+    else:
+        n_threads = n_threads or min(len(members), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=n_threads) as executor:
+            frames = list(executor.map(lambda member: _read_shard(zip_filename, member, verify), members))
+        forged_df = pd.concat(frames, ignore_index=True, copy=False)
+
+    print(f"[INFO] Loaded ZIP: {zip_filename}, internal CSV: {', '.join(name for name, _ in members[:3])}{' ...' if len(members) > 3 else ''}")
     return forged_df, dist_dict, rules_dict
 
-def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH):
+def load_daily_zip_json(folder, index):
+    """
+    Load only the distributions and rules JSON of a forged **daily** ZIP file,
+    without reading the forged CSV.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+
+    Returns:
+        tuple: (dist_dict, rules_dict)
+    """
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+    dist_filename = f"{PREFIX_DIST_JSON}{index:04d}.json"
+    rules_filename = f"{PREFIX_RULES_JSON}{index:04d}.json"
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(dist_filename) as f:
+            dist_dict = json.load(f)
+        with z.open(rules_filename) as f:
+            rules_dict = json.load(f)
+
+    return dist_dict, rules_dict
+
+def load_daily_zip_info(folder, index):
+    """
+    Load only the info JSON (generation metadata) of a forged **daily** ZIP file.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+
+    Returns:
+        dict: Metadata saved with the forged data.
+    """
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(f"{PREFIX_INFO_JSON}{index:04d}.json") as f:
+            return json.load(f)
+
+def update_daily_zip_info(folder, index, updates, members=None):
+    """
+    Merge `updates` into the info JSON of a forged **daily** ZIP file, optionally
+    adding (or replacing) other members such as derived CSV files.
+
+    ZIP members cannot be rewritten in place, so the archive is copied member by
+    member (streamed, never fully loaded in memory) into a temporary file with
+    the new info JSON, which then replaces the original ZIP.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+        updates (dict): Keys to add or overwrite in the info JSON.
+        members (dict, optional): {member name: text content} to add or replace.
+
+    Returns:
+        dict: The updated info.
+    """
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+    tmp_filename = f"{zip_filename}.tmp"
+    info_name = f"{PREFIX_INFO_JSON}{index:04d}.json"
+
+    info = {**load_daily_zip_info(folder, index), **updates}
+    members = {**(members or {}), info_name: json.dumps(info, indent=4)}
+
+    with zipfile.ZipFile(zip_filename, 'r') as src, zipfile.ZipFile(tmp_filename, 'w') as dst:
+        for item in src.infolist():
+            if item.filename in members:
+                continue
+            with src.open(item) as f_in, dst.open(item, 'w', force_zip64=item.file_size >= zipfile.ZIP64_LIMIT) as f_out:
+                shutil.copyfileobj(f_in, f_out)
+        for name, content in members.items():
+            dst.writestr(name, content)
+
+    os.replace(tmp_filename, zip_filename)
+    return info
+
+def load_daily_zip_calendar(folder, index, replicate=None):
+    """
+    Load the occupancy calendar stored in a forged **daily** ZIP by `calendar_daily` mode.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+        replicate (int, optional): Replicate of a ZIP partitioned by 'replicate'.
+
+    Returns:
+        pd.DataFrame: One row per hotel (and replicate) and calendar day.
+    """
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(calendar_csv_name(index, replicate)) as f:
+            return pd.read_csv(f, parse_dates=['Fecha'])
+
+def iter_daily_zip_chunks(folder, index, chunksize=100_000, usecols=None, replicate=None):
+    """
+    Stream the forged CSV of a **daily** ZIP file in chunks, decompressing on the fly.
+
+    The whole dataset is never held in memory: each iteration yields the next
+    `chunksize` rows as a DataFrame.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+        chunksize (int): Number of rows per chunk.
+        usecols (list, optional): Subset of columns to read.
+        replicate (int, optional): Replicate to read from a ZIP partitioned by 'replicate'.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the forged daily dataset.
+    """
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        for csv_filename, _ in daily_csv_members(z, index, replicate):
+            with z.open(csv_filename) as f:
+                for chunk in pd.read_csv(f, chunksize=chunksize, usecols=usecols):
+                    yield chunk
+
+def daily_zip_columns(folder, index, replicate=None):
+    """Column names of the forged CSV of a **daily** ZIP file (only the header is read)."""
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        csv_filename, _ = daily_csv_members(z, index, replicate)[0]
+        with z.open(csv_filename) as f:
+            return pd.read_csv(f, nrows=0).columns.tolist()
+
+def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH, partition_by=None, shards=None, shard_by='month'):
     """
     Save a forged daily dataset in a ZIP file along with its distributions and rules.
 
     Each ZIP file will contain:
-        - CSV with daily guest data.
+        - CSV with daily guest data (or one CSV per partition).
         - JSON with the distributions used.
         - JSON with the consumption rules applied.
 
@@ -92,6 +352,17 @@ def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH):
         dist (dict): Distributions used to forge the data.
         rules (dict): Consumption rules applied to guests.
         info (dict): Metadata information about the generation.
+        partition_by (str, optional): Integer column (e.g. 'replicate') used to split the
+            data into one CSV per value, named `forged_XXXX_<column>_YYYY.csv`. The
+            partitions are listed in `info['partitions']`.
+        shards (int, optional): Split the CSV into this many shards
+            (`forged_XXXX_shard_YYYY.csv`, see `shard_assignment`) so that readers can
+            load them in parallel. A `manifest_XXXX.json` member records the rows,
+            row range, min/max (Hotel, Año, Mes) keys, size and SHA-256 of every shard.
+        shard_by (str): 'month' or 'rows'.
+
+    Returns:
+        int: Index of the saved ZIP.
 
     Notes:
     - CSV and JSON files are deleted after creating the ZIP.
@@ -99,8 +370,8 @@ def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH):
     - The ZIP name follows the pattern `daily_XXXX.zip`.
     """
 
-    daily_index = get_next_index(
-        path=FORGED_DAILY_PATH,
+    daily_index = reserve_next_index(
+        path=folder,
         prefix=PREFIX_DAILY_ZIP,
         ext=".zip",
         is_dir=False
@@ -113,8 +384,20 @@ def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH):
     info_filename = os.path.join(folder, f"{PREFIX_INFO_JSON}_{daily_index:04d}.json")
     zip_filename = os.path.join(folder,f"{PREFIX_DAILY_ZIP}{daily_index:04d}.zip")
 
+    if shards is not None and partition_by is not None:
+        raise ValueError("A daily ZIP can be partitioned or sharded, not both.")
+
     # Save the DataFrame to a CSV file
-    dataframe.to_csv(csv_filename, index=False)
+    if shards is not None:
+        info['shards'] = {'count': shards, 'by': shard_by, 'manifest': f"{PREFIX_MANIFEST_JSON}{daily_index:04d}.json"}
+    elif partition_by is None:
+        with span('serialize', rows=len(dataframe)):
+            dataframe.to_csv(csv_filename, index=False)
+    else:
+        info['partitions'] = {
+            str(value): {'file': partition_csv_name(daily_index, partition_by, value), 'rows': int(len(part))}
+            for value, part in dataframe.groupby(partition_by)
+        }
 
     # Save the distribution dictionary to a JSON file
     with open(dist_filename, 'w') as json_file:
@@ -124,28 +407,201 @@ def save_daily_to_zip(dataframe, dist, rules, info, folder=FORGED_DAILY_PATH):
     with open(rules_filename, 'w') as json_file:
         json.dump(rules, json_file)
 
-    # Save the info dictionary to a JSON file
-    with open(info_filename, 'w') as f:
-        json.dump(info, f, indent=4)
-
     # Create a ZIP file containing both files
     with zipfile.ZipFile(zip_filename, 'w') as zip_file:
         # Write CSV file to the ZIP without the directory structure
-        zip_file.write(csv_filename, arcname=f"forged_{daily_index:04d}.csv")
+        if shards is not None:
+            # One CSV per shard plus the manifest
+            assignment = shard_assignment(dataframe, shards, shard_by)
+            n_shards = int(assignment[-1]) + 1 if len(assignment) else 1
+            if n_shards < shards:
+                print(f"[INFO] {n_shards} non-empty shards instead of {shards} ({len(dataframe)} rows, shard_by='{shard_by}').")
+            info['shards']['count'] = n_shards
+            bounds = np.searchsorted(assignment, np.arange(n_shards + 1))
+            manifest = []
+            for shard, (start, end) in enumerate(zip(bounds[:-1], bounds[1:])):
+                part = dataframe.iloc[start:end]
+                with span('serialize', rows=len(part)):
+                    data = part.to_csv(index=False).encode('utf-8')
+                keys = sorted(part[SHARD_KEYS].drop_duplicates().itertuples(index=False, name=None))
+                manifest.append({
+                    'file': shard_csv_name(daily_index, shard),
+                    'rows': int(end - start),
+                    'row_start': int(start),
+                    'row_end': int(end),
+                    'min_key': [_json_value(v) for v in keys[0]] if keys else None,
+                    'max_key': [_json_value(v) for v in keys[-1]] if keys else None,
+                    'bytes': len(data),
+                    'sha256': hashlib.sha256(data).hexdigest(),
+                })
+                with span('compress', rows=len(part)):
+                    zip_file.writestr(shard_csv_name(daily_index, shard), data)
+            zip_file.writestr(info['shards']['manifest'], json.dumps({'shard_by': shard_by, 'shards': manifest}, indent=4))
+        elif partition_by is None:
+            with span('compress', rows=len(dataframe)):
+                zip_file.write(csv_filename, arcname=f"forged_{daily_index:04d}.csv")
+        else:
+            # One CSV per partition, streamed directly into the ZIP (serialization and
+            # compression happen together)
+            for value, part in dataframe.groupby(partition_by):
+                with span('serialize', rows=len(part)), zip_file.open(partition_csv_name(daily_index, partition_by, value), 'w') as f:
+                    part.to_csv(f, index=False)
         # Write Dist JSON file to the ZIP without the directory structure
         zip_file.write(dist_filename, arcname=f"dist_{daily_index:04d}.json")
         # Write Rules JSON file to the ZIP without the directory structure
         zip_file.write(rules_filename, arcname=f"rules_{daily_index:04d}.json")
+        # Save the info dictionary (with the stages recorded so far) to a JSON file
+        with open(info_filename, 'w') as f:
+            json.dump(attach(info), f, indent=4)
         # Write Info JSON file to the ZIP without the directory structure
         zip_file.write(info_filename, arcname=f"info_{daily_index:04d}.json")
 
     # Optionally, remove the individual files after zipping
-    os.remove(csv_filename)
+    if partition_by is None and shards is None:
+        os.remove(csv_filename)
     os.remove(dist_filename)
     os.remove(rules_filename)
     os.remove(info_filename)
 
     print(f"[INFO] Guardado ZIP diario: {zip_filename}")
+    return daily_index
+
+
+def save_daily_stream_to_zip(chunks, dist, rules, info, folder=FORGED_DAILY_PATH, partition_by=None,
+                             queue_size=4, compression=zipfile.ZIP_DEFLATED, compresslevel=1):
+    """
+    Pipelined version of `save_daily_to_zip` for data generated in chunks.
+
+    Generation, CSV serialization and compression overlap in three stages joined by
+    bounded queues:
+        - the caller's thread consumes `chunks` (the generator does the forging);
+        - a serializer thread encodes each chunk as CSV bytes;
+        - a writer thread compresses the bytes and appends them to the ZIP member.
+    When a queue is full, the previous stage blocks (backpressure), so at most
+    about 2 × `queue_size` chunks are held in memory at any time.
+
+    Args:
+        chunks (iterable): (partition value or None, pd.DataFrame) pairs. Chunks of the
+            same partition must be consecutive; each partition is one CSV member.
+        dist (dict): Distributions used to forge the data.
+        rules (dict): Consumption rules applied to guests.
+        info (dict): Metadata, written after the last chunk (so the generator may
+            still complete it while it runs). Stage timings are added under 'pipeline'.
+        partition_by (str, optional): Name of the partition column (e.g. 'replicate').
+        queue_size (int): Capacity of each queue, in chunks.
+        compression (int): `zipfile` compression of the CSV members.
+        compresslevel (int): Compression level; the fastest one by default so that
+            the writer keeps up with the generator.
+
+    Returns:
+        int: Index of the saved ZIP.
+    """
+    daily_index = reserve_next_index(path=folder, prefix=PREFIX_DAILY_ZIP, ext=".zip", is_dir=False)
+    zip_filename = os.path.join(folder, f"{PREFIX_DAILY_ZIP}{daily_index:04d}.zip")
+
+    frames = queue.Queue(maxsize=queue_size)
+    encoded = queue.Queue(maxsize=queue_size)
+    stop = object()
+    errors = []
+    timings = {'generate_seconds': 0.0, 'serialize_seconds': 0.0, 'write_seconds': 0.0}
+    partitions = {}
+
+    def put(q, item):
+        # Bloquea mientras la cola está llena, pero deja de esperar si otra etapa ha fallado
+        while not errors:
+            try:
+                q.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def get(q):
+        # Si otra etapa ha fallado, se trata como fin de datos
+        while not errors:
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return stop
+
+    def serializer():
+        try:
+            started = set()
+            while (item := get(frames)) is not stop:
+                value, frame = item
+                start = time.perf_counter()
+                with span('serialize', rows=len(frame)):
+                    data = frame.to_csv(index=False, header=value not in started).encode('utf-8')
+                started.add(value)
+                timings['serialize_seconds'] += time.perf_counter() - start
+                put(encoded, (value, len(frame), data))
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(encoded, stop)
+
+    def writer(zip_file):
+        try:
+            current, member = None, None
+            while (item := get(encoded)) is not stop:
+                value, n_rows, data = item
+                start = time.perf_counter()
+                if member is None or value != current:
+                    if member is not None:
+                        member.close()
+                    name = (f"{PREFIX_FORGED_CSV}{daily_index:04d}.csv" if value is None
+                            else partition_csv_name(daily_index, partition_by, value))
+                    member = zip_file.open(name, 'w', force_zip64=True)
+                    current = value
+                    if value is not None:
+                        partitions[str(value)] = {'file': name, 'rows': 0}
+                with span('compress', rows=n_rows):
+                    member.write(data)
+                if value is not None:
+                    partitions[str(value)]['rows'] += n_rows
+                timings['write_seconds'] += time.perf_counter() - start
+            if member is not None:
+                member.close()
+        except Exception as e:
+            errors.append(e)
+
+    wall_start = time.perf_counter()
+    with zipfile.ZipFile(zip_filename, 'w', compression=compression, compresslevel=compresslevel) as zip_file:
+        threads = [threading.Thread(target=serializer), threading.Thread(target=writer, args=(zip_file,))]
+        for thread in threads:
+            thread.start()
+
+        try:
+            iterator = iter(chunks)
+            while not errors:
+                start = time.perf_counter()
+                item = next(iterator, stop)
+                timings['generate_seconds'] += time.perf_counter() - start
+                if item is stop:
+                    break
+                put(frames, item)
+        finally:
+            put(frames, stop)
+            for thread in threads:
+                thread.join()
+
+        if errors:
+            raise errors[0]
+
+        if partition_by is not None:
+            info['partitions'] = partitions
+        info['pipeline'] = {
+            **{k: round(v, 3) for k, v in timings.items()},
+            'wall_seconds': round(time.perf_counter() - wall_start, 3),
+            'queue_size': queue_size,
+        }
+
+        zip_file.writestr(f"{PREFIX_DIST_JSON}{daily_index:04d}.json", json.dumps(dist))
+        zip_file.writestr(f"{PREFIX_RULES_JSON}{daily_index:04d}.json", json.dumps(rules))
+        zip_file.writestr(f"{PREFIX_INFO_JSON}{daily_index:04d}.json", json.dumps(attach(info), indent=4))
+
+    print(f"[INFO] Guardado ZIP diario: {zip_filename}")
+    return daily_index
 
 
 def save_hourly_to_zip(hourly_df: pd.DataFrame, profiles: dict, info: dict, folder=FORGED_HOURLY_PATH, prefix=PREFIX_HOURLY_ZIP):
@@ -163,10 +619,13 @@ def save_hourly_to_zip(hourly_df: pd.DataFrame, profiles: dict, info: dict, fold
         info (dict): Metadata information about the generation.
         folder (str): Folder to save the ZIP.
         prefix (str): Prefix for the ZIP file name (e.g., 'hourly_').
+
+    Returns:
+        int: Index of the saved ZIP.
     """
 
     # Determine next available index for ZIP
-    hourly_index = get_next_index(path=folder, prefix=prefix, ext=".zip", is_dir=False)
+    hourly_index = reserve_next_index(path=folder, prefix=prefix, ext=".zip", is_dir=False)
 
     # Filenames
     csv_filename = os.path.join(folder, f"{PREFIX_FORGED_CSV}{hourly_index:04d}.csv")
@@ -175,16 +634,19 @@ def save_hourly_to_zip(hourly_df: pd.DataFrame, profiles: dict, info: dict, fold
     zip_filename = os.path.join(folder, f"{prefix}{hourly_index:04d}.zip")
 
     # Save individual files
-    hourly_df.to_csv(csv_filename, index=False)
+    with span('serialize', rows=len(hourly_df)):
+        hourly_df.to_csv(csv_filename, index=False)
     with open(profile_filename, 'w') as f:
         json.dump(profiles, f, indent=4)
-    with open(info_filename, 'w') as f:
-        json.dump(info, f, indent=4)
 
     # Create ZIP
     with zipfile.ZipFile(zip_filename, 'w') as zip_file:
-        zip_file.write(csv_filename, arcname=os.path.basename(csv_filename))
+        with span('compress', rows=len(hourly_df)):
+            zip_file.write(csv_filename, arcname=os.path.basename(csv_filename))
         zip_file.write(profile_filename, arcname=os.path.basename(profile_filename))
+        # The info is written last so that it includes the stages above
+        with open(info_filename, 'w') as f:
+            json.dump(attach(info), f, indent=4)
         zip_file.write(info_filename, arcname=os.path.basename(info_filename))
 
     # Remove individual files after zipping
@@ -193,14 +655,63 @@ def save_hourly_to_zip(hourly_df: pd.DataFrame, profiles: dict, info: dict, fold
     os.remove(info_filename)
 
     print(f"[INFO] Saved hourly ZIP: {zip_filename}")
+    return hourly_index
 
-def save_experiment_results(info, model_storage, importances_df, eliminated_vars):
+def load_hourly_zip(folder, index, prefix=PREFIX_HOURLY_ZIP):
+    """
+    Load a forged **hourly** ZIP file with its profiles and metadata.
+
+    Args:
+        folder (str): Path to the folder where the ZIPs are stored.
+        index (int): Index of the ZIP file (used in naming).
+        prefix (str): Prefix of the ZIP file name.
+
+    Returns:
+        tuple: (hourly_df, profiles_dict, info_dict)
+    """
+    zip_filename = os.path.join(folder, f"{prefix}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(f"{PREFIX_FORGED_CSV}{index:04d}.csv") as f:
+            hourly_df = pd.read_csv(f)
+        with z.open(f"{PREFIX_PROFILE_JSON}{index:04d}.json") as f:
+            profiles = json.load(f)
+        with z.open(f"{PREFIX_INFO_JSON}_{index:04d}.json") as f:
+            info = json.load(f)
+
+    print(f"[INFO] Loaded hourly ZIP: {zip_filename}")
+    return hourly_df, profiles, info
+
+def hourly_zip_columns(folder, index, prefix=PREFIX_HOURLY_ZIP):
+    """Column names of the forged CSV of an **hourly** ZIP file (only the header is read)."""
+    zip_filename = os.path.join(folder, f"{prefix}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(f"{PREFIX_FORGED_CSV}{index:04d}.csv") as f:
+            return pd.read_csv(f, nrows=0).columns.tolist()
+
+def iter_hourly_zip_chunks(folder, index, chunksize=100_000, usecols=None, prefix=PREFIX_HOURLY_ZIP):
+    """
+    Stream the forged CSV of an **hourly** ZIP file in chunks, decompressing on the fly
+    and parsing only `usecols` (see `iter_daily_zip_chunks`).
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of the forged hourly dataset.
+    """
+    zip_filename = os.path.join(folder, f"{prefix}{index:04d}.zip")
+
+    with zipfile.ZipFile(zip_filename, 'r') as z:
+        with z.open(f"{PREFIX_FORGED_CSV}{index:04d}.csv") as f:
+            for chunk in pd.read_csv(f, chunksize=chunksize, usecols=usecols):
+                yield chunk
+
+def save_experiment_results(info, model_storage, importances_df, eliminated_vars, extra_info=None, extra_importances=None):
     """
     Save the complete results of a modelling experiment in a new directory.
 
     Generated directory structure:
         results_XXXX/
-            ├─ info/               -> JSON with info, metrics, and deleted variables
+            ├─ info/               -> JSON with info, metrics, deleted variables and feature schema
             ├─ scaler/             -> Pickle files with the scalers used
             ├─ model/              -> Pickle files with the trained models
             └─ importance/         -> CSV with combined variable importance
@@ -210,24 +721,33 @@ def save_experiment_results(info, model_storage, importances_df, eliminated_vars
         model_storage (dict): Dictionary with trained models and scalers.
         importances_df (pd.DataFrame): DataFrame with combined variable importance.
         eliminated_vars (list): List of variables eliminated during modelling.
+        extra_info (dict, optional): Additional JSON documents, saved as `info/<name>.json`.
+        extra_importances (dict, optional): Additional importance tables, saved as `importance/<name>.csv`.
+
+    Returns:
+        str: Path of the experiment directory.
 
     Notes:
     - The directory index is calculated automatically.
     - Use `RESULTS_DIR` and `RESULTS_PREFIX` to name the folder.
+    - The experiment is added to the SQLite index of `RESULTS_DIR` (`utils.results_index`).
     """
+    # joblib is only needed to pickle the models: keep it out of the module import
+    import joblib
+
     ## CREAR DIRECTORIO
 
     # Obtener el número del próximo directorio
-    results_index = get_next_index(
+    results_index = reserve_next_index(
         path=RESULTS_DIR,
-        prefix="results_",
+        prefix=RESULTS_PREFIX,
         is_dir=True
     )
     # Formatear el nombre del nuevo directorio con ceros a la izquierda
     new_dir_name = f"{RESULTS_PREFIX}{results_index:04d}"
     # Crear el nuevo directorio
     new_dir_path = os.path.join(RESULTS_DIR, new_dir_name)
-    os.makedirs(new_dir_path)
+    os.makedirs(new_dir_path, exist_ok=True)
     subdirs = ['info', 'scaler', 'model', 'importance']
     for subdir in subdirs:
         os.makedirs(os.path.join(new_dir_path, subdir))
@@ -239,7 +759,7 @@ def save_experiment_results(info, model_storage, importances_df, eliminated_vars
 
     # Guardar 'info' como JSON
     with open(os.path.join(info_dir, 'info.json'), 'w') as f_info:
-        json.dump(info, f_info, indent=4)
+        json.dump(attach(info), f_info, indent=4)
 
     # Guardar 'eliminated_vars' como JSON
     with open(os.path.join(info_dir, 'eliminated_vars.json'), 'w') as f_eliminated_vars:
@@ -249,6 +769,11 @@ def save_experiment_results(info, model_storage, importances_df, eliminated_vars
     with open(os.path.join(info_dir, 'error_metrics.json'), 'w') as f_errors:
         json.dump(model_storage['error_metrics'], f_errors, indent=4)
 
+    # Guardar el esquema de columnas codificadas (para puntuar datos nuevos con los modelos)
+    if 'schema' in model_storage:
+        with open(os.path.join(info_dir, 'feature_schema.json'), 'w') as f_schema:
+            json.dump(model_storage['schema'], f_schema, indent=4)
+
     ## GUARDAR SCALER Y MODELS
 
     # Guardar scalers en el directorio 'scaler'
@@ -267,4 +792,16 @@ def save_experiment_results(info, model_storage, importances_df, eliminated_vars
     importance_dir = os.path.join(new_dir_path, 'importance')
     importances_df.to_csv(os.path.join(importance_dir, f"importance.csv"), index=False)
 
-    print(f"Se han guardado correctamente toda la información realcionada con el experimento exp_{results_index:04d}")
\ No newline at end of file
+    ## GUARDAR RESULTADOS ADICIONALES
+    for name, data in (extra_info or {}).items():
+        with open(os.path.join(info_dir, f"{name}.json"), 'w') as f_extra:
+            json.dump(data, f_extra, indent=4)
+
+    for name, df in (extra_importances or {}).items():
+        df.to_csv(os.path.join(importance_dir, f"{name}.csv"), index=False)
+
+    ## ACTUALIZAR EL ÍNDICE DE EXPERIMENTOS
+    update_experiment_index(new_dir_path)
+
+    print(f"Se han guardado correctamente toda la información realcionada con el experimento exp_{results_index:04d}")
+    return new_dir_path
@@ -14,4 +14,18 @@ PREFIX_FORGED_CSV = "forged_"
 PREFIX_DIST_JSON = "dist_"
 PREFIX_RULES_JSON = "rules_"
 PREFIX_PROFILE_JSON = "profile_"
-PREFIX_INFO_JSON = "info_"
\ No newline at end of file
+PREFIX_INFO_JSON = "info_"
+PREFIX_CALENDAR_CSV = "calendar_"
+PREFIX_MANIFEST_JSON = "manifest_"
+
+SWEEPS_DIR = "sweeps"
+PREFIX_SWEEP = "sweep_"
+
+BENCHMARKS_DIR = "benchmarks/results"
+PREFIX_BENCHMARK = "bench_"
+
+# Informes de --profile, dentro de la carpeta de salida de cada ejecución
+PROFILES_SUBDIR = "profiles"
+
+# Índice SQLite de los experimentos, dentro de RESULTS_DIR
+RESULTS_INDEX_DB = "index.sqlite"
@@ -0,0 +1,281 @@
+import cProfile
+import importlib
+import inspect
+import io
+import linecache
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+
+PROFILERS = ['sample', 'cprofile']
+
+# Functions timed line by line with `line_functions=True` ('module:function')
+LINE_FUNCTIONS = ['forge_daily:forge_daily_consumption', 'forge_hourly:forge_hourly_consumption']
+
+# Call paths below this share of the profiled time are dropped from the cProfile collapsed stacks
+MIN_STACK_SHARE = 1e-5
+MAX_STACK_DEPTH = 64
+
+
+def _label(code):
+    """Frame label of the collapsed stacks: 'function (file:line)'."""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+class SamplingProfiler:
+    """
+    Statistical profiler: a daemon thread reads the stack of every other thread
+    each `interval` seconds (`sys._current_frames`) and counts identical stacks.
+
+    The profiled code is not instrumented, so the cost is one stack walk per
+    thread and sample plus the GIL hand-offs; the time spent sampling is kept in
+    `sampler_seconds`. Code running in worker processes is not sampled.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.stacks = Counter()
+        self.samples = 0
+        self.sampler_seconds = 0.0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _sample(self):
+        own = threading.get_ident()
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_label(frame.f_code))
+                frame = frame.f_back
+            stack.append(names.get(ident, f'thread-{ident}'))
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            start = time.perf_counter()
+            self._sample()
+            self.sampler_seconds += time.perf_counter() - start
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def collapsed(self):
+        """Collapsed stacks ('root;...;leaf count'), in samples."""
+        return {';'.join(stack): count for stack, count in self.stacks.items()}
+
+    def top(self, n):
+        """Top-`n` functions by self samples, with their inclusive samples."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for label in set(stack[1:]):
+                total[label] += count
+        samples = max(sum(self.stacks.values()), 1)
+        lines = [f"{'self %':>8} {'total %':>8} {'samples':>9}  function"]
+        for label, count in own.most_common(n):
+            lines.append(f"{100 * count / samples:8.2f} {100 * total[label] / samples:8.2f} {count:9d}  {label}")
+        return '\n'.join(lines)
+
+
+class DeterministicProfiler:
+    """cProfile over the calling thread; exact call counts, higher overhead on call-heavy code."""
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+        self.stats = None
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.stats = pstats.Stats(self.profile)
+
+    def collapsed(self):
+        """
+        Collapsed stacks estimated from the caller/callee graph, in microseconds.
+
+        cProfile only keeps one level of callers, so the self time of each function
+        is split among its callers in proportion to the cumulative time each one
+        spent in it, recursively up to the roots. Recursive paths stop at the first
+        repeated function.
+        """
+        stats = self.stats.stats
+        threshold = MIN_STACK_SHARE * max(self.stats.total_tt, 1e-9)
+        stacks = Counter()
+
+        def expand(func, weight, path):
+            callers = stats.get(func, (0, 0, 0, 0, {}))[4]
+            callers = {caller: entry for caller, entry in callers.items() if caller not in path}
+            if not callers or len(path) >= MAX_STACK_DEPTH:
+                stacks[';'.join(pstats.func_std_string(f) for f in reversed(path))] += weight
+                return
+            total = sum(entry[3] for entry in callers.values())
+            for caller, entry in callers.items():
+                share = entry[3] / total if total > 0 else 1 / len(callers)
+                if weight * share >= threshold:
+                    expand(caller, weight * share, path + [caller])
+
+        for func, (_, _, own_time, _, _) in stats.items():
+            if own_time >= threshold:
+                expand(func, own_time, [func])
+        return {stack: int(round(seconds * 1e6)) for stack, seconds in stacks.items() if seconds * 1e6 >= 1}
+
+    def top(self, n):
+        """pstats report of the top-`n` functions by self time and by cumulative time."""
+        out = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=out)
+        stats.sort_stats('tottime').print_stats(n)
+        stats.sort_stats('cumulative').print_stats(n)
+        return out.getvalue()
+
+
+class LineTimer:
+    """
+    Line-level timing of a few functions with `sys.settrace` (calling thread only).
+
+    The time of a line runs until the next line event of the same frame, so it
+    includes the functions it calls. Every Python call still goes through the
+    trace function, so this is meant for short diagnostic runs.
+    """
+
+    def __init__(self, functions):
+        self.codes = {function.__code__: function for function in functions}
+        self.timings = {}
+        self._last = {}
+
+    def _trace(self, frame, event, arg):
+        if event == 'call' and frame.f_code in self.codes:
+            return self._trace_lines
+        return None
+
+    def _trace_lines(self, frame, event, arg):
+        now = time.perf_counter()
+        last = self._last.pop(frame, None)
+        if last is not None:
+            entry = self.timings.setdefault((frame.f_code, last[0]), [0, 0.0])
+            entry[0] += 1
+            entry[1] += now - last[1]
+        if event != 'return':
+            self._last[frame] = (frame.f_lineno, time.perf_counter())
+        return self._trace_lines
+
+    def start(self):
+        sys.settrace(self._trace)
+
+    def stop(self):
+        sys.settrace(None)
+
+    def report(self):
+        """Per-function listing: hits, seconds, µs per hit and share of the function time."""
+        blocks = []
+        for code in self.codes:
+            lines = {lineno: entry for (line_code, lineno), entry in self.timings.items() if line_code is code}
+            total = sum(seconds for _, seconds in lines.values())
+            source, first = inspect.getsourcelines(code)
+            block = [f"{code.co_name} ({code.co_filename}:{first}) total {total:.6f} s",
+                     f"{'line':>6} {'hits':>10} {'seconds':>12} {'µs/hit':>10} {'%':>7}  source"]
+            for lineno in range(first, first + len(source)):
+                text = linecache.getline(code.co_filename, lineno).rstrip()
+                if lineno in lines:
+                    hits, seconds = lines[lineno]
+                    share = 100 * seconds / total if total > 0 else 0.0
+                    block.append(f"{lineno:6d} {hits:10d} {seconds:12.6f} {1e6 * seconds / hits:10.2f} {share:7.2f}  {text}")
+                else:
+                    block.append(f"{lineno:6d} {'':>10} {'':>12} {'':>10} {'':>7}  {text}")
+            blocks.append('\n'.join(block))
+        return '\n\n'.join(blocks)
+
+
+def resolve_functions(names=LINE_FUNCTIONS):
+    """Import the 'module:function' names of `LINE_FUNCTIONS`."""
+    functions = []
+    for name in names:
+        module, function = name.split(':')
+        functions.append(getattr(importlib.import_module(module), function))
+    return functions
+
+
+class RunProfiler:
+    """
+    Profile a whole run with `kind` ('sample' or 'cprofile'), optionally timing the
+    forge inner loops line by line, and write the reports with `write`.
+    """
+
+    def __init__(self, kind='sample', interval=0.01, line_functions=False):
+        if kind is not None and kind not in PROFILERS:
+            raise ValueError(f"Unknown profiler '{kind}'; expected one of {PROFILERS}.")
+        self.kind = kind
+        self.profiler = None
+        if kind == 'sample':
+            self.profiler = SamplingProfiler(interval)
+        elif kind == 'cprofile':
+            self.profiler = DeterministicProfiler()
+        self.lines = LineTimer(resolve_functions()) if line_functions else None
+        self.wall_seconds = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        if self.profiler is not None:
+            self.profiler.start()
+        if self.lines is not None:
+            self.lines.start()
+        return self
+
+    def stop(self):
+        if self.lines is not None:
+            self.lines.stop()
+        if self.profiler is not None:
+            self.profiler.stop()
+        self.wall_seconds = time.perf_counter() - self._start
+
+    def write(self, folder, stem, top=30):
+        """
+        Write the reports to `folder`:
+            <stem>_<kind>.collapsed  collapsed stacks (flamegraph.pl, speedscope, inferno)
+            <stem>_<kind>_top.txt    top-`top` hot functions
+            <stem>_cprofile.prof     raw pstats dump (cprofile only)
+            <stem>_lines.txt         line timings of `LINE_FUNCTIONS` (with line_functions)
+
+        Returns:
+            list: Paths written.
+        """
+        os.makedirs(folder, exist_ok=True)
+        paths = []
+
+        def dump(suffix, text):
+            path = os.path.join(folder, f"{stem}_{suffix}")
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            paths.append(path)
+
+        if self.profiler is not None:
+            collapsed = self.profiler.collapsed()
+            dump(f"{self.kind}.collapsed", ''.join(f"{stack} {count}\n" for stack, count in sorted(collapsed.items())))
+
+            header = [f"profiler: {self.kind}", f"wall_seconds: {self.wall_seconds:.6f}"]
+            if self.kind == 'sample':
+                header += [f"interval_seconds: {self.profiler.interval}", f"samples: {self.profiler.samples}",
+                           f"sampler_seconds: {self.profiler.sampler_seconds:.6f}"]
+            dump(f"{self.kind}_top.txt", '\n'.join(header) + '\n\n' + self.profiler.top(top) + '\n')
+
+            if self.kind == 'cprofile':
+                path = os.path.join(folder, f"{stem}_cprofile.prof")
+                self.profiler.stats.dump_stats(path)
+                paths.append(path)
+
+        if self.lines is not None:
+            dump("lines.txt", self.lines.report() + '\n')
+        return paths
@@ -0,0 +1,350 @@
+import json
+import os
+import re
+import sqlite3
+import time
+import zipfile
+
+import pandas as pd
+
+from utils.paths import RESULTS_DIR, RESULTS_INDEX_DB, FORGED_DAILY_PATH, PREFIX_INFO_JSON
+
+# Files of an experiment folder consolidated in the index: (column, relative path)
+EXPERIMENT_FILES = [
+    ('info', os.path.join('info', 'info.json')),
+    ('error_metrics', os.path.join('info', 'error_metrics.json')),
+    ('eliminated_vars', os.path.join('info', 'eliminated_vars.json')),
+    ('importances', os.path.join('importance', 'importance.csv')),
+]
+
+# Columns of importance.csv that are references, not models
+REFERENCE_IMPORTANCES = ['Theoretical_Importance', 'Correlation']
+
+# Columns of `experiments` that the query functions accept as filters and groups
+FILTER_COLUMNS = ['experiment', 'input_data_file', 'forged_data_file', 'dist_file', 'rules_file',
+                  'noise_daily', 'seed', 'experiment_description']
+
+# The index is derived data: a different version is dropped and rebuilt from the folders
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS experiments (
+    experiment TEXT PRIMARY KEY,
+    experiment_id TEXT,
+    experiment_date TEXT,
+    input_data_file TEXT,
+    forged_data_file TEXT,
+    dist_file TEXT,
+    rules_file TEXT,
+    noise_daily REAL,
+    seed INTEGER,
+    experiment_description TEXT,
+    parameters TEXT,
+    info TEXT,
+    error_metrics TEXT,
+    eliminated_vars TEXT,
+    importances TEXT,
+    mtime REAL,
+    indexed_at REAL
+);
+CREATE INDEX IF NOT EXISTS experiments_date ON experiments (experiment_date);
+CREATE INDEX IF NOT EXISTS experiments_case ON experiments (dist_file, rules_file);
+
+CREATE TABLE IF NOT EXISTS metrics (
+    experiment TEXT NOT NULL,
+    model TEXT NOT NULL,
+    metric TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS metrics_metric ON metrics (metric, model);
+CREATE INDEX IF NOT EXISTS metrics_experiment ON metrics (experiment);
+
+CREATE TABLE IF NOT EXISTS importances (
+    experiment TEXT NOT NULL,
+    feature TEXT NOT NULL,
+    source TEXT NOT NULL,
+    value REAL
+);
+CREATE INDEX IF NOT EXISTS importances_source ON importances (source, feature);
+CREATE INDEX IF NOT EXISTS importances_experiment ON importances (experiment, feature);
+
+-- Relative error (%) of every model importance against the theoretical importance
+CREATE VIEW IF NOT EXISTS importance_errors AS
+SELECT model.experiment AS experiment, model.feature AS feature, model.source AS model,
+       model.value AS importance, theory.value AS theoretical_importance,
+       CASE WHEN theory.value != 0 THEN 100.0 * ABS(model.value - theory.value) / ABS(theory.value) END AS relative_error
+FROM importances AS model
+JOIN importances AS theory
+  ON theory.experiment = model.experiment AND theory.feature = model.feature AND theory.source = 'Theoretical_Importance'
+WHERE model.source NOT IN ('Theoretical_Importance', 'Correlation');
+"""
+
+
+def index_path(base_path=RESULTS_DIR):
+    """Path of the SQLite experiment index of `base_path`."""
+    return os.path.join(base_path, RESULTS_INDEX_DB)
+
+
+def connect(base_path=RESULTS_DIR):
+    """Open (and create, or rebuild on a schema change) the experiment index of `base_path`."""
+    connection = sqlite3.connect(index_path(base_path), timeout=30)
+    if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+        with connection:
+            for kind, name in connection.execute(
+                    "SELECT type, name FROM sqlite_master WHERE type IN ('table', 'view') AND name NOT LIKE 'sqlite_%'").fetchall():
+                connection.execute(f"DROP {kind.upper()} IF EXISTS {name}")
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def experiment_mtime(experiment_dir):
+    """Latest modification time of the indexed files of an experiment (0 if none exists)."""
+    mtimes = [0.0]
+    for _, relative in EXPERIMENT_FILES:
+        try:
+            mtimes.append(os.stat(os.path.join(experiment_dir, relative)).st_mtime)
+        except FileNotFoundError:
+            pass
+    return max(mtimes)
+
+
+def _forge_info(info):
+    """
+    Info JSON of the daily ZIP an experiment was trained on, for experiments whose
+    own info does not record the forge inputs (empty if the ZIP is gone).
+    """
+    match = re.search(r'(\d+)\.zip$', info.get('forged_data_file') or '')
+    if match is None:
+        return {}
+    zip_filename = os.path.join(FORGED_DAILY_PATH, os.path.basename(info['forged_data_file']))
+    try:
+        with zipfile.ZipFile(zip_filename, 'r') as z:
+            with z.open(f"{PREFIX_INFO_JSON}{int(match.group(1)):04d}.json") as f:
+                return json.load(f)
+    except (OSError, KeyError, zipfile.BadZipFile, json.JSONDecodeError):
+        return {}
+
+
+def read_experiment(experiment_dir):
+    """
+    Consolidate the info, error metrics, eliminated variables and importances of an
+    experiment folder into one index row. Missing files are stored as NULL.
+
+    Returns:
+        dict: Row of the `experiments` table; the documents are JSON text.
+    """
+    documents = {}
+    for column, relative in EXPERIMENT_FILES:
+        path = os.path.join(experiment_dir, relative)
+        if not os.path.exists(path):
+            documents[column] = None
+        elif path.endswith('.csv'):
+            documents[column] = pd.read_csv(path).to_json(orient='records', force_ascii=False)
+        else:
+            with open(path, 'r', encoding='utf-8') as f:
+                documents[column] = json.dumps(json.load(f), ensure_ascii=False)
+
+    info = json.loads(documents['info']) if documents['info'] else {}
+    forge = info if 'dist_file' in info else _forge_info(info)
+    return {
+        'experiment': os.path.basename(os.path.normpath(experiment_dir)),
+        'experiment_id': info.get('experiment_id'),
+        'experiment_date': info.get('experiment_date'),
+        'input_data_file': info.get('input_data_file'),
+        'forged_data_file': info.get('forged_data_file'),
+        'dist_file': forge.get('dist_file'),
+        'rules_file': forge.get('rules_file'),
+        'noise_daily': forge.get('noise_daily'),
+        'seed': forge.get('seed'),
+        'experiment_description': info.get('experiment_description'),
+        'parameters': json.dumps(info.get('experiment_parameters', {}), ensure_ascii=False),
+        **documents,
+        'mtime': experiment_mtime(experiment_dir),
+        'indexed_at': time.time(),
+    }
+
+
+def _long_rows(row):
+    """(metrics, importances) rows of an experiment row, one value per row."""
+    experiment = row['experiment']
+    metrics = [(experiment, model, metric, value)
+               for model, values in json.loads(row['error_metrics'] or '{}').items()
+               for metric, value in values.items()]
+    importances = [(experiment, record['Feature'], source, value)
+                   for record in json.loads(row['importances'] or '[]')
+                   for source, value in record.items() if source != 'Feature']
+    return metrics, importances
+
+
+def _delete(connection, experiments):
+    for table in ['experiments', 'metrics', 'importances']:
+        connection.executemany(f"DELETE FROM {table} WHERE experiment = ?", [(e,) for e in experiments])
+
+
+def _upsert(connection, row):
+    _delete(connection, [row['experiment']])
+    columns = ', '.join(row)
+    placeholders = ', '.join('?' for _ in row)
+    connection.execute(f"INSERT INTO experiments ({columns}) VALUES ({placeholders})", list(row.values()))
+    metrics, importances = _long_rows(row)
+    connection.executemany("INSERT INTO metrics VALUES (?, ?, ?, ?)", metrics)
+    connection.executemany("INSERT INTO importances VALUES (?, ?, ?, ?)", importances)
+
+
+def update_experiment_index(experiment_dir, base_path=None):
+    """
+    Add (or replace) one experiment in the index. Called by `save_experiment_results`
+    after writing a new experiment, so the index never needs a full rebuild.
+    """
+    base_path = base_path or os.path.dirname(os.path.normpath(experiment_dir))
+    row = read_experiment(experiment_dir)
+    with connect(base_path) as connection:
+        _upsert(connection, row)
+    connection.close()
+    return row
+
+
+def refresh_experiment_index(base_path=RESULTS_DIR):
+    """
+    Bring the index in line with the experiment folders of `base_path`: folders that
+    are new or whose files changed since they were indexed are re-read, and folders
+    that no longer exist are removed. Unchanged folders only cost a few `stat` calls.
+
+    Returns:
+        dict: Number of experiments 'added', 'updated', 'removed' and 'unchanged'.
+    """
+    try:
+        folders = sorted(d for d in os.listdir(base_path) if os.path.isdir(os.path.join(base_path, d)))
+    except FileNotFoundError:
+        return {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+
+    counts = {'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 0}
+    with connect(base_path) as connection:
+        indexed = dict(connection.execute("SELECT experiment, mtime FROM experiments"))
+        for folder in folders:
+            experiment_dir = os.path.join(base_path, folder)
+            if folder in indexed and indexed[folder] >= experiment_mtime(experiment_dir):
+                counts['unchanged'] += 1
+                continue
+            _upsert(connection, read_experiment(experiment_dir))
+            counts['updated' if folder in indexed else 'added'] += 1
+
+        removed = sorted(set(indexed) - set(folders))
+        _delete(connection, removed)
+        counts['removed'] = len(removed)
+    connection.close()
+    return counts
+
+
+def load_experiment_index(base_path=RESULTS_DIR, refresh=True):
+    """
+    The experiment index as a DataFrame (one row per experiment folder, ordered by
+    folder name), refreshing it first unless `refresh=False`.
+    """
+    if refresh:
+        refresh_experiment_index(base_path)
+    if not os.path.exists(index_path(base_path)):
+        return pd.DataFrame(columns=['experiment'])
+    return _query(base_path, "SELECT * FROM experiments ORDER BY experiment")
+
+
+def _query(base_path, sql, params=()):
+    connection = connect(base_path)
+    try:
+        return pd.read_sql_query(sql, connection, params=params)
+    finally:
+        connection.close()
+
+
+def _where(filters, conditions=None, params=None):
+    """SQL WHERE clause for {column: [values]} filters on `experiments` (alias e)."""
+    conditions, params = list(conditions or []), list(params or [])
+    for column, values in (filters or {}).items():
+        if column not in FILTER_COLUMNS:
+            raise ValueError(f"Unknown filter '{column}', expected one of {FILTER_COLUMNS}.")
+        if values:
+            values = list(values)
+            conditions.append(f"e.{column} IN ({', '.join('?' for _ in values)})")
+            params += values
+    return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+
+def _in(column, values, conditions, params):
+    if values:
+        values = list(values)
+        conditions.append(f"{column} IN ({', '.join('?' for _ in values)})")
+        params += values
+
+
+def query_metrics(base_path=RESULTS_DIR, metrics=None, models=None, filters=None):
+    """
+    Error metrics of every indexed experiment, one row per (experiment, model, metric),
+    with the experiment columns of `FILTER_COLUMNS` to group by.
+
+    Args:
+        base_path (str): Results folder.
+        metrics (list, optional): Metrics to keep (e.g. ['RMSE']). All by default.
+        models (list, optional): Models to keep. All by default.
+        filters (dict, optional): {experiment column: [values]}.
+
+    Returns:
+        pd.DataFrame: Columns experiment, model, metric, value and `FILTER_COLUMNS`.
+    """
+    conditions, params = [], []
+    _in('m.metric', metrics, conditions, params)
+    _in('m.model', models, conditions, params)
+    where, params = _where(filters, conditions, params)
+    columns = ', '.join(f"e.{column}" for column in FILTER_COLUMNS if column != 'experiment')
+    sql = (f"SELECT m.experiment, m.model, m.metric, m.value, {columns} "
+           f"FROM metrics AS m JOIN experiments AS e ON e.experiment = m.experiment{where} "
+           f"ORDER BY m.experiment, m.model, m.metric")
+    return _query(base_path, sql, params)
+
+
+def query_importance_errors(base_path=RESULTS_DIR, models=None, features=None, filters=None):
+    """
+    Relative error (%) of the model importances against the theoretical importance
+    (view `importance_errors`), one row per (experiment, feature, model), with the
+    experiment columns of `FILTER_COLUMNS` to group by.
+
+    Args:
+        base_path (str): Results folder.
+        models (list, optional): Models to keep. All by default.
+        features (list, optional): Features to keep. All by default.
+        filters (dict, optional): {experiment column: [values]}.
+
+    Returns:
+        pd.DataFrame: Columns experiment, feature, model, importance,
+        theoretical_importance, relative_error and `FILTER_COLUMNS`.
+    """
+    conditions, params = [], []
+    _in('i.model', models, conditions, params)
+    _in('i.feature', features, conditions, params)
+    where, params = _where(filters, conditions, params)
+    columns = ', '.join(f"e.{column}" for column in FILTER_COLUMNS if column != 'experiment')
+    sql = (f"SELECT i.*, {columns} "
+           f"FROM importance_errors AS i JOIN experiments AS e ON e.experiment = i.experiment{where} "
+           f"ORDER BY i.experiment, i.feature, i.model")
+    return _query(base_path, sql, params)
+
+
+def distinct_values(base_path=RESULTS_DIR):
+    """
+    Values available to filter the queries: the `FILTER_COLUMNS` of the indexed
+    experiments, plus the 'model', 'metric' and 'feature' names.
+
+    Returns:
+        dict: {name: sorted list of values}
+    """
+    connection = connect(base_path)
+    try:
+        values = {column: [row[0] for row in connection.execute(
+            f"SELECT DISTINCT {column} FROM experiments WHERE {column} IS NOT NULL ORDER BY {column}")]
+            for column in FILTER_COLUMNS}
+        values['model'] = [row[0] for row in connection.execute("SELECT DISTINCT model FROM metrics ORDER BY model")]
+        values['metric'] = [row[0] for row in connection.execute("SELECT DISTINCT metric FROM metrics ORDER BY metric")]
+        values['feature'] = [row[0] for row in connection.execute("SELECT DISTINCT feature FROM importances ORDER BY feature")]
+        return values
+    finally:
+        connection.close()
@@ -1,3 +1,4 @@
+import numpy as np
 import pandas as pd
 
 def calculate_theorical_importance(rules, distribution, df):
@@ -11,19 +12,16 @@ def calculate_theorical_importance(rules, distribution, df):
     """
     importances = {}
 
+    # Exact marginals of every variable, computed once for all the rule categories
+    marginals = calculate_marginals(distribution, df, variables=rules.keys())
+
     for category, category_impact in rules.items():
-        # Get the probability of the current category using the calculate_probability function
-        category_probability = calculate_probability(category, distribution, df)
+        category_probability = marginals[category]
 
         for value, impact in category_impact.items():
-            # Check if the probability is a list (i.e., if it's conditional)
-            if isinstance(category_probability[value], list):
-                # If it's a list, multiply the rule by each probability and sum the results
-                importance = sum(abs(impact) * prob for prob in category_probability[value])
-            else:
-                # If it's not conditional, just multiply the impact by the unique probability
-                importance = abs(impact) * category_probability[value]
-            
+            # Importance = |impact| × P(value), marginalizing over the conditioning chain
+            importance = abs(impact) * category_probability.get(value, 0.0)
+
             # Store the calculated importance in the dictionary using the value as the key
             importances[f"{category}_{value}"] = importance
 
@@ -31,51 +29,83 @@ def calculate_theorical_importance(rules, distribution, df):
 
     return importance_df
 
+def calculate_marginals(distribution, df, variables=None):
+    """
+    Calculates the exact marginal probabilities of the variables in a single pass over the
+    dependency graph defined by the 'condicion' fields.
+
+    Each variable is represented by its list of categories and a probability vector. A
+    conditioned variable is a matrix P(value | condition) with one row per category of its
+    condition, so its marginal is a matrix-vector product with the (memoized) marginal of
+    the condition: shared sub-chains are computed only once.
+
+    :param distribution: Dictionary of distributions to look up the probabilities.
+    :param df: DataFrame used for the variables that are not in the distributions.
+    :param variables: Variables whose marginals are required. Defaults to every variable in `distribution`.
+    :return: Dictionary {variable: {value: probability}}.
+    """
+    memo = {}
+
+    def marginal(variable, visiting):
+        if variable in memo:
+            return memo[variable]
+        if variable in visiting:
+            raise ValueError(f"Cyclic 'condicion' chain involving '{variable}'.")
+
+        if variable not in distribution:
+            # Base column of the dataset: empirical distribution
+            probabilities = calculate_probability_from_df(variable, df)
+            categories = list(probabilities.keys())
+            vector = np.array(list(probabilities.values()), dtype=float)
+
+        elif 'condicion' in distribution[variable]:
+            condition = distribution[variable]['condicion']
+            cond_categories, cond_vector = marginal(condition, visiting | {variable})
+            conditional = distribution[variable]['probabilidades']
+
+            # Categories of the variable, in order of first appearance
+            categories = list(dict.fromkeys(value for probs in conditional.values() for value in probs))
+            position = {value: j for j, value in enumerate(categories)}
+
+            matrix = np.zeros((len(cond_categories), len(categories)))
+            for i, cond_value in enumerate(cond_categories):
+                if cond_vector[i] == 0:
+                    continue
+                # JSON keys are strings; base columns may hold numbers
+                probs = conditional.get(cond_value, conditional.get(str(cond_value)))
+                if probs is None:
+                    raise KeyError(f"Variable '{variable}' has no probabilities for {condition} = {cond_value!r}.")
+                for value, prob in probs.items():
+                    matrix[i, position[value]] = prob
+
+            vector = cond_vector @ matrix
+
+        else:
+            probabilities = distribution[variable]['probabilidades']
+            categories = list(probabilities.keys())
+            vector = np.array(list(probabilities.values()), dtype=float)
+
+        memo[variable] = (categories, vector)
+        return memo[variable]
+
+    variables = distribution.keys() if variables is None else variables
+    marginals = {}
+    for variable in variables:
+        categories, vector = marginal(variable, frozenset())
+        marginals[variable] = dict(zip(categories, vector.tolist()))
+
+    return marginals
+
 def calculate_probability(category, distribution, df):
     """
-    Calculates the probability for each value of a given category, considering possible conditioning.
+    Calculates the marginal probability for each value of a given category, considering possible conditioning.
 
     :param category: The category to calculate the probability for (e.g., 'nationality').
     :param distribution: Dictionary of distributions to look up the probabilities.
     :param df: DataFrame in case the category is not in the distributions.
-    :return: Dictionary with the probabilities for each value, as lists of probabilities if they are conditional.
+    :return: Dictionary with the marginal probability of each value.
     """
-    if category in distribution:
-        category_dist = distribution[category]
-        
-        # Check if it's a conditioned distribution
-        if 'condicion' in category_dist:
-            # Get the probability of the condition
-            condition = category_dist['condicion']
-            condition_probability = calculate_probability(condition, distribution, df)
-
-            # Structure to store the combined probability
-            combined_probability = {}
-
-            # For each value of the category, get the conditioned probabilities
-            for condition_value, condition_p in condition_probability.items():
-                for value, prob in category_dist['probabilidades'][condition_value].items():
-                    # Multiply the probability of the condition by the specific probability of the value
-                    if value not in combined_probability:
-                        combined_probability[value] = []
-
-                    # Check if 'condition_p' is a list
-                    if isinstance(condition_p, list):
-                        # If it's a list, multiply each element of 'condition_p' with the probability
-                        for _, prob_condition in enumerate(condition_p):
-                            combined_probability[value].append(prob * prob_condition)
-                    else:
-                        # If it's not a list, multiply directly
-                        combined_probability[value].append(prob * condition_p)
-
-            return combined_probability
-        
-        else:
-            # If it's not conditioned, return the probability directly
-            return category_dist['probabilidades']
-    else:
-        # If the category is not in the distribution, calculate the probability from the DataFrame
-        return calculate_probability_from_df(category, df)
+    return calculate_marginals(distribution, df, variables=[category])[category]
 
 
 def calculate_probability_from_df(column, df):
@@ -92,5 +122,5 @@ def calculate_probability_from_df(column, df):
 
     # Calculate the distribution by dividing each count by the total
     distribution = {value: frequency / total for value, frequency in count.items()}
-    
-    return distribution
\ No newline at end of file
+
+    return distribution